@@ -0,0 +1,241 @@
+"""
+Batch fuel/FBO enrichment for the airports on a trip.
+
+Document generators need the FBO handler, its phone and current fuel prices
+for every airport on a trip. This module gathers them for all of a trip's
+airports at once: recorded data (assigned FBOs, fuel price history) is read
+in bulk from the database, FBO phones already looked up come from the
+cache, and only what's missing is fetched from FlightAware, concurrently
+through a bounded thread pool and within an overall time budget. Anything
+that can't be fetched in time is left blank rather than holding up the
+document.
+
+Live lookups are for the background jobs (trip document pre-generation);
+documents generated inside a request use recorded and cached data only
+(fetch_missing=False), so a request never waits on FlightAware.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from lxml import html as lxml_html
+
+from utils.services.http_client import get_client
+
+from .fuel_prices import (
+    FuelPriceUnavailable, format_fuel_summary, get_fuel_prices,
+    in_worker_thread, latest_fuel_prices, normalize_code, parse_price,
+)
+
+logger = logging.getLogger(__name__)
+
+
+FBO_CACHE_KEY_PREFIX = 'fbo_details:v1:'
+FBO_BOARD_XPATH = "//div[contains(concat(' ', normalize-space(@class), ' '), ' airportBoardContainer ')]"
+FBO_PHONE_COLUMN = 3
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+@dataclass
+class AirportEnrichment:
+    """Document-ready FBO and fuel details for one airport."""
+    airport_id: object
+    code: str
+    fbo_handler: str = ''
+    phone_fax: str = ''
+    fuel: str = ''
+    fuel_prices: List[dict] = field(default_factory=list)  # {'fbo_name', 'jet_a_price'}, cheapest first
+
+
+def parse_fbo_details(content):
+    """
+    Extract the website and phone from a FlightAware FBO page.
+
+    Only the airportBoardContainer block is read.
+
+    Returns:
+        Dict with 'website' and 'phone' (either may be '')
+    """
+    try:
+        tree = lxml_html.fromstring(content)
+    except (ValueError, lxml_html.etree.ParserError):
+        return {'website': '', 'phone': ''}
+
+    boards = tree.xpath(FBO_BOARD_XPATH)
+    if not boards:
+        return {'website': '', 'phone': ''}
+
+    links = boards[0].xpath('.//a')
+    cells = boards[0].xpath('.//td')
+    website = links[0].text_content().strip() if links else ''
+    phone = cells[FBO_PHONE_COLUMN].text_content().strip() if len(cells) > FBO_PHONE_COLUMN else ''
+    return {'website': website, 'phone': phone}
+
+
+def _fbo_cache_key(airport_code, fbo_name):
+    return f"{FBO_CACHE_KEY_PREFIX}{normalize_code(airport_code)}:{fbo_name.casefold()}"
+
+
+def get_fbo_details(airport_code, fbo_name):
+    """
+    FBO website/phone from FlightAware, cached for FBO_DETAILS_CACHE_TTL.
+
+    Raises:
+        FuelPriceUnavailable: If the page cannot be fetched
+    """
+    airport_code = normalize_code(airport_code)
+    key = _fbo_cache_key(airport_code, fbo_name)
+    details = cache.get(key)
+    if details is not None:
+        return details
+
+    base_url = _setting('FLIGHTAWARE_BASE_URL', 'https://flightaware.com').rstrip('/')
+    url = f"{base_url}/resources/airport/{airport_code}/services/FBO/{quote(fbo_name)}"
+    try:
+        response = get_client('flightaware').get(url, timeout=_setting('FUEL_PRICE_TIMEOUT', (3.05, 10)))
+    except requests.RequestException as e:
+        raise FuelPriceUnavailable(f"FlightAware FBO request failed for {airport_code}/{fbo_name}: {e}") from e
+    if response.status_code != 200:
+        raise FuelPriceUnavailable(
+            f"FlightAware returned {response.status_code} for {airport_code}/{fbo_name}"
+        )
+
+    details = parse_fbo_details(response.content)
+    cache.set(key, details, _setting('FBO_DETAILS_CACHE_TTL', 7 * 24 * 3600))
+    return details
+
+
+def _format_phone_fax(*numbers):
+    return ' / '.join(n for n in numbers if n)
+
+
+def enrich_airports(airports, handlers=None, fetch_missing=True, max_workers=None,
+                    timeout: Optional[float] = None) -> Dict[object, AirportEnrichment]:
+    """
+    Merged FBO/fuel lookup for a set of airports.
+
+    Args:
+        airports: Airport instances (duplicates are ignored)
+        handlers: Optional {airport_id: FBO} of FBOs assigned on the trip;
+            airports without one fall back to their only linked FBO, if any
+        fetch_missing: Scrape fuel prices and FBO phones not already recorded
+            or cached (background jobs only; see the module docstring)
+        max_workers: Concurrent scrapes (defaults to FUEL_PRICE_MAX_WORKERS)
+        timeout: Overall seconds to wait for scrapes (defaults to ENRICHMENT_TIMEOUT)
+
+    Returns:
+        Dict of airport_id -> AirportEnrichment
+    """
+    from .models import Airport
+
+    handlers = dict(handlers or {})
+    airports = {a.id: a for a in airports if a is not None}
+    if not airports:
+        return {}
+
+    # Airports with exactly one linked FBO use it as the handler when none was assigned
+    unassigned = [airport_id for airport_id in airports if airport_id not in handlers]
+    if unassigned:
+        for airport in Airport.objects.filter(id__in=unassigned).prefetch_related('fbos'):
+            fbos = list(airport.fbos.all())
+            if len(fbos) == 1:
+                handlers[airport.id] = fbos[0]
+
+    recorded_fuel = latest_fuel_prices(airports.keys())
+
+    results = {}
+    for airport_id, airport in airports.items():
+        enrichment = AirportEnrichment(airport_id=airport_id, code=airport.icao_code or airport.ident)
+        handler = handlers.get(airport_id)
+        if handler is not None:
+            enrichment.fbo_handler = handler.name
+            enrichment.phone_fax = _format_phone_fax(handler.phone, handler.phone_secondary)
+        observations = recorded_fuel.get(airport_id)
+        if observations:
+            enrichment.fuel = format_fuel_summary([o.jet_a_price for o in observations])
+            enrichment.fuel_prices = [
+                {'fbo_name': o.fbo_name, 'jet_a_price': str(o.jet_a_price)} for o in observations
+            ]
+        results[airport_id] = enrichment
+
+    if not fetch_missing:
+        missing_phones = [e for e in results.values() if e.fbo_handler and not e.phone_fax]
+        cached = cache.get_many([_fbo_cache_key(e.code, e.fbo_handler) for e in missing_phones])
+        for enrichment in missing_phones:
+            details = cached.get(_fbo_cache_key(enrichment.code, enrichment.fbo_handler))
+            if details:
+                enrichment.phone_fax = details['phone']
+        return results
+
+    workers = max_workers or _setting('FUEL_PRICE_MAX_WORKERS', 4)
+    timeout = _setting('ENRICHMENT_TIMEOUT', 8) if timeout is None else timeout
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='airport-enrichment')
+    fuel_jobs, phone_jobs = {}, {}
+    try:
+        for airport_id, enrichment in results.items():
+            if not enrichment.fuel:
+                fuel_jobs[pool.submit(in_worker_thread, get_fuel_prices, enrichment.code)] = airport_id
+            if enrichment.fbo_handler and not enrichment.phone_fax:
+                phone_jobs[pool.submit(in_worker_thread, get_fbo_details, enrichment.code, enrichment.fbo_handler)] = airport_id
+
+        done, not_done = wait(list(fuel_jobs) + list(phone_jobs), timeout=timeout)
+        if not_done:
+            logger.warning("Airport enrichment timed out for %d lookups", len(not_done))
+
+        for future in done:
+            try:
+                value = future.result()
+            except FuelPriceUnavailable as e:
+                logger.warning("Airport enrichment lookup failed: %s", e)
+                continue
+            except Exception:
+                # Enrichment is best-effort: the document still renders with the field blank
+                logger.exception("Airport enrichment lookup raised")
+                continue
+
+            if future in fuel_jobs:
+                enrichment = results[fuel_jobs[future]]
+                entry, _ = value
+                priced = [(p['fbo_name'], parse_price(p['jet_a_cost'])) for p in entry['fuel_prices']]
+                priced = sorted((item for item in priced if item[1] is not None), key=lambda item: item[1])
+                enrichment.fuel_prices = [{'fbo_name': name, 'jet_a_price': str(price)} for name, price in priced]
+                enrichment.fuel = format_fuel_summary([price for _, price in priced])
+            else:
+                results[phone_jobs[future]].phone_fax = value['phone']
+    finally:
+        # Don't block the document on stragglers; they finish in the background and still fill the caches
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    return results
+
+
+def enrich_trip_airports(trip, trip_lines=None, **kwargs) -> Dict[object, AirportEnrichment]:
+    """
+    Enrichment for every airport on a trip, using the FBOs assigned on its legs.
+
+    Origins use the leg's departure FBO and destinations its arrival FBO.
+    Callers that already hold the legs (with airports and FBOs selected) can
+    pass them as trip_lines to skip reloading them.
+    """
+    airports = []
+    handlers = {}
+    if trip_lines is None:
+        trip_lines = trip.trip_lines.select_related(
+            'origin_airport', 'destination_airport', 'departure_fbo', 'arrival_fbo'
+        ).order_by('departure_time_utc')
+    for trip_line in trip_lines:
+        for airport, fbo in ((trip_line.origin_airport, trip_line.departure_fbo),
+                             (trip_line.destination_airport, trip_line.arrival_fbo)):
+            airports.append(airport)
+            if airport is not None and fbo is not None:
+                handlers.setdefault(airport.id, fbo)
+    return enrich_airports(airports, handlers=handlers, **kwargs)
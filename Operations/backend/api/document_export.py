@@ -0,0 +1,179 @@
+"""
+Bulk export of documents as a ZIP.
+
+DocumentViewSet.export selects documents by type, trip and creation date and
+streams them as a ZIP straight into the response: each file is read from
+storage a chunk at a time and written through zipfile onto a non-seekable
+stream (sizes and CRCs go in data descriptors after each file), so the first
+bytes go out immediately and memory stays flat however big the export.
+
+An export over DOCUMENT_EXPORT_STREAM_MAX_FILES files or
+DOCUMENT_EXPORT_STREAM_MAX_BYTES is instead written by the
+'documents.export' job into document storage as a 'document_export'
+Document, downloaded once the job finishes and deleted after
+DOCUMENT_EXPORT_RETENTION_DAYS.
+
+Patient uploads (insurance cards, letters of medical necessity) can't be
+exported in bulk.
+"""
+
+import logging
+import os
+import posixpath
+import zipfile
+from datetime import date
+from typing import Dict, Iterable, Iterator, List
+
+from django.db.models import Count, Q, Sum
+
+from .document_storage import StorageError, document_chunks
+
+logger = logging.getLogger(__name__)
+
+NOT_EXPORTABLE = ['insurance_card', 'letter_of_medical_necessity', 'document_export']
+
+COMPRESSION = {
+    'stored': zipfile.ZIP_STORED,  # PDFs are mostly compressed already
+    'deflate': zipfile.ZIP_DEFLATED,
+}
+
+
+class ExportError(Exception):
+    """Exception raised for an invalid export selection."""
+    pass
+
+
+def exportable_types() -> List[str]:
+    from .models import Document
+
+    return [value for value, _ in Document.DOCUMENT_TYPES if value not in NOT_EXPORTABLE]
+
+
+def parse_filters(params) -> Dict[str, object]:
+    """
+    JSON-serialisable export filters from query parameters: document_type
+    and trip (comma-separated), date_from and date_to (YYYY-MM-DD,
+    inclusive, on the document's creation date).
+
+    Raises:
+        ExportError: If a parameter is invalid
+    """
+    def split(name):
+        return [value.strip() for value in (params.get(name) or '').split(',') if value.strip()]
+
+    filters = {'document_types': split('document_type'), 'trip_ids': split('trip')}
+    if not filters['document_types']:
+        raise ExportError('document_type is required')
+    unsupported = [t for t in filters['document_types'] if t not in exportable_types()]
+    if unsupported:
+        raise ExportError(f"Document types can't be exported: {', '.join(unsupported)}")
+    for name in ('date_from', 'date_to'):
+        if params.get(name):
+            try:
+                filters[name] = date.fromisoformat(params[name]).isoformat()
+            except ValueError:
+                raise ExportError(f"{name} must be a date (YYYY-MM-DD)")
+    return filters
+
+
+def export_queryset(filters: Dict[str, object]):
+    from .models import Document
+
+    queryset = Document.objects.filter(document_type__in=filters['document_types']).filter(
+        Q(storage_key__isnull=False) | Q(file_path__isnull=False) | Q(content__isnull=False)
+    )
+    if filters.get('trip_ids'):
+        queryset = queryset.filter(trip_id__in=filters['trip_ids'])
+    if filters.get('date_from'):
+        queryset = queryset.filter(created_on__date__gte=filters['date_from'])
+    if filters.get('date_to'):
+        queryset = queryset.filter(created_on__date__lte=filters['date_to'])
+    return queryset.select_related('trip').order_by('created_on', 'pk')
+
+
+def export_size(queryset) -> Dict[str, int]:
+    """Number of files and their total size (as recorded) in an export."""
+    totals = queryset.aggregate(files=Count('pk'), bytes=Sum('file_size'))
+    return {'files': totals['files'], 'bytes': totals['bytes'] or 0}
+
+
+def export_filename(filters: Dict[str, object]) -> str:
+    parts = ['documents'] + list(filters['document_types'])
+    if filters.get('date_from') or filters.get('date_to'):
+        parts.append(f"{filters.get('date_from', '')}_{filters.get('date_to', '')}")
+    return '-'.join(parts) + '.zip'
+
+
+class _ZipStream:
+    """Write-only file that holds what zipfile writes until it's drained into the response."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> Iterator[bytes]:
+        chunks, self.chunks = self.chunks, []
+        data = b''.join(chunks)
+        if data:
+            yield data
+
+
+def _entry_name(document, used: set) -> str:
+    """Path in the ZIP: under the trip number for trip documents, made unique."""
+    filename = os.path.basename(document.filename or f"{document.id}")
+    folder = document.trip.trip_number if document.trip_id and document.trip and document.trip.trip_number else ''
+    name = posixpath.join(folder, filename) if folder else filename
+    stem, extension = posixpath.splitext(name)
+    counter = 1
+    while name in used:
+        counter += 1
+        name = f"{stem} ({counter}){extension}"
+    used.add(name)
+    return name
+
+
+def zip_chunks(documents: Iterable, compression: str = 'stored') -> Iterator[bytes]:
+    """
+    Yield a ZIP of the documents as it's written, one file at a time.
+
+    A document whose file can't be read is left out and listed in an
+    EXPORT_ERRORS.txt entry at the end, since a streamed response can't
+    fail halfway.
+    """
+    stream = _ZipStream()
+    used = set()
+    errors = []
+    with zipfile.ZipFile(stream, 'w', COMPRESSION[compression]) as archive:
+        for document in documents:
+            name = _entry_name(document, used)
+            info = zipfile.ZipInfo(name, date_time=document.created_on.timetuple()[:6])
+            info.compress_type = COMPRESSION[compression]
+            info.external_attr = 0o644 << 16
+            size = document.file_size
+            if size is not None:
+                info.file_size = size
+            try:
+                chunks = document_chunks(document)
+                first = next(chunks, b'')  # opens the file: fails here, before the entry is started
+            except (StorageError, OSError) as e:
+                logger.warning("Left %s out of export: %s", document.id, e)
+                errors.append(f"{name}: {e}")
+                used.discard(name)
+                continue
+            # Without a recorded size the entry may pass 4 GiB, so give it ZIP64 fields up front
+            with archive.open(info, 'w', force_zip64=size is None or size > zipfile.ZIP64_LIMIT) as entry:
+                entry.write(first)
+                yield from stream.drain()
+                for chunk in chunks:
+                    entry.write(chunk)
+                    yield from stream.drain()
+            yield from stream.drain()
+        if errors:
+            archive.writestr('EXPORT_ERRORS.txt', '\n'.join(errors) + '\n')
+    yield from stream.drain()
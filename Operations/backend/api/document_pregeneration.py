@@ -0,0 +1,174 @@
+"""
+Background pre-generation of trip packet documents.
+
+Signal receivers in api/signals.py call mark_stale() when a trip, one of its
+legs, crew lines, passengers or patient (or a contact behind any of those)
+changes. That flags the affected document types stale in TripDocumentStatus
+and enqueues a 'trips.pregenerate_documents' job, debounced per trip so a
+burst of edits while a trip is being built renders its packet once, after the
+edits stop. By the time someone asks for the documents they are usually
+already on disk, and generate_documents returns them without rendering.
+
+Freshness is tracked per document type. A status row is only marked fresh if
+nothing changed it while its document was rendering (changed_at is compared
+against the value read before rendering), so an edit made mid-render leaves
+the type stale for the next run.
+
+Airport enrichment (FlightAware FBO details, fuel prices) is looked up at
+render time but isn't tracked here; a change there alone doesn't mark a
+document stale.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .document_storage import document_file_exists
+from .trip_documents import PACKET_DOCUMENT_TYPES
+
+logger = logging.getLogger(__name__)
+
+ITINERARY_TYPES = ['customer_itinerary', 'internal_itinerary']
+
+# Packet documents that depend on each kind of change
+AFFECTED_DOCUMENT_TYPES = {
+    'trip': PACKET_DOCUMENT_TYPES,
+    'trip_line': PACKET_DOCUMENT_TYPES,
+    'crew': ITINERARY_TYPES + ['gendec'],
+    'passengers': ITINERARY_TYPES + ['handling_request', 'gendec'],
+    'patient': PACKET_DOCUMENT_TYPES,
+    'contact': PACKET_DOCUMENT_TYPES,
+}
+
+
+def mark_stale(trip_ids: Iterable, document_types: List[str]):
+    """
+    Flag the trips' documents of these types stale and schedule their regeneration.
+
+    Does nothing when TRIP_DOCUMENT_PREGENERATION is off.
+    """
+    from .jobs import enqueue_debounced
+    from .models import TripDocumentStatus
+
+    if not getattr(settings, 'TRIP_DOCUMENT_PREGENERATION', True):
+        return
+    trip_ids = list(dict.fromkeys(trip_ids))
+    if not trip_ids or not document_types:
+        return
+
+    now = timezone.now()
+    TripDocumentStatus.objects.filter(trip_id__in=trip_ids, document_type__in=document_types).update(
+        stale=True, changed_at=now
+    )
+    TripDocumentStatus.objects.bulk_create([
+        TripDocumentStatus(trip_id=trip_id, document_type=document_type, stale=True, changed_at=now)
+        for trip_id in trip_ids for document_type in document_types
+    ], ignore_conflicts=True)
+
+    for trip_id in trip_ids:
+        enqueue_debounced(
+            'trips.pregenerate_documents', f"trip:{trip_id}", {'trip_id': str(trip_id)},
+            delay=getattr(settings, 'TRIP_DOCUMENT_PREGENERATE_DELAY', 60),
+            max_delay=getattr(settings, 'TRIP_DOCUMENT_PREGENERATE_MAX_DELAY', 600),
+        )
+
+
+def _is_fresh(status) -> bool:
+    if status.stale or status.generated_at is None:
+        return False
+    # Fresh with no documents means the trip had nothing to put in them
+    return all(document_file_exists(document) for document in status.documents.all())
+
+
+def generate_packet(trip, document_types: Optional[List[str]] = None, created_by=None,
+                    live_enrichment: bool = False) -> Tuple[Dict[str, list], Dict[str, str]]:
+    """
+    Return the trip's up-to-date packet documents, rendering only the stale ones.
+
+    Args:
+        trip: Trip to generate documents for
+        document_types: Packet document types (default: all of them)
+        created_by: User recorded on newly rendered Documents
+        live_enrichment: Scrape FBO/fuel details not already recorded (background jobs only)
+
+    Returns:
+        Tuple of (Documents by type, error messages by type). Each type has
+        its Documents in packet order: itineraries one per crew line,
+        handling requests one per leg. Types the trip has nothing for (e.g.
+        a general declaration without occupants) appear in neither.
+    """
+    from django.db.models import Prefetch
+
+    from .document_rendering import render_documents
+    from .models import Document, TripDocumentStatus
+    from .trip_documents import TripDocumentContext, packet_render_tasks
+
+    document_types = document_types or PACKET_DOCUMENT_TYPES
+    TripDocumentStatus.objects.bulk_create([
+        TripDocumentStatus(trip=trip, document_type=document_type) for document_type in document_types
+    ], ignore_conflicts=True)
+    statuses = {
+        status.document_type: status
+        for status in TripDocumentStatus.objects.filter(
+            trip=trip, document_type__in=document_types
+        ).prefetch_related(Prefetch('documents', queryset=Document.objects.order_by('filename')))
+    }
+
+    documents = {}
+    errors = {}
+    pending = []
+    for document_type in document_types:
+        status = statuses[document_type]
+        if _is_fresh(status):
+            if status.documents.all():
+                documents[document_type] = list(status.documents.all())
+        else:
+            pending.append(status)
+    if not pending:
+        return documents, errors
+
+    # Load the trip graph once, then build every stale document's data from it
+    context = TripDocumentContext.load(trip, live_enrichment=live_enrichment)
+    tasks = []
+    for status in pending:
+        try:
+            status_tasks = packet_render_tasks(context, status.document_type)
+        except Exception as e:
+            logger.exception("Could not prepare %s for trip %s", status.document_type, trip.trip_number)
+            errors[status.document_type] = f"{type(e).__name__}: {e}"
+            TripDocumentStatus.objects.filter(pk=status.pk).update(last_error=errors[status.document_type])
+            continue
+        if not status_tasks:
+            _mark_generated(status, [])
+        tasks.extend((status, task) for task in status_tasks)
+
+    results = render_documents([task for _, task in tasks], trip=trip, created_by=created_by)
+    by_status = {}
+    for (status, _), result in zip(tasks, results):
+        by_status.setdefault(status, []).append(result)
+    for status, status_results in by_status.items():
+        failed = next((result for result in status_results if not result.success), None)
+        if failed is None:
+            documents[status.document_type] = [result.document for result in status_results]
+            _mark_generated(status, documents[status.document_type])
+        else:
+            errors[status.document_type] = failed.error
+            TripDocumentStatus.objects.filter(pk=status.pk).update(last_error=failed.error)
+
+    # Keep the packet's order
+    documents = {document_type: documents[document_type] for document_type in document_types if document_type in documents}
+    return documents, errors
+
+
+def _mark_generated(status, documents):
+    """Mark a status fresh, unless the trip changed again while it was rendering."""
+    from .models import TripDocumentStatus
+
+    with transaction.atomic():
+        if TripDocumentStatus.objects.filter(pk=status.pk, changed_at=status.changed_at).update(
+            stale=False, generated_at=timezone.now(), last_error=''
+        ):
+            status.documents.set(documents)
@@ -0,0 +1,187 @@
+"""
+Thumbnails and previews of uploaded patient documents.
+
+Insurance cards and letters of medical necessity are uploaded as phone photos
+(often 3-5 MB, 4000px JPEGs) or PDFs. Rather than send the original to every
+screen that shows one, the 'documents.render_previews' job (enqueued by
+PatientViewSet.upload_document) renders small derivatives once, off the
+request, and stores them next to the original as DocumentPreview rows:
+
+- 'thumbnail': fits THUMBNAIL_SIZE, for lists;
+- 'preview': fits PREVIEW_SIZE, for the patient screen;
+- 'display': photos only, a recompressed copy fitting DISPLAY_SIZE, made when
+  the original is larger than that or DOCUMENT_DISPLAY_MAX_BYTES.
+
+PDFs are previewed from their first page, rasterised by pdftoppm
+(poppler-utils); without it PDFs simply get no previews. Derivatives are
+written in DOCUMENT_PREVIEW_FORMAT (WebP, or JPEG), with orientation applied
+and EXIF (camera, GPS) dropped, and are encrypted like their original. The
+original itself is never modified.
+
+DocumentViewSet.preview serves them, revalidated by ETag like downloads.
+`python manage.py render_document_previews` backfills existing documents.
+"""
+
+import hashlib
+import io
+import shutil
+import subprocess
+from typing import List
+
+from django.conf import settings
+from PIL import Image, ImageOps, features
+
+from .document_storage import get_document_storage, guess_mime_type, read_document, shard_key
+
+THUMBNAIL_SIZE = 256
+PREVIEW_SIZE = 1024
+DISPLAY_SIZE = 2048
+PDF_RENDER_TIMEOUT = 60  # seconds
+
+IMAGE_MIME_TYPES = ['image/jpeg', 'image/png']
+PREVIEWABLE_MIME_TYPES = IMAGE_MIME_TYPES + ['application/pdf']
+
+
+class PreviewError(Exception):
+    """Exception raised when a document can't be previewed."""
+    pass
+
+
+def _output_format():
+    output_format = getattr(settings, 'DOCUMENT_PREVIEW_FORMAT', 'WEBP').upper()
+    if output_format == 'WEBP' and not features.check('webp'):
+        return 'JPEG'
+    return 'WEBP' if output_format == 'WEBP' else 'JPEG'
+
+
+def _encode(image: Image.Image, output_format: str) -> bytes:
+    out = io.BytesIO()
+    quality = getattr(settings, 'DOCUMENT_PREVIEW_QUALITY', 80)
+    if output_format == 'WEBP':
+        image.save(out, 'WEBP', quality=quality, method=4)
+    else:
+        image.save(out, 'JPEG', quality=quality, optimize=True, progressive=True)
+    return out.getvalue()
+
+
+def _flatten(image: Image.Image) -> Image.Image:
+    """RGB copy of an image, transparency composited onto white (scans have no use for alpha)."""
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def _open_image(data: bytes, largest: int) -> Image.Image:
+    image = Image.open(io.BytesIO(data))
+    # A JPEG can be decoded straight at 1/2, 1/4 or 1/8 scale: far less time and memory than
+    # decoding 12 megapixels only to throw most of them away
+    image.draft('RGB', (largest, largest))
+    image = ImageOps.exif_transpose(image)
+    return _flatten(image)
+
+
+def _render_pdf_page(data: bytes, size: int) -> Image.Image:
+    """The first page of a PDF as an image fitting `size`, via pdftoppm (stdin to stdout, no temp files)."""
+    pdftoppm = shutil.which('pdftoppm')
+    if pdftoppm is None:
+        raise PreviewError("pdftoppm (poppler-utils) is not installed")
+    try:
+        result = subprocess.run(
+            [pdftoppm, '-f', '1', '-l', '1', '-singlefile', '-png', '-scale-to', str(size), '-'],
+            input=data, capture_output=True, timeout=PDF_RENDER_TIMEOUT,
+        )
+    except subprocess.TimeoutExpired:
+        raise PreviewError("pdftoppm timed out")
+    if result.returncode != 0 or not result.stdout:
+        raise PreviewError(f"pdftoppm failed: {result.stderr.decode(errors='replace').strip()}")
+    return _flatten(Image.open(io.BytesIO(result.stdout)))
+
+
+def _derivatives(source_type: str, data: bytes):
+    """(kind, image) pairs to store for a document, largest first."""
+    if source_type == 'application/pdf':
+        page = _render_pdf_page(data, PREVIEW_SIZE)
+        return [('preview', page), ('thumbnail', page)]
+
+    image = _open_image(data, DISPLAY_SIZE)
+    derivatives = []
+    display_max_bytes = getattr(settings, 'DOCUMENT_DISPLAY_MAX_BYTES', 1024 * 1024)
+    if len(data) > display_max_bytes or max(image.size) > DISPLAY_SIZE:
+        derivatives.append(('display', image))
+    derivatives += [('preview', image), ('thumbnail', image)]
+    return derivatives
+
+
+def render_previews(document) -> List:
+    """
+    Render and store a document's previews, replacing any it already has.
+
+    Returns:
+        The document's DocumentPreviews
+
+    Raises:
+        PreviewError: If the document isn't an image or PDF, or can't be rendered
+    """
+    from .encryption import FileEncryption
+    from .models import DocumentPreview
+
+    # Legacy rows have no MIME type recorded
+    source_type = document.mime_type or guess_mime_type(document.filename or '')
+    if source_type not in PREVIEWABLE_MIME_TYPES:
+        raise PreviewError(f"Can't preview {source_type} documents")
+
+    data = read_document(document)
+    try:
+        derivatives = _derivatives(source_type, data)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise PreviewError(f"Can't read image: {e}")
+    del data
+
+    output_format = _output_format()
+    extension = '.webp' if output_format == 'WEBP' else '.jpg'
+    mime_type = 'image/webp' if output_format == 'WEBP' else 'image/jpeg'
+    storage = get_document_storage()
+    limits = {'display': DISPLAY_SIZE, 'preview': PREVIEW_SIZE, 'thumbnail': THUMBNAIL_SIZE}
+    existing = {preview.kind: preview for preview in document.previews.all()}
+
+    previews = []
+    image = None
+    for kind, source in derivatives:
+        # Each size is scaled down from the one before it rather than from the full-size original
+        image = (source if image is None else image).copy()
+        image.thumbnail((limits[kind], limits[kind]), Image.LANCZOS, reducing_gap=3.0)
+        encoded = _encode(image, output_format)
+
+        name = f"{document.id}_{kind}{extension}"
+        if document.encrypted:
+            key = shard_key(f"{name}.enc")
+            storage.save(key, FileEncryption.encrypt_chunks([encoded]), 'application/octet-stream')
+        else:
+            key = shard_key(name)
+            storage.save(key, [encoded], mime_type)
+
+        preview, _ = DocumentPreview.objects.update_or_create(
+            document=document, kind=kind,
+            defaults={
+                'storage_key': key,
+                'mime_type': mime_type,
+                'width': image.size[0],
+                'height': image.size[1],
+                'file_size': len(encoded),
+                'file_sha256': hashlib.sha256(encoded).hexdigest(),
+                'encrypted': document.encrypted,
+            },
+        )
+        previews.append(preview)
+        replaced = existing.pop(kind, None)
+        if replaced is not None and replaced.storage_key != key:
+            storage.delete(replaced.storage_key)  # written in another format
+
+    # A kind no longer rendered (e.g. 'display' after DOCUMENT_DISPLAY_MAX_BYTES was raised)
+    for preview in existing.values():
+        storage.delete(preview.storage_key)
+        preview.delete()
+    return previews
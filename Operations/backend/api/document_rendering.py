@@ -0,0 +1,352 @@
+"""
+Parallel PDF rendering for trip documents.
+
+Every trip document is an independent, CPU-bound PDF form fill. Generators
+build a RenderTask per document up front from data they have already loaded,
+then render them all together in a process pool, so a trip packet takes
+about as long as its slowest document instead of the sum of all of them.
+
+Generated documents are content-addressed: a task's hash covers its input
+data, document type and name, the template file and RENDER_VERSION, and the
+Document is recorded with that hash. render_documents() returns the trip's
+existing Document for a hash whose file is still in storage instead of
+rendering it again, so regenerating an unchanged trip is instant and doesn't
+add files or Document rows.
+
+Each render writes its own temporary file in the output directory, so
+concurrent renders of the same inputs (a user clicking while pre-generation
+runs) never write to the same path, and a failed render leaves nothing
+behind. Once rendering has finished, new PDFs are moved into document storage
+(api/document_storage.py) and their Document rows created in one bulk insert,
+holding a lock on each (trip, hash) and checking again for a document stored
+meanwhile, so the same render is never stored twice.
+
+The pool is for the job workers (trip document pre-generation) and threaded
+servers. Under gevent (the production gunicorn worker class) the pool's
+management thread and pipes would run on monkey-patched threading, and every
+web worker would keep its own idle render processes, orphaned when
+--max-requests recycles it; so there documents render in-process unless
+DOCUMENT_RENDER_WORKERS says otherwise. A process shuts its pool down at
+exit.
+
+Pool worker processes import this module, so it must not touch Django at
+import time.
+"""
+
+import atexit
+import dataclasses
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bump when a populate_*_pdf field mapping changes, so documents rendered by
+# the old mapping are regenerated rather than reused
+RENDER_VERSION = 1
+
+
+_template_digests: Dict[str, Tuple[float, str]] = {}
+
+
+def _template_digest(path: str) -> str:
+    """SHA-256 of a template file, cached until the file changes."""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return ''
+    cached = _template_digests.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    _template_digests[path] = (mtime, digest)
+    return digest
+
+
+def input_hash(populate: Callable, template_path: str, data: Any, document_type: str, name: str) -> str:
+    """Hash of everything a rendered document depends on."""
+    if dataclasses.is_dataclass(data):
+        data = dataclasses.asdict(data)
+    payload = json.dumps({
+        'version': RENDER_VERSION,
+        'populate': f"{populate.__module__}.{populate.__qualname__}",
+        'template': _template_digest(template_path),
+        'document_type': document_type,
+        'name': name,
+        'data': data,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+@dataclass
+class RenderTask:
+    """
+    One PDF to render: a module-level populate_*_pdf function and its data.
+
+    The Document is named "<name>-<hash prefix>.pdf"; the file is rendered to
+    a temporary file in output_dir.
+    """
+    populate: Callable[[str, str, Any], bool]
+    template_path: str
+    output_dir: str
+    name: str
+    data: Any
+    document_type: str
+    meta: Dict[str, Any] = field(default_factory=dict)  # extra fields for the API response
+    content_hash: str = ''
+
+    def __post_init__(self):
+        if not self.content_hash:
+            self.content_hash = input_hash(self.populate, self.template_path, self.data, self.document_type, self.name)
+
+    @property
+    def filename(self) -> str:
+        return f"{self.name}-{self.content_hash[:16]}.pdf"
+
+
+@dataclass
+class RenderResult:
+    task: RenderTask
+    success: bool
+    error: str = ''
+    document: Any = None  # the Document, once created or found
+    reused: bool = False  # an existing document was returned instead of rendering
+    path: str = ''  # the rendered file, until it's moved into storage
+
+
+def render(task: RenderTask) -> Tuple[bool, str, str]:
+    """
+    Render one task to a new temporary file in its output directory.
+
+    Returns:
+        Tuple of (success, error message, path of the rendered file); the
+        file is the caller's to move or delete, and is removed on failure
+    """
+    os.makedirs(task.output_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=task.output_dir, prefix=f".{task.name}-", suffix='.pdf')
+    os.close(fd)
+    try:
+        if task.populate(task.template_path, path, task.data):
+            return True, '', path
+        error = f"Could not fill {os.path.basename(task.template_path)}"
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    if os.path.exists(path):
+        os.unlink(path)
+    return False, error, ''
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker():
+    # Parse the form templates once when the worker starts rather than on its first render
+    from documents.templates.pdf_forms import preload_templates
+    preload_templates()
+
+
+def _gevent_patched() -> bool:
+    """Whether gevent has monkey-patched threading in this process."""
+    monkey = sys.modules.get('gevent.monkey')
+    return monkey is not None and monkey.is_module_patched('threading')
+
+
+def default_render_workers() -> int:
+    """Render processes when DOCUMENT_RENDER_WORKERS is unset: min(4, CPUs), or 1 (in-process) under gevent."""
+    if _gevent_patched():
+        return 1
+    return min(4, os.cpu_count() or 1)
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn rather than fork: the web process has threads (and DB connections) a fork would copy
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=_init_worker)
+            atexit.register(_discard_pool)
+        return _pool
+
+
+def _discard_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def render_all(tasks: List[RenderTask], max_workers: Optional[int] = None) -> List[RenderResult]:
+    """
+    Render tasks concurrently in the shared process pool.
+
+    A single task, or DOCUMENT_RENDER_WORKERS <= 1 (the default under
+    gevent), renders in-process. If the pool breaks (a worker was killed),
+    the batch is rendered in-process and a fresh pool is started next time.
+
+    Returns:
+        One RenderResult per task, in task order
+    """
+    if not tasks:
+        return []
+    if max_workers is None:
+        from django.conf import settings
+        max_workers = getattr(settings, 'DOCUMENT_RENDER_WORKERS', None) or default_render_workers()
+
+    if len(tasks) == 1 or max_workers <= 1:
+        outcomes = [render(task) for task in tasks]
+    else:
+        try:
+            outcomes = list(_get_pool(max_workers).map(render, tasks))
+        except BrokenProcessPool:
+            logger.warning("Document render pool broke; rendering %d documents in-process", len(tasks))
+            _discard_pool()
+            outcomes = [render(task) for task in tasks]
+
+    results = [RenderResult(task, success, error, path=path) for task, (success, error, path) in zip(tasks, outcomes)]
+    for result in results:
+        if not result.success:
+            logger.error("Failed to render %s: %s", result.task.filename, result.error)
+    return results
+
+
+def discard(results: List[RenderResult]):
+    """Remove files written by a batch that is being abandoned (reused documents are kept)."""
+    for result in results:
+        if result.path and os.path.exists(result.path):
+            os.unlink(result.path)
+        result.path = ''
+
+
+def _lock_hashes(trip, hashes):
+    """
+    Hold a lock on each (trip, hash) until the transaction ends, so two
+    processes storing the same render take turns.
+
+    A Postgres advisory lock, like the scheduler's leader_lock; other
+    databases (local development on SQLite) have no cross-process lock.
+    """
+    from django.db import connection
+
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for content_hash in sorted(hashes):  # a fixed order, so two batches can't deadlock
+            name = f"render:{trip.pk if trip is not None else ''}:{content_hash}"
+            key = int.from_bytes(hashlib.sha256(name.encode()).digest()[:8], 'big', signed=True)
+            cursor.execute("SELECT pg_advisory_xact_lock(%s)", [key])
+
+
+def find_existing(tasks: List[RenderTask], trip=None) -> Dict[str, Any]:
+    """
+    The trip's documents already generated with these tasks' hashes whose
+    files are still in storage.
+
+    Returns:
+        Dict of content_hash -> Document
+    """
+    from .document_storage import document_file_exists
+    from .models import Document
+
+    hashes = {task.content_hash for task in tasks}
+    existing = {}
+    for document in Document.objects.filter(content_hash__in=hashes, trip=trip).order_by('created_on'):
+        if document.content_hash not in existing and document_file_exists(document):
+            existing[document.content_hash] = document
+    return existing
+
+
+def create_documents(results: List[RenderResult], trip=None, created_by=None):
+    """
+    Move the successful new renders into document storage, create their
+    Document rows in one bulk insert, and set each on its result.
+
+    A render another process stored while this one was rendering gets that
+    Document instead (marked reused) and its own file is dropped.
+
+    Returns:
+        The created Documents, in result order
+    """
+    from django.db import transaction
+
+    from .document_storage import store_document_file
+    from .models import Document
+
+    pending = [result for result in results if result.success and result.document is None]
+    if not pending:
+        return []
+    with transaction.atomic():
+        _lock_hashes(trip, {result.task.content_hash for result in pending})
+        existing = find_existing([result.task for result in pending], trip)
+        created, documents = [], []
+        for result in pending:
+            document = existing.get(result.task.content_hash)
+            if document is not None:
+                result.document, result.reused = document, True
+                discard([result])
+                continue
+            document = Document(
+                filename=result.task.filename,
+                document_type=result.task.document_type,
+                content_hash=result.task.content_hash,
+                trip=trip,
+                created_by=created_by,
+            )
+            store_document_file(document, result.path)
+            result.path = ''
+            created.append(result)
+            documents.append(document)
+        documents = Document.objects.bulk_create(documents)
+    for result, document in zip(created, documents):
+        result.document = document
+    return documents
+
+
+def render_documents(tasks: List[RenderTask], trip=None, created_by=None, atomic=False) -> List[RenderResult]:
+    """
+    Return existing documents for unchanged inputs and render the rest.
+
+    Args:
+        tasks: Documents to generate
+        trip: Trip the documents belong to
+        created_by: User recorded on new Documents
+        atomic: Keep no new documents unless every task succeeds
+
+    Returns:
+        One RenderResult per task, in task order, with .document set on
+        each successful one
+    """
+    existing = find_existing(tasks, trip)
+
+    # Tasks with the same hash produce the same file; render it once
+    pending: Dict[str, RenderTask] = {}
+    for task in tasks:
+        if task.content_hash not in existing:
+            pending.setdefault(task.content_hash, task)
+    rendered = {result.task.content_hash: result for result in render_all(list(pending.values()))}
+
+    results = [
+        RenderResult(task, True, document=existing[task.content_hash], reused=True)
+        if task.content_hash in existing else rendered[task.content_hash]
+        for task in tasks
+    ]
+
+    new_results = list(rendered.values())
+    if atomic and any(not result.success for result in new_results):
+        discard(new_results)
+        return results
+
+    create_documents(new_results, trip=trip, created_by=created_by)
+    return results
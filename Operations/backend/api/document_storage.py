@@ -0,0 +1,417 @@
+"""
+Storage for document files.
+
+Documents keep their bytes in a storage backend and only metadata in the
+database: Document.storage_key (a relative key), size, SHA-256 and MIME type.
+Patient documents are stored encrypted (Document.encrypted; see
+FileEncryption in api/encryption.py).
+Document.content and absolute Document.file_path values are legacy;
+`manage.py migrate_document_blobs` moves both into storage.
+
+Keys are sharded by a hash of the file name into two directory levels
+("3f/a2/<document id>.pdf"), so no directory grows past a few hundred
+entries however many documents there are, and listings, backups and rsyncs
+stay fast. Rendered documents (those with a content_hash) are named by that
+hash instead, so identical renders share one file; it is deleted with the
+last Document that refers to it.
+
+Backends (DOCUMENT_STORAGE_BACKEND):
+
+- 'local': files under DOCUMENT_STORAGE_DIR. Writes go through a temporary
+  file in the target directory, so a stored file is either complete or absent.
+- 's3': an S3-compatible bucket (AWS S3, or MinIO via DOCUMENT_S3_ENDPOINT_URL),
+  shared by every container. Requires the boto3 package. Downloads redirect to
+  a short-lived presigned URL, so the bytes never pass through Django.
+
+`python manage.py check_document_storage` round-trips a file through the
+configured backend.
+"""
+
+import hashlib
+import mimetypes
+import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import BinaryIO, Iterable, Iterator, Optional, Tuple, Union
+
+from django.conf import settings
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class StorageError(Exception):
+    """Exception raised for document storage errors."""
+    pass
+
+
+@dataclass
+class StoredFile:
+    key: str
+    size: int
+    sha256: str
+    mime_type: str
+
+
+def guess_mime_type(filename: str) -> str:
+    return mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+
+def shard_key(name: str) -> str:
+    """Storage key for a file name, under two levels of hash-sharded directories."""
+    digest = hashlib.sha256(name.encode()).hexdigest()
+    return f"{digest[:2]}/{digest[2:4]}/{name}"
+
+
+def _read_chunks(f: BinaryIO):
+    for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+        yield chunk
+
+
+class BaseDocumentStorage(ABC):
+    """Abstract base class for document storage backends."""
+
+    @abstractmethod
+    def save(self, key: str, chunks: Iterable[bytes], mime_type: str) -> Tuple[int, str]:
+        """Store chunks under key, replacing any existing file. Returns (size, sha256)."""
+        pass
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        """Open a stored file for reading."""
+        pass
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        pass
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Delete a stored file; a missing file is not an error."""
+        pass
+
+    def save_file(self, key: str, path: str, mime_type: str) -> Tuple[int, str]:
+        """Move a local file into storage. Returns (size, sha256)."""
+        with open(path, 'rb') as f:
+            result = self.save(key, _read_chunks(f), mime_type)
+        os.unlink(path)
+        return result
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Filesystem path of a stored file, for backends that have one."""
+        return None
+
+    def url(self, key: str, filename: str, content_type: str, as_attachment: bool = True) -> Optional[str]:
+        """A short-lived URL a client can download the file from directly, for backends that have one."""
+        return None
+
+
+class LocalDocumentStorage(BaseDocumentStorage):
+    """Files in a directory on the local filesystem (or a volume shared by the containers)."""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def local_path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise StorageError(f"Storage key {key!r} is outside the storage directory")
+        return path
+
+    def save(self, key: str, chunks: Iterable[bytes], mime_type: str) -> Tuple[int, str]:
+        path = self.local_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.storing-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    digest.update(chunk)
+                    size += len(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        return size, digest.hexdigest()
+
+    def save_file(self, key: str, path: str, mime_type: str) -> Tuple[int, str]:
+        target = self.local_path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in _read_chunks(f):
+                digest.update(chunk)
+        size = os.path.getsize(path)
+        try:
+            # Same filesystem: a rename, no copy
+            os.replace(path, target)
+        except OSError:
+            shutil.move(path, target)
+        return size, digest.hexdigest()
+
+    def open(self, key: str) -> BinaryIO:
+        try:
+            return open(self.local_path(key), 'rb')
+        except FileNotFoundError:
+            raise StorageError(f"Stored file {key} not found")
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self.local_path(key))
+
+    def delete(self, key: str):
+        try:
+            os.unlink(self.local_path(key))
+        except FileNotFoundError:
+            pass
+
+
+class S3DocumentStorage(BaseDocumentStorage):
+    """
+    Files in an S3-compatible bucket.
+    Requires boto3 package.
+    """
+
+    def __init__(self, bucket: str, prefix: str = '', endpoint_url: Optional[str] = None,
+                 region_name: Optional[str] = None, access_key_id: Optional[str] = None,
+                 secret_access_key: Optional[str] = None, url_expiry: int = 300):
+        try:
+            import boto3
+            from botocore.config import Config
+        except ImportError:
+            raise StorageError("boto3 package required for S3 document storage")
+
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.url_expiry = url_expiry
+        self.client = boto3.client(
+            's3',
+            endpoint_url=endpoint_url or None,
+            region_name=region_name or None,
+            aws_access_key_id=access_key_id or None,
+            aws_secret_access_key=secret_access_key or None,
+            # Path-style addressing works with MinIO and other S3-compatible servers
+            config=Config(signature_version='s3v4', s3={'addressing_style': 'path'},
+                          max_pool_connections=getattr(settings, 'DOCUMENT_S3_MAX_CONNECTIONS', 20)),
+        )
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def save(self, key: str, chunks: Iterable[bytes], mime_type: str) -> Tuple[int, str]:
+        digest = hashlib.sha256()
+        size = 0
+        # Spool to memory (or disk, past 8 MB) so the upload knows its length and can retry
+        with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as spool:
+            for chunk in chunks:
+                spool.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+            spool.seek(0)
+            try:
+                self.client.upload_fileobj(spool, self.bucket, self._object_key(key), ExtraArgs={
+                    'ContentType': mime_type,
+                    'Metadata': {'sha256': digest.hexdigest()},
+                })
+            except Exception as e:
+                raise StorageError(f"Failed to upload {key}: {e}")
+        return size, digest.hexdigest()
+
+    def open(self, key: str) -> BinaryIO:
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._object_key(key))['Body']
+        except Exception as e:
+            raise StorageError(f"Failed to open {key}: {e}")
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise StorageError(f"Failed to look up {key}: {e}")
+
+    def delete(self, key: str):
+        try:
+            self.client.delete_object(Bucket=self.bucket, Key=self._object_key(key))
+        except Exception as e:
+            raise StorageError(f"Failed to delete {key}: {e}")
+
+    def url(self, key: str, filename: str, content_type: str, as_attachment: bool = True) -> str:
+        from django.utils.http import content_disposition_header
+
+        return self.client.generate_presigned_url('get_object', Params={
+            'Bucket': self.bucket,
+            'Key': self._object_key(key),
+            'ResponseContentType': content_type,
+            'ResponseContentDisposition': content_disposition_header(as_attachment, filename),
+        }, ExpiresIn=self.url_expiry)
+
+
+_storage = None
+
+
+def get_document_storage() -> BaseDocumentStorage:
+    """The configured storage backend (created on first use)."""
+    global _storage
+    if _storage is None:
+        backend = getattr(settings, 'DOCUMENT_STORAGE_BACKEND', 'local')
+        if backend == 'local':
+            _storage = LocalDocumentStorage(
+                getattr(settings, 'DOCUMENT_STORAGE_DIR', os.path.join(settings.BASE_DIR, 'documents', 'stored'))
+            )
+        elif backend == 's3':
+            bucket = getattr(settings, 'DOCUMENT_S3_BUCKET', '')
+            if not bucket:
+                raise StorageError("DOCUMENT_S3_BUCKET setting required for S3 document storage")
+            _storage = S3DocumentStorage(
+                bucket,
+                prefix=getattr(settings, 'DOCUMENT_S3_PREFIX', ''),
+                endpoint_url=getattr(settings, 'DOCUMENT_S3_ENDPOINT_URL', None),
+                region_name=getattr(settings, 'DOCUMENT_S3_REGION', None),
+                access_key_id=getattr(settings, 'DOCUMENT_S3_ACCESS_KEY_ID', None),
+                secret_access_key=getattr(settings, 'DOCUMENT_S3_SECRET_ACCESS_KEY', None),
+                url_expiry=getattr(settings, 'DOCUMENT_S3_URL_EXPIRY', 300),
+            )
+        else:
+            raise StorageError(f"Unsupported document storage backend: {backend}")
+    return _storage
+
+
+def storage_name(document, encrypted: bool = False) -> str:
+    """File name for a document's bytes: its id, keeping the original extension."""
+    name = f"{document.id}{os.path.splitext(document.filename or '')[1].lower()}"
+    return f"{name}.enc" if encrypted else name
+
+
+def _set_stored(document, key: str, size: int, sha256: str, mime_type: str, encrypted: bool = False):
+    document.storage_key = key
+    document.file_path = None
+    document.file_size = size
+    document.file_sha256 = sha256
+    document.mime_type = mime_type
+    document.encrypted = encrypted
+    return StoredFile(key, size, sha256, mime_type)
+
+
+def store_document(document, content: Union[bytes, Iterable[bytes]], encrypt: bool = False) -> StoredFile:
+    """
+    Write a document's bytes to storage and set its key and metadata
+    (the caller saves the document).
+
+    With encrypt, the bytes are encrypted as they stream through
+    (FileEncryption), so memory use doesn't grow with the file. Size, SHA-256
+    and MIME type always describe the plaintext.
+    """
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        content = [bytes(content)]
+    key = shard_key(storage_name(document, encrypt))
+    mime_type = guess_mime_type(document.filename or key)
+    if not encrypt:
+        size, sha256 = get_document_storage().save(key, content, mime_type)
+        return _set_stored(document, key, size, sha256, mime_type)
+
+    from .encryption import FileEncryption
+
+    digest = hashlib.sha256()
+    size = 0
+
+    def measured():
+        nonlocal size
+        for chunk in content:
+            digest.update(chunk)
+            size += len(chunk)
+            yield chunk
+
+    get_document_storage().save(key, FileEncryption.encrypt_chunks(measured()), 'application/octet-stream')
+    return _set_stored(document, key, size, digest.hexdigest(), mime_type, encrypted=True)
+
+
+def store_document_file(document, path: str) -> StoredFile:
+    """
+    Move a file written locally (e.g. a rendered PDF) into storage as a
+    document's bytes. A generated document is stored under its content hash,
+    so identical renders share one file.
+    """
+    name = storage_name(document)
+    if document.content_hash:
+        name = f"{document.content_hash}{os.path.splitext(name)[1]}"
+    key = shard_key(name)
+    mime_type = guess_mime_type(document.filename or key)
+    size, sha256 = get_document_storage().save_file(key, path, mime_type)
+    return _set_stored(document, key, size, sha256, mime_type)
+
+
+def legacy_path(document) -> Optional[str]:
+    """Absolute path of a document stored outside the storage backend, if its file exists
+    (relative legacy paths, as patient uploads used, are under MEDIA_ROOT)."""
+    if not document.file_path:
+        return None
+    path = document.file_path
+    if not os.path.isabs(path):
+        path = os.path.join(settings.MEDIA_ROOT, path)
+    return path if os.path.isfile(path) else None
+
+
+def document_chunks(document) -> Iterator[bytes]:
+    """
+    Yield a document's bytes (decrypted if stored encrypted) a chunk at a
+    time, wherever they are stored.
+
+    Raises:
+        StorageError: If the document has no stored bytes
+    """
+    if document.storage_key:
+        stream = get_document_storage().open(document.storage_key)
+        try:
+            if document.encrypted:
+                from .encryption import FileEncryption
+                yield from FileEncryption.decrypt_stream(stream)
+            else:
+                yield from _read_chunks(stream)
+        finally:
+            stream.close()
+        return
+    path = legacy_path(document)
+    if path:
+        with open(path, 'rb') as f:
+            yield from _read_chunks(f)
+        return
+    if document.content:
+        yield bytes(document.content)
+        return
+    raise StorageError(f"Document {document.id} has no stored file")
+
+
+def read_document(document) -> bytes:
+    """A document's bytes (decrypted if stored encrypted), wherever they are stored."""
+    return b''.join(document_chunks(document))
+
+
+def document_file_exists(document) -> bool:
+    if document.storage_key:
+        return get_document_storage().exists(document.storage_key)
+    return legacy_path(document) is not None
+
+
+def delete_document_file(document):
+    """Remove a document's stored file and previews (the rows are the caller's to delete)."""
+    storage = get_document_storage()
+    for preview_key in document.previews.values_list('storage_key', flat=True):
+        storage.delete(preview_key)
+    if document.storage_key:
+        # Identical generated documents share a file
+        shared = type(document).objects.filter(storage_key=document.storage_key).exclude(pk=document.pk)
+        if not shared.exists():
+            storage.delete(document.storage_key)
+    else:
+        path = legacy_path(document)
+        if path:
+            os.remove(path)
@@ -229,6 +229,140 @@ class FieldEncryption:
         return hmac_hash
 
 
+class FileEncryption:
+    """
+    Streaming authenticated encryption for document files.
+
+    Files are split into fixed-size chunks, each sealed with AES-GCM under its
+    own nonce, so files of any size are encrypted and decrypted with constant
+    memory and a byte range can be decrypted without reading what precedes
+    it. The key comes from FieldEncryption's key management; each file uses a
+    subkey derived from it with HKDF and a random per-file salt.
+
+    Layout: header, then one sealed chunk (ciphertext + 16-byte tag) per
+    chunk_size bytes of plaintext; the last may be shorter, or empty.
+
+        magic 'JETF' | version (1) | chunk_size (4) | salt (16) | nonce prefix (7) | key_id length (1) | key_id
+
+    A chunk's nonce is the prefix, its index (4 bytes) and a final-chunk flag
+    (1 byte), and the header is its associated data, so chunks can't be
+    reordered, dropped, truncated or moved between files undetected.
+    """
+
+    MAGIC = b'JETF'
+    VERSION = 1
+    DEFAULT_CHUNK_SIZE = 64 * 1024
+    SALT_SIZE = 16
+    NONCE_PREFIX_SIZE = 7
+    TAG_SIZE = 16
+
+    @classmethod
+    def _file_key(cls, key_id: str, salt: bytes) -> bytes:
+        from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+        return HKDF(
+            algorithm=hashes.SHA256(), length=FieldEncryption.DEFAULT_DEK_SIZE, salt=salt, info=b'jet-document-file'
+        ).derive(FieldEncryption.get_encryption_key(key_id))
+
+    @classmethod
+    def _nonce(cls, prefix: bytes, index: int, final: bool) -> bytes:
+        return prefix + index.to_bytes(4, 'big') + (b'\x01' if final else b'\x00')
+
+    @classmethod
+    def encrypt_chunks(cls, chunks, key_id: Optional[str] = None, chunk_size: Optional[int] = None):
+        """
+        Encrypt a stream of plaintext chunks of any size.
+
+        Yields:
+            The header, then one sealed chunk per chunk_size bytes of plaintext
+        """
+        key_id = key_id or 'default'
+        chunk_size = chunk_size or cls.DEFAULT_CHUNK_SIZE
+        salt = os.urandom(cls.SALT_SIZE)
+        prefix = os.urandom(cls.NONCE_PREFIX_SIZE)
+        encoded_key_id = key_id.encode('utf-8')
+        header = (cls.MAGIC + bytes([cls.VERSION]) + chunk_size.to_bytes(4, 'big') + salt + prefix
+                  + bytes([len(encoded_key_id)]) + encoded_key_id)
+        aesgcm = AESGCM(cls._file_key(key_id, salt))
+        yield header
+
+        buffer = bytearray()
+        index = 0
+        for chunk in chunks:
+            buffer += chunk
+            # Keep at least one byte back: only the last chunk may be sealed as final
+            while len(buffer) > chunk_size:
+                yield aesgcm.encrypt(cls._nonce(prefix, index, False), bytes(buffer[:chunk_size]), header)
+                del buffer[:chunk_size]
+                index += 1
+        yield aesgcm.encrypt(cls._nonce(prefix, index, True), bytes(buffer), header)
+
+    @classmethod
+    def _read_header(cls, f):
+        fixed = f.read(len(cls.MAGIC) + 1 + 4 + cls.SALT_SIZE + cls.NONCE_PREFIX_SIZE + 1)
+        if len(fixed) < len(cls.MAGIC) + 1 or fixed[:len(cls.MAGIC)] != cls.MAGIC:
+            raise EncryptionError("Not an encrypted document file")
+        if fixed[len(cls.MAGIC)] != cls.VERSION:
+            raise EncryptionError(f"Unsupported file encryption version: {fixed[len(cls.MAGIC)]}")
+        position = len(cls.MAGIC) + 1
+        chunk_size = int.from_bytes(fixed[position:position + 4], 'big')
+        position += 4
+        salt = fixed[position:position + cls.SALT_SIZE]
+        position += cls.SALT_SIZE
+        prefix = fixed[position:position + cls.NONCE_PREFIX_SIZE]
+        encoded_key_id = f.read(fixed[-1])
+        header = fixed + encoded_key_id
+        aesgcm = AESGCM(cls._file_key(encoded_key_id.decode('utf-8'), salt))
+        return header, chunk_size, prefix, aesgcm
+
+    @classmethod
+    def decrypt_stream(cls, f, start: int = 0, end: Optional[int] = None):
+        """
+        Decrypt an encrypted file, or the plaintext byte range start..end
+        (inclusive), from a binary file object.
+
+        Seekable files skip straight to the first chunk of the range; others
+        are read through. Raises EncryptionError if any chunk read fails to
+        authenticate, or the file ends before its final chunk.
+
+        Yields:
+            Plaintext chunks
+        """
+        header, chunk_size, prefix, aesgcm = cls._read_header(f)
+        sealed_size = chunk_size + cls.TAG_SIZE
+        index = start // chunk_size
+        if index:
+            if getattr(f, 'seekable', lambda: False)():
+                f.seek(len(header) + index * sealed_size)
+            else:
+                for _ in range(index):
+                    if len(f.read(sealed_size)) != sealed_size:
+                        raise EncryptionError("Encrypted file is truncated")
+        skip = start - index * chunk_size
+        remaining = None if end is None else end - start + 1
+
+        sealed = f.read(sealed_size)
+        while True:
+            following = f.read(sealed_size) if len(sealed) == sealed_size else b''
+            final = not following
+            try:
+                plaintext = aesgcm.decrypt(cls._nonce(prefix, index, final), sealed, header)
+            except Exception:
+                raise EncryptionError(f"Encrypted file chunk {index} failed authentication")
+            if skip:
+                plaintext = plaintext[skip:]
+                skip = 0
+            if remaining is not None:
+                plaintext = plaintext[:remaining]
+                remaining -= len(plaintext)
+            if plaintext:
+                yield plaintext
+            if final or remaining == 0:
+                return
+            sealed = following
+            index += 1
+
+
 class EncryptedFieldMixin:
     """Base mixin for encrypted fields with common functionality."""
 
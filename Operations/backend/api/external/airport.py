@@ -1,13 +1,14 @@
 import requests
 from bs4 import BeautifulSoup
 
-def get_flight_aware(request):
-    url = f"https://flightaware.com/{request}"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/113.0.0.0 Safari/537.36"
-    }
+from utils.services.http_client import get_client
 
-    response = requests.get(url, headers=headers)
+def get_flight_aware(request):
+    try:
+        response = get_client('flightaware').get(request)
+    except requests.RequestException as e:
+        print(f"Failed to retrieve data: {e}")
+        return None
     if response.status_code != 200:
         print(f"Failed to retrieve data. Status code: {response.status_code}")
         return None
@@ -0,0 +1,277 @@
+"""
+Conditional, ranged and nginx-offloaded file responses for document downloads.
+
+Download views check access and hand the document to serve_document(), which:
+
+- answers If-None-Match / If-Modified-Since with 304 before touching the file,
+  using a strong ETag derived from the file's mtime and size, in the same
+  format nginx uses for static files, so the ETag a client holds is valid
+  whichever of the two served it;
+- with DOCUMENT_ACCEL_REDIRECT on, returns an empty response carrying an
+  X-Accel-Redirect header for files under one of DOCUMENT_ACCEL_LOCATIONS.
+  nginx then sends the file from an internal location itself (sendfile, Range,
+  conditional requests), so a download costs the app worker one small
+  response however large the file is;
+- otherwise streams the file (or a DB-stored blob) from Django, honouring a
+  single byte range ("Range: bytes=...") and If-Range.
+
+Files in remote (S3) storage are redirected to a presigned URL instead; the
+object store handles ranges and ETags for those. Encrypted files are always
+decrypted by Django as they stream out, one chunk at a time.
+
+Multi-range requests are answered with the whole file, which RFC 9110 allows.
+"""
+
+import hashlib
+import os
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date
+
+CHUNK_SIZE = 64 * 1024
+
+# Downloads hold PHI: browsers may keep a private copy but must revalidate it
+CACHE_CONTROL = 'private, no-cache'
+
+
+def file_etag(stat: os.stat_result) -> str:
+    """Strong ETag for a file, formatted the way nginx formats its own."""
+    return '"%x-%x"' % (int(stat.st_mtime), stat.st_size)
+
+
+def content_etag(content: bytes) -> str:
+    return '"%s"' % hashlib.sha256(content).hexdigest()
+
+
+def _accel_uri(path: str) -> Optional[str]:
+    """The internal nginx URI for a file, if it lies under an X-Accel location."""
+    if not getattr(settings, 'DOCUMENT_ACCEL_REDIRECT', False):
+        return None
+    real_path = os.path.realpath(path)
+    for root, location in getattr(settings, 'DOCUMENT_ACCEL_LOCATIONS', {}).items():
+        root = os.path.realpath(root)
+        if real_path.startswith(root + os.sep):
+            relative = os.path.relpath(real_path, root).replace(os.sep, '/')
+            return location.rstrip('/') + '/' + quote(relative)
+    return None
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single "bytes=" range against a resource of `size` bytes.
+
+    Returns:
+        (start, end) inclusive, None to serve the whole resource (absent,
+        malformed or multi-range header), or (size, size) when the range
+        can't be satisfied
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    start, sep, end = header[len('bytes='):].strip().partition('-')
+    if not sep:
+        return None
+    try:
+        if not start:
+            # Suffix range: the last N bytes
+            length = int(end)
+            if length <= 0:
+                return (size, size)
+            return (max(size - length, 0), size - 1)
+        start = int(start)
+        end = int(end) if end else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        return (size, size)
+    if start > end or start < 0:
+        return None
+    return (start, min(end, size - 1))
+
+
+def _read_range(f, start: int, length: int):
+    with f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _requested_range(request, etag: str, last_modified: float, size: int):
+    header = request.META.get('HTTP_RANGE')
+    if not header:
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    # A stale If-Range validator means the client's partial copy is outdated: send everything
+    if if_range and if_range != etag and if_range != http_date(last_modified):
+        return None
+    return parse_range(header, size)
+
+
+def _finish(response, filename: str, etag: str, last_modified: Optional[float], as_attachment: bool):
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = CACHE_CONTROL
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def serve_file(request, path: str, filename: str, content_type: str, as_attachment: bool = True):
+    """Respond with a file on disk: 304, X-Accel-Redirect, a 206 range or the whole file."""
+    stat = os.stat(path)
+    etag = file_etag(stat)
+    last_modified = int(stat.st_mtime)
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return _finish(not_modified, filename, etag, last_modified, as_attachment)
+
+    accel_uri = _accel_uri(path)
+    if accel_uri:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = accel_uri
+        return _finish(response, filename, etag, last_modified, as_attachment)
+
+    byte_range = _requested_range(request, etag, last_modified, stat.st_size)
+    if byte_range is None:
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    elif byte_range[0] >= stat.st_size:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(_read_range(open(path, 'rb'), start, end - start + 1),
+                                         status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        response['Content-Length'] = str(end - start + 1)
+    return _finish(response, filename, etag, last_modified, as_attachment)
+
+
+def serve_content(request, content: bytes, filename: str, content_type: str, as_attachment: bool = True):
+    """Respond with an in-memory blob: 304, a 206 range or the whole blob."""
+    content = bytes(content)
+    etag = content_etag(content)
+
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return _finish(not_modified, filename, etag, None, as_attachment)
+
+    byte_range = None
+    if request.META.get('HTTP_RANGE') and request.META.get('HTTP_IF_RANGE', etag) == etag:
+        byte_range = parse_range(request.META['HTTP_RANGE'], len(content))
+    if byte_range is None:
+        response = HttpResponse(content, content_type=content_type)
+    elif byte_range[0] >= len(content):
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{len(content)}'
+    else:
+        start, end = byte_range
+        response = HttpResponse(content[start:end + 1], status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{len(content)}'
+    return _finish(response, filename, etag, None, as_attachment)
+
+
+def _decrypting(stream, start: int = 0, end: Optional[int] = None):
+    from .encryption import FileEncryption
+
+    try:
+        yield from FileEncryption.decrypt_stream(stream, start, end)
+    finally:
+        stream.close()
+
+
+def serve_encrypted(request, document, content_type: str, as_attachment: bool = True):
+    """
+    Respond with an encrypted stored file, decrypting it as it streams out:
+    304, a 206 range (only the chunks covering it are decrypted) or the whole file.
+
+    Returns:
+        The response, or None if the stored file is missing
+    """
+    from .document_storage import StorageError, get_document_storage
+
+    etag = '"%s"' % document.file_sha256
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return _finish(not_modified, document.filename, etag, None, as_attachment)
+
+    size = document.file_size
+    byte_range = None
+    if request.META.get('HTTP_RANGE') and request.META.get('HTTP_IF_RANGE', etag) == etag:
+        byte_range = parse_range(request.META['HTTP_RANGE'], size)
+    if byte_range is not None and byte_range[0] >= size:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return _finish(response, document.filename, etag, None, as_attachment)
+
+    try:
+        stream = get_document_storage().open(document.storage_key)
+    except StorageError:
+        return None
+    if byte_range is None:
+        response = StreamingHttpResponse(_decrypting(stream), content_type=content_type)
+        response['Content-Length'] = str(size)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(_decrypting(stream, start, end), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    return _finish(response, document.filename, etag, None, as_attachment)
+
+
+def serve_stored(request, stored, content_type: str, as_attachment: bool = True):
+    """
+    Respond with a file in document storage, given anything carrying its
+    storage_key, encrypted flag, filename and plaintext size and SHA-256
+    (a Document or DocumentPreview). Files in remote storage are served by
+    redirecting to a short-lived URL, except encrypted ones, which are
+    decrypted here.
+
+    Returns:
+        The response, or None if the file is missing
+    """
+    from .document_storage import get_document_storage
+
+    if stored.encrypted:
+        return serve_encrypted(request, stored, content_type, as_attachment)
+    storage = get_document_storage()
+    path = storage.local_path(stored.storage_key)
+    if path is None:
+        url = storage.url(stored.storage_key, stored.filename, content_type, as_attachment)
+        if url:
+            response = HttpResponseRedirect(url)
+            response['Cache-Control'] = 'no-store'
+            return response
+    elif os.path.isfile(path):
+        return serve_file(request, path, stored.filename, content_type, as_attachment)
+    return None
+
+
+def serve_document(request, document, content_type: str = 'application/octet-stream', as_attachment: bool = True):
+    """
+    Respond with a Document's stored file (see serve_stored), legacy file or
+    DB-stored content.
+
+    Returns:
+        The response, or None if the document has none of them
+    """
+    from .document_storage import legacy_path
+
+    if document.storage_key:
+        response = serve_stored(request, document, content_type, as_attachment)
+        if response is not None:
+            return response
+    path = legacy_path(document)
+    if path:
+        return serve_file(request, path, document.filename, content_type, as_attachment)
+    if document.content:
+        return serve_content(request, document.content, document.filename, content_type, as_attachment)
+    return None
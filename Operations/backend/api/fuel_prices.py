@@ -0,0 +1,462 @@
+"""
+Fuel price service backed by FlightAware airport pages.
+
+Scraping an airport page takes a second or more, so prices are cached per
+airport for FUEL_PRICE_CACHE_TTL seconds. Concurrent requests for the same
+airport share a single in-flight fetch.
+
+Every scrape is also appended to the FuelPrice history, so quoting and
+document generation can read recent prices from the database. A lookup that
+misses the (per-process) cache uses a scrape from the history younger than
+the TTL before scraping again, so one process keeping the airports on
+upcoming trips warm - the scheduler's warm_fuel_prices task - serves every
+web worker. The optional in-process refresher (FUEL_PRICE_REFRESH_INTERVAL)
+is off by default: each process running it scrapes the same airports.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Avg, Count, Max, Min, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from lxml import html as lxml_html
+
+from utils.services.http_client import get_client
+
+logger = logging.getLogger(__name__)
+
+
+CACHE_KEY_PREFIX = 'fuel_prices:v1:'
+
+# Observations older than this are not treated as a current price
+LATEST_PRICE_MAX_AGE_DAYS = 7
+
+# Rows of the fuel table on a FlightAware airport page
+FUEL_ROW_XPATH = "//tr[contains(concat(' ', normalize-space(@class), ' '), ' fuel_facility ')]"
+JET_A_COLUMN = 6
+
+
+class FuelPriceUnavailable(Exception):
+    """Raised when prices for an airport cannot be fetched."""
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _cache_key(airport_code):
+    return f"{CACHE_KEY_PREFIX}{airport_code}"
+
+
+def normalize_code(airport_code):
+    return (airport_code or '').strip().upper()
+
+
+def fetch_fuel_prices(airport_code):
+    """
+    Scrape current Jet-A prices for an airport, bypassing the cache.
+
+    Returns:
+        List of {'fbo_name', 'jet_a_cost'} dicts
+
+    Raises:
+        FuelPriceUnavailable: On timeouts, connection errors or non-200 responses
+    """
+    base_url = _setting('FLIGHTAWARE_BASE_URL', 'https://flightaware.com').rstrip('/')
+    url = f"{base_url}/resources/airport/{airport_code}"
+    try:
+        response = get_client('flightaware').get(url, timeout=_setting('FUEL_PRICE_TIMEOUT', (3.05, 10)))
+    except requests.RequestException as e:
+        raise FuelPriceUnavailable(f"FlightAware request failed for {airport_code}: {e}") from e
+
+    if response.status_code != 200:
+        raise FuelPriceUnavailable(
+            f"FlightAware returned {response.status_code} for {airport_code}"
+        )
+
+    return parse_fuel_rows(response.content)
+
+
+def parse_fuel_rows(content):
+    """
+    Extract (FBO, Jet-A price) pairs from an airport page.
+
+    Only the fuel_facility rows are visited, using lxml's C parser and an
+    XPath query rather than walking a full BeautifulSoup tree.
+    """
+    try:
+        tree = lxml_html.fromstring(content)
+    except (ValueError, lxml_html.etree.ParserError):
+        return []
+
+    prices = []
+    for row in tree.xpath(FUEL_ROW_XPATH):
+        cells = row.xpath('./td')
+        links = row.xpath('.//a')
+        if not links or len(cells) <= JET_A_COLUMN:
+            continue
+        cost = cells[JET_A_COLUMN].text_content().strip()
+        if cost:
+            prices.append({'fbo_name': links[0].text_content().strip(), 'jet_a_cost': cost})
+    return prices
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into one execution.
+
+    The first caller runs the function; callers arriving while it is running
+    wait for and share its result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+_flight = SingleFlight()
+
+
+def in_worker_thread(fn, *args):
+    """Run fn in a pool thread, closing the thread's database connection afterwards."""
+    try:
+        return fn(*args)
+    finally:
+        connection.close()
+
+
+def _refresh(airport_code):
+    prices = fetch_fuel_prices(airport_code)
+    fetched_at = timezone.now()
+    entry = {
+        'airport_code': airport_code,
+        'fuel_prices': prices,
+        'fetched_at': fetched_at.isoformat(),
+    }
+    cache.set(_cache_key(airport_code), entry, _setting('FUEL_PRICE_CACHE_TTL', 1800))
+    try:
+        record_fuel_prices(airport_code, prices, fetched_at)
+    except Exception:
+        # History is best-effort; a failed insert must not fail the price lookup
+        logger.exception("Failed to record fuel price history for %s", airport_code)
+    return entry
+
+
+def get_fuel_prices(airport_code, force_refresh=False):
+    """
+    Cached fuel prices for an airport.
+
+    Args:
+        airport_code: ICAO (or other FlightAware) airport code
+        force_refresh: Skip the cache and scrape now
+
+    Returns:
+        Tuple of (entry, cached) where entry has 'airport_code', 'fuel_prices'
+        and 'fetched_at', and cached says whether it came from the cache
+
+    Raises:
+        FuelPriceUnavailable: If the airport is not cached and the scrape fails
+    """
+    airport_code = normalize_code(airport_code)
+    if not airport_code:
+        raise FuelPriceUnavailable("Airport code is required")
+
+    ensure_refresher_started()
+
+    if not force_refresh:
+        entry = cache.get(_cache_key(airport_code))
+        if entry is not None:
+            return entry, True
+        entry = stored_fuel_prices(airport_code)
+        if entry is not None:
+            age = (timezone.now() - datetime.fromisoformat(entry['fetched_at'])).total_seconds()
+            cache.set(_cache_key(airport_code), entry, max(int(_setting('FUEL_PRICE_CACHE_TTL', 1800) - age), 1))
+            return entry, True
+
+    return _flight.do(airport_code, lambda: _refresh(airport_code)), False
+
+
+def parse_price(text):
+    """Parse a scraped price like '$6.25' into a Decimal, or None."""
+    cleaned = (text or '').replace('$', '').replace(',', '').strip()
+    try:
+        price = Decimal(cleaned).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        return None
+    return price if price > 0 else None
+
+
+def record_fuel_prices(airport_code, prices, observed_at=None):
+    """
+    Append scraped prices to the FuelPrice history.
+
+    Prices are matched to the airport by ICAO code or ident, and to FBOs
+    linked to that airport by name. Airports we don't know are not recorded.
+
+    Returns:
+        Number of observations written
+    """
+    from .models import Airport, FuelPrice
+
+    airport = (
+        Airport.objects.filter(Q(icao_code__iexact=airport_code) | Q(ident__iexact=airport_code))
+        .only('id')
+        .first()
+    )
+    if airport is None:
+        return 0
+
+    observed_at = observed_at or timezone.now()
+    fbo_ids = {name.casefold(): fbo_id for fbo_id, name in airport.fbos.values_list('id', 'name')}
+
+    observations = []
+    for price in prices:
+        amount = parse_price(price.get('jet_a_cost'))
+        if amount is None:
+            continue
+        name = price.get('fbo_name', '')[:255]
+        observations.append(FuelPrice(
+            airport=airport,
+            fbo_id=fbo_ids.get(name.casefold()),
+            fbo_name=name,
+            jet_a_price=amount,
+            observed_at=observed_at,
+        ))
+    FuelPrice.objects.bulk_create(observations)
+    return len(observations)
+
+
+def stored_fuel_prices(airport_code, max_age=None):
+    """
+    The airport's latest scrape from the FuelPrice history, as a cache entry.
+
+    Args:
+        airport_code: ICAO code or ident
+        max_age: Seconds; older scrapes are ignored (defaults to FUEL_PRICE_CACHE_TTL)
+
+    Returns:
+        Entry like get_fuel_prices returns, or None
+    """
+    from .models import FuelPrice
+
+    max_age = _setting('FUEL_PRICE_CACHE_TTL', 1800) if max_age is None else max_age
+    observations = FuelPrice.objects.filter(
+        Q(airport__icao_code__iexact=airport_code) | Q(airport__ident__iexact=airport_code),
+        observed_at__gte=timezone.now() - timedelta(seconds=max_age),
+    ).order_by('-observed_at', 'jet_a_price').values_list('observed_at', 'fbo_name', 'jet_a_price')
+
+    fetched_at, prices = None, []
+    for observed_at, fbo_name, price in observations.iterator():
+        # A scrape's rows share its observed_at
+        if fetched_at is not None and observed_at != fetched_at:
+            break
+        fetched_at = observed_at
+        prices.append({'fbo_name': fbo_name, 'jet_a_cost': f"${price}"})
+    if fetched_at is None:
+        return None
+    return {'airport_code': airport_code, 'fuel_prices': prices, 'fetched_at': fetched_at.isoformat()}
+
+
+def latest_fuel_prices(airport_ids, max_age_days=LATEST_PRICE_MAX_AGE_DAYS):
+    """
+    Most recent observation per FBO for each airport.
+
+    One indexed range query over (airport, observed_at) covers every airport,
+    so callers building documents for a whole trip don't query per airport.
+
+    Returns:
+        Dict of airport_id -> list of FuelPrice, cheapest first
+    """
+    from .models import FuelPrice
+
+    cutoff = timezone.now() - timedelta(days=max_age_days)
+    observations = FuelPrice.objects.filter(
+        airport_id__in=list(airport_ids), observed_at__gte=cutoff
+    ).order_by('airport_id', '-observed_at')
+
+    latest = {}
+    seen = set()
+    for observation in observations:
+        key = (observation.airport_id, observation.fbo_name.casefold())
+        if key in seen:
+            continue
+        seen.add(key)
+        latest.setdefault(observation.airport_id, []).append(observation)
+
+    for rows in latest.values():
+        rows.sort(key=lambda o: o.jet_a_price)
+    return latest
+
+
+def fuel_price_trend(airport_id, days=30, fbo_name=None):
+    """
+    Daily Jet-A price statistics for an airport.
+
+    Returns:
+        List of {'day', 'average', 'minimum', 'maximum', 'observations'} dicts, oldest first
+    """
+    from .models import FuelPrice
+
+    cutoff = timezone.now() - timedelta(days=days)
+    observations = FuelPrice.objects.filter(airport_id=airport_id, observed_at__gte=cutoff)
+    if fbo_name:
+        observations = observations.filter(fbo_name__iexact=fbo_name)
+
+    return list(
+        observations.annotate(day=TruncDate('observed_at'))
+        .values('day')
+        .annotate(
+            average=Avg('jet_a_price'),
+            minimum=Min('jet_a_price'),
+            maximum=Max('jet_a_price'),
+            observations=Count('id'),
+        )
+        .order_by('day')
+    )
+
+
+def format_fuel_summary(prices):
+    """Short Jet-A price range for document fields, e.g. '$6.25-$6.75 Jet-A'."""
+    prices = [p for p in prices if p is not None]
+    if not prices:
+        return ''
+    low, high = min(prices), max(prices)
+    if low == high:
+        return f"${low} Jet-A"
+    return f"${low}-${high} Jet-A"
+
+
+def upcoming_trip_airport_codes(days=None):
+    """Airport codes on trip lines departing within the next ``days`` days."""
+    from .models import TripLine
+
+    days = _setting('FUEL_PRICE_WARM_DAYS', 3) if days is None else days
+    now = timezone.now()
+    lines = TripLine.objects.filter(
+        departure_time_utc__gte=now,
+        departure_time_utc__lt=now + timedelta(days=days),
+    ).values_list(
+        'origin_airport__icao_code', 'origin_airport__ident',
+        'destination_airport__icao_code', 'destination_airport__ident',
+    )
+
+    codes = set()
+    for origin_icao, origin_ident, destination_icao, destination_ident in lines:
+        codes.add(normalize_code(origin_icao or origin_ident))
+        codes.add(normalize_code(destination_icao or destination_ident))
+    codes.discard('')
+    return sorted(codes)
+
+
+def warm_fuel_prices(airport_codes=None, max_workers=None):
+    """
+    Refresh cached prices that are missing or close to expiry.
+
+    Args:
+        airport_codes: Codes to warm; defaults to airports on upcoming trips
+        max_workers: Concurrent scrapes (defaults to FUEL_PRICE_MAX_WORKERS)
+
+    Returns:
+        Dict with 'refreshed', 'fresh' and 'failed' code lists
+    """
+    if airport_codes is None:
+        airport_codes = upcoming_trip_airport_codes()
+    airport_codes = sorted({normalize_code(c) for c in airport_codes} - {''})
+
+    # Anything fetched within the last half of the TTL is left alone
+    ttl = _setting('FUEL_PRICE_CACHE_TTL', 1800)
+    fresh_after = timezone.now() - timedelta(seconds=ttl / 2)
+    cached = cache.get_many([_cache_key(c) for c in airport_codes])
+
+    fresh, stale = [], []
+    for code in airport_codes:
+        # Another process may have scraped it
+        entry = cached.get(_cache_key(code)) or stored_fuel_prices(code, max_age=ttl / 2)
+        if entry is not None and datetime.fromisoformat(entry['fetched_at']) >= fresh_after:
+            fresh.append(code)
+        else:
+            stale.append(code)
+
+    refreshed, failed = [], []
+    if stale:
+        workers = max_workers or _setting('FUEL_PRICE_MAX_WORKERS', 4)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                code: pool.submit(in_worker_thread, _flight.do, code, lambda c=code: _refresh(c))
+                for code in stale
+            }
+        for code, future in futures.items():
+            try:
+                future.result()
+                refreshed.append(code)
+            except FuelPriceUnavailable as e:
+                logger.warning("Fuel price warm failed: %s", e)
+                failed.append(code)
+
+    return {'refreshed': refreshed, 'fresh': fresh, 'failed': failed}
+
+
+_refresher = None
+_refresher_lock = threading.Lock()
+
+
+def _refresh_loop(interval):
+    # Let the process finish starting up before the first sweep
+    time.sleep(min(interval, 30))
+    while True:
+        try:
+            warm_fuel_prices()
+        except Exception:
+            logger.exception("Fuel price refresher sweep failed")
+        time.sleep(interval)
+
+
+def ensure_refresher_started():
+    """
+    Start the per-process background refresher on first use.
+
+    Disabled when FUEL_PRICE_REFRESH_INTERVAL is 0 or unset (the default);
+    run_scheduler's warm_fuel_prices task does this once for all processes.
+    """
+    global _refresher
+    interval = _setting('FUEL_PRICE_REFRESH_INTERVAL', 0)
+    if not interval or _refresher is not None:
+        return
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = threading.Thread(
+                target=_refresh_loop, args=(interval,), name='fuel-price-refresher', daemon=True
+            )
+            _refresher.start()
@@ -0,0 +1,323 @@
+"""
+Database-backed background job queue.
+
+Slow side effects (PDF generation, emailing, DocuSeal calls) are recorded as
+Job rows and run by `manage.py run_workers` instead of inside the request.
+No broker is needed: workers claim due jobs with
+``SELECT ... FOR UPDATE SKIP LOCKED`` so any number of worker threads and
+processes can poll the same table without handing a job out twice.
+
+Handlers are registered with the @job decorator (see api/tasks.py), take the
+job's JSON payload as keyword arguments and return a JSON-serialisable
+result. An exception retries the job with jittered exponential backoff until
+max_attempts is reached; PermanentJobError fails it straight away. While a
+handler runs, its worker refreshes the job's lock every JOB_HEARTBEAT_INTERVAL
+seconds, so a long job keeps its lock however long it takes, and jobs whose
+worker died mid-run are reclaimed once their lock is older than
+JOB_LOCK_TIMEOUT.
+"""
+
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help."""
+
+
+class JobHandler:
+    def __init__(self, name: str, func: Callable, queue: str, max_attempts: int,
+                 on_failure: Optional[Callable] = None):
+        self.name = name
+        self.func = func
+        self.queue = queue
+        self.max_attempts = max_attempts
+        self.on_failure = on_failure
+
+
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def job(name: str, queue: str = 'default', max_attempts: int = 5, on_failure: Optional[Callable] = None):
+    """
+    Register a function as the handler for jobs called ``name``.
+
+    Args:
+        name: Job name stored on the row
+        queue: Queue the job is enqueued on unless overridden
+        max_attempts: Attempts before the job is marked failed
+        on_failure: Optional callback(job, error) run once the job has failed for good
+    """
+    def decorator(func):
+        JOB_HANDLERS[name] = JobHandler(name, func, queue, max_attempts, on_failure)
+        return func
+    return decorator
+
+
+def load_handlers():
+    """Import the modules that register job handlers."""
+    from . import tasks  # noqa: F401
+
+
+def enqueue(name: str, payload: Optional[dict] = None, queue: Optional[str] = None,
+            run_at=None, max_attempts: Optional[int] = None, created_by=None, debounce_key: str = ''):
+    """
+    Record a job for the workers.
+
+    The row is written in the caller's transaction, so a job enqueued inside
+    a request that later rolls back is never run.
+
+    Returns:
+        The created Job
+    """
+    from .models import Job
+
+    load_handlers()
+    handler = JOB_HANDLERS.get(name)
+    if handler is None:
+        raise ValueError(f"No job handler registered for '{name}'")
+
+    user = created_by if created_by is not None and getattr(created_by, 'is_authenticated', False) else None
+    job_row = Job.objects.create(
+        name=name,
+        queue=queue or handler.queue,
+        payload=payload or {},
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or handler.max_attempts,
+        created_by=user,
+        debounce_key=debounce_key,
+    )
+    logger.info("Enqueued job %s (%s) on queue %s", job_row.id, name, job_row.queue)
+    return job_row
+
+
+def enqueue_debounced(name: str, key: str, payload: Optional[dict] = None, delay: float = 60,
+                      max_delay: Optional[float] = None, queue: Optional[str] = None):
+    """
+    Enqueue a job to run ``delay`` seconds from now, folding repeated calls together.
+
+    While a job with the same name and key is still queued, each call pushes
+    its run_at back to ``delay`` seconds from now instead of adding another
+    job, so a burst of changes runs the job once, after the burst. max_delay
+    caps how long a steady stream of calls can keep pushing it back (measured
+    from when the job was first enqueued). The pending job keeps its original
+    payload.
+
+    Returns:
+        The queued Job
+    """
+    from .models import Job
+
+    now = timezone.now()
+    run_at = now + timedelta(seconds=delay)
+    with transaction.atomic():
+        pending = Job.objects.select_for_update().filter(name=name, debounce_key=key, status='queued').first()
+        if pending is not None:
+            if max_delay is not None:
+                run_at = min(run_at, pending.created_at + timedelta(seconds=max_delay))
+            pending.run_at = max(run_at, pending.run_at)
+            # The worker may have claimed it since we looked; then start a new one
+            if Job.objects.filter(pk=pending.pk, status='queued').update(run_at=pending.run_at):
+                return pending
+        return enqueue(name, payload, queue=queue, run_at=run_at, debounce_key=key)
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds before the next attempt: exponential from JOB_RETRY_BACKOFF, half-jittered, capped."""
+    base = _setting('JOB_RETRY_BACKOFF', 30)
+    cap = _setting('JOB_RETRY_MAX_BACKOFF', 3600)
+    delay = min(cap, base * (2 ** max(attempts - 1, 0)))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def claim_job(queues: Iterable[str], worker_id: str):
+    """
+    Lock and mark running the next due job on any of ``queues``.
+
+    Returns:
+        The claimed Job, or None if nothing is due
+    """
+    from .models import Job
+
+    now = timezone.now()
+    stale = now - timedelta(seconds=_setting('JOB_LOCK_TIMEOUT', 900))
+    due = Q(status='queued', run_at__lte=now) | Q(status='running', locked_at__lt=stale)
+
+    with transaction.atomic():
+        candidates = Job.objects.filter(due, queue__in=list(queues)).order_by('run_at')
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        job_row = candidates.first()
+        if job_row is None:
+            return None
+
+        # Compare-and-set on the status/lock we read, so backends without
+        # SKIP LOCKED still never hand one job to two workers
+        claimed = Job.objects.filter(
+            pk=job_row.pk, status=job_row.status, locked_at=job_row.locked_at
+        ).update(
+            status='running', locked_at=now, locked_by=worker_id, attempts=F('attempts') + 1
+        )
+        if not claimed:
+            return None
+
+    if job_row.status == 'running':
+        logger.warning("Reclaiming job %s (%s) from stale worker %s", job_row.id, job_row.name, job_row.locked_by)
+    job_row.refresh_from_db()
+    return job_row
+
+
+class LockHeartbeat:
+    """
+    Refreshes a running job's locked_at from a side thread until stopped, so
+    claim_job doesn't take a job that is still running for a stale one.
+
+    Each refresh is conditional on the job still being locked by this
+    worker; once it isn't, the heartbeat stops.
+    """
+
+    def __init__(self, job_row, interval: Optional[float] = None):
+        self.job_row = job_row
+        self.interval = _setting('JOB_HEARTBEAT_INTERVAL', 60) if interval is None else interval
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f"job-heartbeat-{job_row.id}", daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        from .models import Job
+
+        try:
+            while not self.stopped.wait(self.interval):
+                try:
+                    held = Job.objects.filter(
+                        pk=self.job_row.pk, status='running', locked_by=self.job_row.locked_by
+                    ).update(locked_at=timezone.now())
+                except Exception:
+                    logger.exception("Failed to refresh the lock on job %s", self.job_row.id)
+                    close_old_connections()
+                    continue
+                if not held:
+                    logger.warning("Job %s (%s) is no longer locked by %s",
+                                   self.job_row.id, self.job_row.name, self.job_row.locked_by)
+                    return
+        finally:
+            connection.close()
+
+
+def run_job(job_row):
+    """Run a claimed job and record its outcome."""
+    load_handlers()
+    handler = JOB_HANDLERS.get(job_row.name)
+    if handler is None:
+        _finish(job_row, 'failed', error=f"No job handler registered for '{job_row.name}'")
+        return
+
+    try:
+        with LockHeartbeat(job_row):
+            result = handler.func(**job_row.payload)
+    except Exception as e:
+        error = ''.join(traceback.format_exception_only(type(e), e)).strip()
+        permanent = isinstance(e, PermanentJobError)
+        if permanent or job_row.attempts >= job_row.max_attempts:
+            logger.error("Job %s (%s) failed after %d attempts: %s", job_row.id, job_row.name, job_row.attempts, error,
+                         exc_info=not permanent)
+            _finish(job_row, 'failed', error=error)
+            if handler.on_failure:
+                try:
+                    handler.on_failure(job_row, e)
+                except Exception:
+                    logger.exception("on_failure callback for job %s raised", job_row.id)
+        else:
+            delay = retry_delay(job_row.attempts)
+            logger.warning("Job %s (%s) attempt %d failed, retrying in %.0fs: %s",
+                           job_row.id, job_row.name, job_row.attempts, delay, error)
+            _reschedule(job_row, timezone.now() + timedelta(seconds=delay), error)
+        return
+
+    _finish(job_row, 'succeeded', result=result)
+    logger.info("Job %s (%s) succeeded", job_row.id, job_row.name)
+
+
+def _finish(job_row, status, result=None, error=''):
+    from .models import Job
+
+    # Only write while we still hold the lock, i.e. the job wasn't reclaimed meanwhile
+    Job.objects.filter(pk=job_row.pk, locked_by=job_row.locked_by).update(
+        status=status, result=result, last_error=error or job_row.last_error,
+        finished_at=timezone.now(), locked_at=None, locked_by='',
+    )
+
+
+def _reschedule(job_row, run_at, error):
+    from .models import Job
+
+    Job.objects.filter(pk=job_row.pk, locked_by=job_row.locked_by).update(
+        status='queued', run_at=run_at, last_error=error, locked_at=None, locked_by='',
+    )
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Worker:
+    """
+    Polls for jobs on one thread until stopped.
+
+    Each thread uses its own database connection; stale connections are
+    closed between jobs the same way Django does between requests.
+    """
+
+    def __init__(self, queues: Iterable[str], worker_id: str, stop_event: threading.Event,
+                 poll_interval: Optional[float] = None):
+        self.queues = list(queues)
+        self.worker_id = worker_id
+        self.stop_event = stop_event
+        self.poll_interval = _setting('JOB_POLL_INTERVAL', 2) if poll_interval is None else poll_interval
+
+    def run_once(self) -> bool:
+        """Claim and run one job. Returns False if none was due."""
+        close_old_connections()
+        try:
+            job_row = claim_job(self.queues, self.worker_id)
+            if job_row is None:
+                return False
+            run_job(job_row)
+            return True
+        finally:
+            close_old_connections()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                worked = self.run_once()
+            except Exception:
+                logger.exception("Worker %s failed to process a job", self.worker_id)
+                worked = False
+            if not worked:
+                self.stop_event.wait(self.poll_interval)
+        connection.close()
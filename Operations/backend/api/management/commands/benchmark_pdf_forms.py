@@ -0,0 +1,104 @@
+import logging
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from documents.templates.pdf_forms import TEMPLATE_DIRS, get_template
+
+
+def _pdfrw_uncached(template_path, output_path, values):
+    from pdfrw import PdfReader, PdfString, PdfWriter
+
+    pdf = PdfReader(template_path)
+    for page in pdf.pages:
+        for annotation in page.Annots or []:
+            if annotation.T and annotation.T.to_unicode() in values:
+                annotation.V = PdfString.encode(values[annotation.T.to_unicode()])
+    PdfWriter(output_path, trailer=pdf).write()
+
+
+def _pdfrw_cached(template_path, output_path, values):
+    get_template(template_path).fill(output_path, values)
+
+
+def _pypdf(template_path, output_path, values):
+    from pypdf import PdfReader, PdfWriter
+
+    writer = PdfWriter(clone_from=PdfReader(template_path))
+    for page in writer.pages:
+        writer.update_page_form_field_values(page, values)
+    writer.write(output_path)
+
+
+_pypdf_readers = {}
+
+
+def _pypdf_cached(template_path, output_path, values):
+    from pypdf import PdfReader, PdfWriter
+
+    if template_path not in _pypdf_readers:
+        _pypdf_readers[template_path] = PdfReader(template_path)
+    writer = PdfWriter(clone_from=_pypdf_readers[template_path])
+    for page in writer.pages:
+        writer.update_page_form_field_values(page, values)
+    writer.write(output_path)
+
+
+def _pypdf2(template_path, output_path, values):
+    from PyPDF2 import PdfReader, PdfWriter
+
+    reader = PdfReader(template_path, strict=False)
+    writer = PdfWriter()
+    for page in reader.pages:
+        writer.add_page(page)
+    for page in writer.pages:
+        writer.update_page_form_field_values(page, values)
+    with open(output_path, 'wb') as f:
+        writer.write(f)
+
+
+ENGINES = [
+    ('pdfrw', _pdfrw_uncached),
+    ('pdfrw (cached)', _pdfrw_cached),
+    ('pypdf', _pypdf),
+    ('pypdf (cached)', _pypdf_cached),
+    ('PyPDF2', _pypdf2),
+]
+
+
+class Command(BaseCommand):
+    help = 'Time filling every field of each PDF template with each available form-fill engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=20, help='Fills per template and engine')
+        parser.add_argument('templates', nargs='*', help='Template PDFs (default: every template in nosign_pdf)')
+
+    def handle(self, *args, **options):
+        # pypdf/PyPDF2 warn about every checkbox given a text value
+        for library in ('pypdf', 'PyPDF2'):
+            logging.getLogger(library).setLevel(logging.ERROR)
+
+        templates = options['templates'] or [
+            os.path.join(directory, filename)
+            for directory in TEMPLATE_DIRS
+            for filename in sorted(os.listdir(directory)) if filename.lower().endswith('.pdf')
+        ]
+
+        self.stdout.write(f"{'template':<24}" + ''.join(f"{name:>16}" for name, _ in ENGINES) + '   (ms per fill)')
+        with tempfile.TemporaryDirectory() as output_dir:
+            output_path = os.path.join(output_dir, 'filled.pdf')
+            for template_path in templates:
+                values = {name: f"Value {i}" for i, name in enumerate(get_template(template_path).fields)}
+                row = f"{os.path.basename(template_path):<24}"
+                for name, engine in ENGINES:
+                    try:
+                        engine(template_path, output_path, values)  # warm up (and fill caches)
+                        started = time.perf_counter()
+                        for _ in range(options['runs']):
+                            engine(template_path, output_path, values)
+                        row += f"{(time.perf_counter() - started) / options['runs'] * 1000:>16.1f}"
+                    except ImportError:
+                        row += f"{'not installed':>16}"
+                self.stdout.write(row)
@@ -0,0 +1,48 @@
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import Quote
+from api.quote_documents import RENDERERS, quote_document, quote_render_task
+from api.document_rendering import render
+
+
+class Command(BaseCommand):
+    help = 'Time rendering a quote PDF with the reportlab layout and the Quote.pdf form template, cold and cached'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=20, help='Renders per renderer')
+        parser.add_argument('--quote', help='Quote id (default: the most recent quote)')
+
+    def handle(self, *args, **options):
+        queryset = Quote.objects.select_related('contact', 'pickup_airport', 'dropoff_airport', 'patient__info')
+        quote = queryset.filter(id=options['quote']).first() if options['quote'] else queryset.order_by('-created_on').first()
+        if quote is None:
+            raise CommandError('No quote to render')
+        runs = options['runs']
+
+        self.stdout.write(f"Quote {quote.id}, {runs} runs (ms per PDF)")
+        self.stdout.write(f"{'renderer':<10}{'render':>12}{'cached':>12}{'size':>12}")
+        with tempfile.TemporaryDirectory() as output_dir:
+            for renderer in RENDERERS:
+                task = quote_render_task(quote, renderer)
+                task.output_dir = output_dir
+                success, error, path = render(task)  # warm up (and parse the template)
+                if not success:
+                    raise CommandError(f"{renderer}: {error}")
+                size = os.path.getsize(path)
+                started = time.perf_counter()
+                for _ in range(runs):
+                    os.unlink(render(task)[2])
+                rendered = (time.perf_counter() - started) / runs * 1000
+
+                # A repeat download: hash the quote's data and find the stored Document
+                quote_document(quote, renderer)
+                started = time.perf_counter()
+                for _ in range(runs):
+                    quote_document(quote, renderer)
+                cached = (time.perf_counter() - started) / runs * 1000
+
+                self.stdout.write(f"{renderer:<10}{rendered:>12.1f}{cached:>12.1f}{size:>12,}")
@@ -1,9 +1,11 @@
 import csv
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 from decimal import Decimal, InvalidOperation
 from pathlib import Path
 
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction, IntegrityError
+from django.db import transaction
 
 from api.models import Airport, AirportType  # adjust import path if needed
 
@@ -56,6 +58,15 @@ TYPE_MAP = {
     "closed": getattr(AirportType, "SMALL", "small_airport"),
 }
 
+IDENT_MAX_LENGTH = Airport._meta.get_field("ident").max_length
+
+# Columns written by an upsert; id/created_on/created_by are left untouched on existing rows
+UPSERT_FIELDS = [
+    "name", "latitude", "longitude", "elevation", "iso_country", "iso_region",
+    "municipality", "icao_code", "iata_code", "local_code", "gps_code",
+    "airport_type", "timezone", "import_hash", "modified_on",
+]
+
 
 def infer_timezone(lat, lon):
     if lat is None or lon is None:
@@ -69,31 +80,139 @@ def infer_timezone(lat, lon):
         return "UTC"
 
 
-def flush_buffer(buffer, batch_size):
-    """Try bulk_create, then fallback to row-by-row on conflicts."""
-    created = 0
-    skipped = 0
-    if not buffer:
-        return 0, 0
+# Timezone lookups in worker processes. Each worker loads its own TimezoneFinder
+# once; lookups are keyed by rounded coordinates so nearby airports share a result.
+_worker_tf = None
 
+
+def _init_timezone_worker():
+    global _worker_tf
     try:
-        with transaction.atomic():
+        from timezonefinder import TimezoneFinder
+        _worker_tf = TimezoneFinder()
+    except Exception:
+        _worker_tf = None
+
+
+def _lookup_timezones(coords):
+    results = []
+    for lat, lon in coords:
+        tz = None
+        if _worker_tf is not None:
+            try:
+                tz = _worker_tf.timezone_at(lat=lat, lng=lon)
+            except Exception:
+                tz = None
+        results.append(((lat, lon), tz or "UTC"))
+    return results
+
+
+def parse_row(row):
+    """
+    Map one OurAirports CSV row to Airport field values, or None if unusable.
+
+    Rows the database would reject (no coordinates, over-long ident) are
+    dropped here rather than failing a whole batch.
+    """
+    ident = norm_str(row.get("ident"))
+    if not ident or len(ident) > IDENT_MAX_LENGTH:
+        return None
+
+    lat = to_decimal(row.get("latitude_deg"))
+    lon = to_decimal(row.get("longitude_deg"))
+    if lat is None or lon is None:
+        return None
+
+    icao_code = norm_str(row.get("icao_code"))
+    if icao_code and len(icao_code) > 4:
+        icao_code = None
+    iata_code = norm_str(row.get("iata_code"))
+    if iata_code and len(iata_code) > 3:
+        iata_code = None
+
+    csv_type = (norm_str(row.get("type")) or "").lower()
+    return dict(
+        ident=ident,
+        name=norm_str(row.get("name")) or ident,
+        latitude=lat,
+        longitude=lon,
+        elevation=to_int(row.get("elevation_ft")),
+        iso_country=norm_str(row.get("iso_country")) or "US",
+        iso_region=norm_str(row.get("iso_region")),
+        municipality=norm_str(row.get("municipality")),
+        icao_code=icao_code,
+        iata_code=iata_code,
+        gps_code=norm_str(row.get("gps_code")),
+        local_code=norm_str(row.get("local_code")),
+        airport_type=TYPE_MAP.get(csv_type, getattr(AirportType, "SMALL", "small_airport")),
+    )
+
+
+def content_hash(values):
+    """Stable hash of the CSV-derived fields (timezone is derived, so excluded)."""
+    payload = "\x1f".join(
+        "" if values[key] is None else str(values[key]) for key in sorted(values)
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TimezoneResolver:
+    """Resolves timezones in a process pool, deduplicated by rounded coordinates."""
+
+    def __init__(self, workers, precision):
+        self.precision = precision
+        self.cache = {}
+        self.lookups = 0
+        self.pool = None
+        if workers > 1 and TF is not None:
+            self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_timezone_worker)
+            self.workers = workers
+
+    def key(self, lat, lon):
+        return round(float(lat), self.precision), round(float(lon), self.precision)
+
+    def resolve(self, rows):
+        """Set row["timezone"] for every row, looking up unseen coordinates in bulk."""
+        pending = sorted({
+            k for k in (self.key(r["latitude"], r["longitude"]) for r in rows)
+            if k not in self.cache
+        })
+        if pending:
+            self.lookups += len(pending)
+            if self.pool is not None:
+                chunk = max(1, len(pending) // (self.workers * 4) + 1)
+                chunks = [pending[i:i + chunk] for i in range(0, len(pending), chunk)]
+                for results in self.pool.map(_lookup_timezones, chunks):
+                    self.cache.update(results)
+            else:
+                self.cache.update((k, infer_timezone(*k)) for k in pending)
+
+        for r in rows:
+            r["timezone"] = self.cache.get(self.key(r["latitude"], r["longitude"]), "UTC")
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+
+
+def write_batch(rows, update_existing, batch_size):
+    """
+    Write a batch with a single INSERT ... ON CONFLICT (ident) statement per
+    batch_size rows: DO UPDATE when updating existing airports, DO NOTHING
+    otherwise.
+    """
+    instances = [Airport(**r) for r in rows]
+    with transaction.atomic():
+        if update_existing:
             Airport.objects.bulk_create(
-                buffer, ignore_conflicts=True, batch_size=batch_size
+                instances,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=["ident"],
+                update_fields=UPSERT_FIELDS,
             )
-            created += len(buffer)
-        return created, skipped
-    except IntegrityError:
-        pass  # fallback row by row
-
-    for inst in buffer:
-        try:
-            with transaction.atomic():
-                inst.save()
-                created += 1
-        except IntegrityError:
-            skipped += 1
-    return created, skipped
+        else:
+            Airport.objects.bulk_create(instances, batch_size=batch_size, ignore_conflicts=True)
 
 
 class Command(BaseCommand):
@@ -106,11 +225,28 @@ class Command(BaseCommand):
             action="store_true",
             help="Update existing airports matched by ident.",
         )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only write rows that are new or whose content changed since the last import (implies --update).",
+        )
         parser.add_argument(
             "--batch",
             type=int,
             default=1000,
-            help="Bulk create batch size.",
+            help="Rows per upsert statement.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Processes used for timezone lookups (1 disables the pool).",
+        )
+        parser.add_argument(
+            "--tz-precision",
+            type=int,
+            default=2,
+            help="Decimal places coordinates are rounded to when deduplicating timezone lookups.",
         )
 
     def handle(self, *args, **opts):
@@ -118,87 +254,72 @@ class Command(BaseCommand):
         if not csv_path.exists():
             raise CommandError(f"CSV not found: {csv_path}")
 
-        update_existing = opts["update"]
+        incremental = opts["incremental"]
+        update_existing = opts["update"] or incremental
         batch_size = opts["batch"]
 
-        created = updated = skipped = 0
-        buffer = []
-
-        # preload existing idents for quick lookup
-        existing_idents = set(
-            Airport.objects.values_list("ident", flat=True)
-        )
+        created = updated = unchanged = skipped = icao_conflicts = 0
+
+        # Preload existing keys once instead of querying per row
+        existing_hashes = dict(Airport.objects.values_list("ident", "import_hash"))
+        icao_owner = {
+            icao.upper(): ident
+            for ident, icao in Airport.objects.exclude(icao_code__isnull=True).values_list("ident", "icao_code")
+        }
+        seen_idents = set()
+
+        resolver = TimezoneResolver(opts["workers"], opts["tz_precision"])
+
+        def flush(buffer):
+            nonlocal icao_conflicts
+            if not buffer:
+                return
+            # icao_code is unique too; resolve clashes here so one bad row can't fail the batch
+            for r in buffer:
+                icao = r["icao_code"]
+                if icao:
+                    owner = icao_owner.setdefault(icao.upper(), r["ident"])
+                    if owner != r["ident"]:
+                        r["icao_code"] = None
+                        icao_conflicts += 1
+            resolver.resolve(buffer)
+            write_batch(buffer, update_existing, batch_size)
 
-        with csv_path.open(newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-
-            for row in reader:
-                ident = norm_str(row.get("ident"))
-                if not ident:
-                    skipped += 1
-                    continue
-
-                name = norm_str(row.get("name")) or ident
-                lat = to_decimal(row.get("latitude_deg"))
-                lon = to_decimal(row.get("longitude_deg"))
-                elevation = to_int(row.get("elevation_ft"))
-
-                iso_country = norm_str(row.get("iso_country")) or "US"
-                iso_region = norm_str(row.get("iso_region"))
-                municipality = norm_str(row.get("municipality"))
-
-                icao_code = norm_str(row.get("icao_code"))
-                iata_code = norm_str(row.get("iata_code"))
-                gps_code = norm_str(row.get("gps_code"))
-                local_code = norm_str(row.get("local_code"))
-
-                csv_type = (norm_str(row.get("type")) or "").lower()
-                airport_type = TYPE_MAP.get(
-                    csv_type, getattr(AirportType, "SMALL", "small_airport")
-                )
-
-                tz = infer_timezone(lat, lon)
-
-                defaults = dict(
-                    name=name,
-                    latitude=lat,
-                    longitude=lon,
-                    elevation=elevation,
-                    iso_country=iso_country,
-                    iso_region=iso_region,
-                    municipality=municipality,
-                    icao_code=icao_code,
-                    iata_code=iata_code,
-                    local_code=local_code,
-                    gps_code=gps_code,
-                    airport_type=airport_type,
-                    timezone=tz,
-                )
-
-                if ident in existing_idents:
-                    if update_existing:
-                        try:
-                            Airport.objects.filter(ident=ident).update(**defaults)
-                            updated += 1
-                        except IntegrityError:
-                            skipped += 1
-                    continue
-                else:
-                    buffer.append(Airport(ident=ident, **defaults))
+        buffer = []
+        try:
+            with csv_path.open(newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    values = parse_row(row)
+                    if values is None or values["ident"] in seen_idents:
+                        skipped += 1
+                        continue
+                    seen_idents.add(values["ident"])
+
+                    values["import_hash"] = content_hash(values)
+                    ident = values["ident"]
+
+                    if ident in existing_hashes:
+                        if not update_existing:
+                            continue
+                        if incremental and existing_hashes[ident] == values["import_hash"]:
+                            unchanged += 1
+                            continue
+                        updated += 1
+                    else:
+                        created += 1
+
+                    buffer.append(values)
                     if len(buffer) >= batch_size:
-                        c, s = flush_buffer(buffer, batch_size)
-                        created += c
-                        skipped += s
+                        flush(buffer)
                         buffer = []
 
-        # flush leftover
-        if buffer:
-            c, s = flush_buffer(buffer, batch_size)
-            created += c
-            skipped += s
+            flush(buffer)
+        finally:
+            resolver.close()
 
         self.stdout.write(
             self.style.SUCCESS(
-                f"Import complete: created={created}, updated={updated}, skipped={skipped}"
+                f"Import complete: created={created}, updated={updated}, unchanged={unchanged}, "
+                f"skipped={skipped}, icao_conflicts={icao_conflicts}, timezone_lookups={resolver.lookups}"
             )
         )
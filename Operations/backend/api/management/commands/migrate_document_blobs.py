@@ -0,0 +1,141 @@
+"""
+Move document bytes stored in the database (Document.content), and with
+--include-files legacy files referenced by Document.file_path, into document
+storage (api/document_storage.py).
+
+Each blob is read from the database in chunks (SUBSTRING over the column), so
+a large scan never has to fit in memory, written to storage, and the row is
+switched to its storage key with its size, SHA-256 and MIME type recorded and
+its content emptied. Safe to re-run: only rows not yet in storage are touched.
+
+A row with content whose file_path also points at an existing file is stored
+from that file. Its content is emptied only if it's byte-for-byte the same as
+the file; otherwise the row is reported and left alone.
+
+Usage:
+    python manage.py migrate_document_blobs --dry-run
+    python manage.py migrate_document_blobs --batch-size 100 --chunk-size 1048576
+    python manage.py migrate_document_blobs --include-files
+"""
+
+import hashlib
+import os
+
+from django.core.management.base import BaseCommand
+from django.db.models import BinaryField, Q
+from django.db.models.functions import Length, Substr
+
+from api.document_storage import get_document_storage, guess_mime_type, legacy_path, shard_key, storage_name
+from api.models import Document
+
+
+def read_content(pk, size: int, chunk_size: int):
+    """Yield a document's DB-stored content chunk by chunk."""
+    position = 1  # SQL strings are 1-indexed
+    while position <= size:
+        chunk = Document.objects.filter(pk=pk).annotate(
+            part=Substr('content', position, chunk_size, output_field=BinaryField())
+        ).values_list('part', flat=True).get()
+        yield bytes(chunk)
+        position += chunk_size
+
+
+def read_file(path: str, chunk_size: int):
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            yield chunk
+
+
+class Command(BaseCommand):
+    help = 'Move DB-stored document content (and legacy document files) to document storage'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Documents fetched per query')
+        parser.add_argument('--chunk-size', type=int, default=1024 * 1024, help='Bytes read at a time')
+        parser.add_argument('--include-files', action='store_true',
+                            help='Also move files referenced by file_path (flat directories) into storage')
+        parser.add_argument('--keep-files', action='store_true',
+                            help='Leave legacy files in place after copying them into storage')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be moved without changing anything')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        storage = get_document_storage()
+        stats = {'blobs': 0, 'files': 0, 'bytes': 0, 'conflicts': 0, 'failed': 0}
+
+        pending = Q(content__isnull=False)
+        if options['include_files']:
+            pending |= Q(file_path__isnull=False) & ~Q(file_path='')
+        queryset = Document.objects.filter(pending, storage_key__isnull=True).annotate(
+            content_size=Length('content')
+        ).only('id', 'filename', 'file_path').order_by('pk')
+
+        last_pk = None
+        while True:
+            batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+            batch = list(batch[:options['batch_size']])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            for document in batch:
+                has_content = document.content_size is not None
+                path = legacy_path(document)
+                if not has_content and path is None:
+                    continue  # file_path points at nothing
+                if options['dry_run']:
+                    source = path or f"{document.content_size} bytes in the database"
+                    self.stdout.write(f"{document.id} {document.filename}: would move {source}")
+                    continue
+                try:
+                    self.move(document, path, has_content, storage, chunk_size, options['keep_files'], stats)
+                except Exception as e:
+                    stats['failed'] += 1
+                    self.stdout.write(self.style.ERROR(f"{document.id} {document.filename}: {e}"))
+
+        if options['dry_run']:
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Moved {stats['blobs']} blobs and {stats['files']} files ({stats['bytes'] / (1024 * 1024):.1f} MB) "
+            f"to storage; {stats['conflicts']} conflicts, {stats['failed']} failed"
+        ))
+
+    def move(self, document, path, has_content, storage, chunk_size, keep_files, stats):
+        key = shard_key(storage_name(document))
+        mime_type = guess_mime_type(document.filename or key)
+
+        if path and has_content:
+            content_digest = hashlib.sha256()
+            for chunk in read_content(document.pk, document.content_size, chunk_size):
+                content_digest.update(chunk)
+            file_digest = hashlib.sha256()
+            for chunk in read_file(path, chunk_size):
+                file_digest.update(chunk)
+            if content_digest.hexdigest() != file_digest.hexdigest():
+                stats['conflicts'] += 1
+                self.stdout.write(self.style.WARNING(
+                    f"{document.id} {document.filename}: content differs from {path}, left as is"
+                ))
+                return
+
+        if path:
+            size, sha256 = storage.save(key, read_file(path, chunk_size), mime_type)
+            expected = os.path.getsize(path)
+        else:
+            size, sha256 = storage.save(key, read_content(document.pk, document.content_size, chunk_size), mime_type)
+            expected = document.content_size
+        if size != expected:
+            storage.delete(key)
+            raise RuntimeError(f"wrote {size} of {expected} bytes, left as is")
+
+        Document.objects.filter(pk=document.pk).update(
+            storage_key=key, file_path=None, content=None,
+            file_size=size, file_sha256=sha256, mime_type=mime_type,
+        )
+        if path:
+            stats['files'] += 1
+            if not keep_files:
+                os.remove(path)
+        else:
+            stats['blobs'] += 1
+        stats['bytes'] += size
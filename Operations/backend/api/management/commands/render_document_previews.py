@@ -0,0 +1,51 @@
+"""
+Render thumbnails and previews (api/document_previews.py) for documents
+uploaded before previews existed, or re-render them after changing
+DOCUMENT_PREVIEW_FORMAT.
+
+Usage:
+    python manage.py render_document_previews              # patient documents without previews
+    python manage.py render_document_previews --all        # re-render every patient document
+    python manage.py render_document_previews --enqueue    # leave the rendering to the workers
+"""
+
+from django.core.management.base import BaseCommand
+
+from api.document_previews import PreviewError, render_previews
+from api.document_storage import StorageError
+from api.jobs import enqueue
+from api.models import Document
+
+PATIENT_DOCUMENT_TYPES = ['insurance_card', 'letter_of_medical_necessity']
+
+
+class Command(BaseCommand):
+    help = 'Render thumbnails and previews for uploaded patient documents'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-render documents that already have previews')
+        parser.add_argument('--enqueue', action='store_true',
+                            help="Enqueue 'documents.render_previews' jobs instead of rendering here")
+
+    def handle(self, *args, **options):
+        queryset = Document.objects.filter(document_type__in=PATIENT_DOCUMENT_TYPES).order_by('created_on')
+        if not options['all']:
+            queryset = queryset.filter(previews__isnull=True)
+
+        rendered = skipped = 0
+        for document in queryset.iterator():
+            if options['enqueue']:
+                enqueue('documents.render_previews', {'document_id': str(document.id)})
+                rendered += 1
+                continue
+            try:
+                previews = render_previews(document)
+            except (PreviewError, StorageError) as e:
+                skipped += 1
+                self.stdout.write(self.style.WARNING(f"{document.id} {document.filename}: {e}"))
+                continue
+            rendered += 1
+            self.stdout.write(f"{document.id} {document.filename}: {', '.join(p.kind for p in previews)}")
+
+        verb = 'Enqueued' if options['enqueue'] else 'Rendered previews for'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {rendered} documents; {skipped} skipped"))
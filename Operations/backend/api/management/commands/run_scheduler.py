@@ -0,0 +1,60 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import ScheduledTask
+from utils.schedulers.periodic import PERIODIC_TASKS, load_tasks, run_forever, run_pending, run_task
+
+
+class Command(BaseCommand):
+    help = 'Run periodic maintenance tasks; safe to run in every container (one leader per task)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--list', action='store_true', help='List tasks, their schedules and last runs')
+        parser.add_argument('--run', metavar='TASK', help='Run one task now, ignoring its schedule')
+        parser.add_argument('--once', action='store_true', help='Run the tasks due this minute, then exit')
+
+    def handle(self, *args, **options):
+        load_tasks()
+
+        if options['list']:
+            states = {state.name: state for state in ScheduledTask.objects.all()}
+            for name, task in sorted(PERIODIC_TASKS.items()):
+                state = states.get(name)
+                last = f"{state.last_status} at {state.last_started_at:%Y-%m-%d %H:%M} ({state.last_duration_ms} ms)" if state and state.last_started_at else 'never run'
+                self.stdout.write(f"{name:<28} {str(task.schedule or 'disabled'):<16} {last}")
+                if task.description:
+                    self.stdout.write(f"    {task.description}")
+            return
+
+        if options['run']:
+            task = PERIODIC_TASKS.get(options['run'])
+            if task is None:
+                raise CommandError(f"Unknown task '{options['run']}'. Known: {', '.join(sorted(PERIODIC_TASKS))}")
+            outcome = run_task(task)
+            if outcome is None:
+                self.stdout.write(self.style.WARNING(f"{task.name} is already running elsewhere"))
+            else:
+                state = ScheduledTask.objects.get(name=task.name)
+                style = self.style.SUCCESS if outcome == 'succeeded' else self.style.ERROR
+                self.stdout.write(style(f"{task.name} {outcome} in {state.last_duration_ms} ms: {state.last_error or state.last_result}"))
+            return
+
+        if options['once']:
+            for name, outcome in run_pending().items():
+                self.stdout.write(f"{name}: {outcome or 'skipped'}")
+            return
+
+        stop_event = threading.Event()
+
+        def stop(signum, frame):
+            self.stdout.write("Stopping scheduler after the current task...")
+            stop_event.set()
+
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGTERM, stop)
+
+        self.stdout.write(f"Scheduler started with {len(PERIODIC_TASKS)} tasks")
+        run_forever(stop_event)
+        self.stdout.write(self.style.SUCCESS("Scheduler stopped"))
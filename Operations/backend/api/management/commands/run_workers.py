@@ -0,0 +1,54 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from api.jobs import Worker, default_worker_id, load_handlers
+
+
+class Command(BaseCommand):
+    help = 'Run background job workers (quote emails, DocuSeal sends, signed document downloads, trip document pre-generation)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', action='append', dest='queues',
+                            help='Queue to work on; repeat for several (default: default, email, docuseal, documents)')
+        parser.add_argument('--threads', type=int, default=2, help='Worker threads in this process')
+        parser.add_argument('--poll-interval', type=float, default=None,
+                            help='Seconds to sleep when no job is due (default: JOB_POLL_INTERVAL)')
+        parser.add_argument('--once', action='store_true',
+                            help='Run jobs until none are due, then exit')
+
+    def handle(self, *args, **options):
+        load_handlers()
+        queues = options['queues'] or ['default', 'email', 'docuseal', 'documents']
+        worker_id = default_worker_id()
+
+        if options['once']:
+            worker = Worker(queues, worker_id, threading.Event(), options['poll_interval'])
+            processed = 0
+            while worker.run_once():
+                processed += 1
+            self.stdout.write(self.style.SUCCESS(f"Processed {processed} jobs"))
+            return
+
+        stop_event = threading.Event()
+
+        def stop(signum, frame):
+            self.stdout.write("Stopping workers after their current jobs...")
+            stop_event.set()
+
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGTERM, stop)
+
+        threads = []
+        for index in range(max(1, options['threads'])):
+            worker = Worker(queues, f"{worker_id}:{index}", stop_event, options['poll_interval'])
+            thread = threading.Thread(target=worker.run, name=f"job-worker-{index}")
+            thread.start()
+            threads.append(thread)
+
+        self.stdout.write(f"Started {len(threads)} workers on queues: {', '.join(queues)}")
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=1)
+        self.stdout.write(self.style.SUCCESS("Workers stopped"))
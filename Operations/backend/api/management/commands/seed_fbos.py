@@ -1,8 +1,10 @@
 import csv
+import re
 from pathlib import Path
 
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
+from django.utils import timezone
 
 from api.models import FBO, Airport  # adjust import path if different
 
@@ -16,6 +18,12 @@ HEADERS = {
     "notes": ("FBO NOTES", "Notes"),
 }
 
+# Phone-like strings; the source sheet mixes several numbers into one cell and
+# sometimes puts numbers in the Email column
+PHONE_PATTERN = re.compile(r"(\(?\+?\d{1,3}\)?[\s.-]?\d{2,4}[\s.-]?\d{2,4}[\s.-]?\d{2,6})")
+
+PHONE_MAX_LENGTH = FBO._meta.get_field("phone").max_length
+
 
 def pick(row, keys):
     """Return the first non-empty trimmed value from row for any of the provided keys."""
@@ -27,6 +35,25 @@ def pick(row, keys):
     return ""
 
 
+def normalize_contacts(rows):
+    """
+    Clean phone/email columns for a whole file in one pass.
+
+    Every phone-like number found in PHONE, PHONE2 or Email is collected in
+    order; the first two distinct numbers become phone/phone2. An Email cell
+    that held numbers (or no '@') is cleared.
+    """
+    findall = PHONE_PATTERN.findall
+    for row in rows:
+        numbers = findall(row["phone"]) + findall(row["phone2"]) + findall(row["email"])
+        numbers = [n.strip()[:PHONE_MAX_LENGTH] for n in dict.fromkeys(numbers)]
+        row["phone"] = numbers[0] if numbers else ""
+        row["phone2"] = numbers[1] if len(numbers) > 1 else ""
+        if "@" not in row["email"] or findall(row["email"]):
+            row["email"] = ""
+    return rows
+
+
 class Command(BaseCommand):
     help = "Seed FBO records from a CSV and link them to Airports by ICAO code."
 
@@ -42,108 +69,134 @@ class Command(BaseCommand):
             action="store_true",
             help="Update existing FBO phone/email/notes if new data present.",
         )
+        parser.add_argument(
+            "--batch",
+            type=int,
+            default=1000,
+            help="Rows per bulk insert/update statement.",
+        )
 
     @transaction.atomic
     def handle(self, *args, **opts):
         csv_path = Path(opts["csv_path"])
         dry_run = opts["dry_run"]
         do_update = opts["update"]
+        batch_size = opts["batch"]
+        verbose = opts["verbosity"] > 1
 
         if not csv_path.exists():
             raise CommandError(f"CSV not found: {csv_path}")
 
-        created_fbos = 0
-        linked_pairs = 0
-        updated_fbos = 0
         skipped_rows = 0
         missing_airports = 0
 
         # Read CSV with BOM tolerance
+        rows = []
         with csv_path.open("r", encoding="utf-8-sig", newline="") as f:
-            reader = csv.DictReader(f)
-            # Normalize header keys once (DictReader preserves original)
-            # We'll still use the HEADERS map via pick()
-
-            for i, row in enumerate(reader, start=2):  # start=2 accounts for header row = line 1
-                icao = pick(row, HEADERS["icao"]).upper()
-                name = pick(row, HEADERS["name"])
-                phone = pick(row, HEADERS["phone"])
-                phone2 = pick(row, HEADERS["phone2"])
-                email = pick(row, HEADERS["email"])
-                notes = pick(row, HEADERS["notes"])
-
-                if not icao or not name:
+            for i, row in enumerate(csv.DictReader(f), start=2):  # start=2 accounts for header row = line 1
+                parsed = {key: pick(row, headers) for key, headers in HEADERS.items()}
+                parsed["icao"] = parsed["icao"].upper()
+                if not parsed["icao"] or not parsed["name"]:
                     skipped_rows += 1
                     self.stdout.write(self.style.WARNING(
                         f"[line {i}] Skipped: missing required ICAO and/or FBO name."
                     ))
                     continue
-
-                airport = Airport.objects.filter(icao_code__iexact=icao).first()
-                if not airport:
-                    missing_airports += 1
-                    self.stdout.write(self.style.WARNING(
-                        f"[line {i}] No Airport found for ICAO '{icao}'. Row skipped."
-                    ))
-                    continue
-
-                # Try to find an existing FBO by name (+email/phone if available) to avoid global name collisions
-                fbo_qs = FBO.objects.filter(name__iexact=name)
-                if email:
-                    fbo_qs = fbo_qs.filter(email__iexact=email) | fbo_qs
-                if phone:
-                    fbo_qs = fbo_qs.filter(phone__iexact=phone) | fbo_qs
-
-                fbo = fbo_qs.distinct().first()
-
-                if fbo is None:
-                    # Create new FBO
-                    fbo = FBO(
-                        name=name,
-                        phone=phone or None,
-                        phone_secondary=phone2 or None,
-                        email=email or None,
-                        notes=notes or None,
-                    )
-                    if not dry_run:
-                        fbo.save()
-                    created_fbos += 1
-                    self.stdout.write(self.style.SUCCESS(
-                        f"[line {i}] Created FBO '{name}'."
-                    ))
-                else:
-                    # Optionally update existing with any new info provided
-                    if do_update:
-                        changed = False
-                        if phone and fbo.phone != phone:
-                            fbo.phone = phone
-                            changed = True
-                        if phone2 and fbo.phone_secondary != phone2:
-                            fbo.phone_secondary = phone2
-                            changed = True
-                        if email and (fbo.email or "").lower() != email.lower():
-                            fbo.email = email
-                            changed = True
-                        if notes and (fbo.notes or "").strip() != notes:
-                            fbo.notes = notes
-                            changed = True
-                        if changed and not dry_run:
-                            fbo.save()
-                            updated_fbos += 1
-                            self.stdout.write(self.style.SUCCESS(
-                                f"[line {i}] Updated FBO '{name}'."
-                            ))
-
-                # Link to Airport via M2M (Airport ↔ FBO)
-                if not dry_run:
-                    airport.fbos.add(fbo)
-                linked_pairs += 1
+                parsed["line"] = i
+                rows.append(parsed)
+
+        normalize_contacts(rows)
+
+        # Preload lookups once instead of querying per row
+        airport_ids = {
+            icao.upper(): airport_id
+            for airport_id, icao in Airport.objects.filter(icao_code__isnull=False).values_list("id", "icao_code")
+        }
+        fbos_by_name = {}
+        for fbo in FBO.objects.order_by("created_on"):
+            fbos_by_name.setdefault(fbo.name.casefold(), fbo)
+
+        new_fbos = []
+        changed_fbos = {}
+        links = {}
+
+        for row in rows:
+            airport_id = airport_ids.get(row["icao"])
+            if airport_id is None:
+                missing_airports += 1
+                self.stdout.write(self.style.WARNING(
+                    f"[line {row['line']}] No Airport found for ICAO '{row['icao']}'. Row skipped."
+                ))
+                continue
+
+            name, phone, phone2, email, notes = (
+                row["name"], row["phone"], row["phone2"], row["email"], row["notes"]
+            )
+            key = name.casefold()
+            fbo = fbos_by_name.get(key)
+
+            if fbo is None:
+                fbo = FBO(
+                    name=name,
+                    phone=phone or None,
+                    phone_secondary=phone2 or None,
+                    email=email or None,
+                    notes=notes or None,
+                )
+                fbos_by_name[key] = fbo
+                new_fbos.append(fbo)
+                if verbose:
+                    self.stdout.write(self.style.SUCCESS(f"[line {row['line']}] Created FBO '{name}'."))
+            elif do_update and not fbo._state.adding:
+                # Optionally update existing with any new info provided
+                changed = False
+                if phone and fbo.phone != phone:
+                    fbo.phone = phone
+                    changed = True
+                if phone2 and fbo.phone_secondary != phone2:
+                    fbo.phone_secondary = phone2
+                    changed = True
+                if email and (fbo.email or "").lower() != email.lower():
+                    fbo.email = email
+                    changed = True
+                if notes and (fbo.notes or "").strip() != notes:
+                    fbo.notes = notes
+                    changed = True
+                if changed:
+                    fbo.modified_on = timezone.now()
+                    changed_fbos[fbo.pk] = fbo
+                    if verbose:
+                        self.stdout.write(self.style.SUCCESS(f"[line {row['line']}] Updated FBO '{name}'."))
+
+            # Link to Airport via M2M (Airport ↔ FBO)
+            links[(airport_id, fbo.pk)] = None
+
+        # Only link pairs that don't exist yet
+        Link = Airport.fbos.through
+        existing_links = set(
+            Link.objects.filter(airport_id__in={a for a, _ in links}).values_list("airport_id", "fbo_id")
+        )
+        new_links = [
+            Link(airport_id=airport_id, fbo_id=fbo_id)
+            for airport_id, fbo_id in links
+            if (airport_id, fbo_id) not in existing_links
+        ]
+
+        if not dry_run:
+            FBO.objects.bulk_create(new_fbos, batch_size=batch_size)
+            if changed_fbos:
+                FBO.objects.bulk_update(
+                    list(changed_fbos.values()),
+                    ["phone", "phone_secondary", "email", "notes", "modified_on"],
+                    batch_size=batch_size,
+                )
+            Link.objects.bulk_create(new_links, batch_size=batch_size, ignore_conflicts=True)
 
         if dry_run:
             self.stdout.write(self.style.WARNING("DRY RUN: no changes were written."))
 
         self.stdout.write(self.style.SUCCESS(
-            f"Done. Created FBOs: {created_fbos}, Updated: {updated_fbos}, "
-            f"Linked (Airport↔FBO): {linked_pairs}, Skipped rows: {skipped_rows}, "
+            f"Done. Created FBOs: {len(new_fbos)}, Updated: {len(changed_fbos)}, "
+            f"Linked (Airport↔FBO): {len(new_links)}, Skipped rows: {skipped_rows}, "
             f"Missing airports: {missing_airports}"
         ))
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-19 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0025_make_quote_legacy_fields_nullable"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="airport",
+            name="import_hash",
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+    ]
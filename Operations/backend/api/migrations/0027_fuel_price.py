@@ -0,0 +1,31 @@
+# Generated by Django 5.1.15 on 2026-10-19 12:09
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0026_airport_import_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FuelPrice",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("fbo_name", models.CharField(max_length=255)),
+                ("jet_a_price", models.DecimalField(decimal_places=2, max_digits=8)),
+                ("observed_at", models.DateTimeField()),
+                ("source", models.CharField(default="flightaware", max_length=50)),
+                ("airport", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="fuel_prices", to="api.airport")),
+                ("fbo", models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="fuel_prices", to="api.fbo")),
+            ],
+            options={
+                "ordering": ["-observed_at"],
+                "indexes": [models.Index(fields=["airport", "observed_at"], name="api_fuelpri_airport_0263e3_idx")],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.15 on 2026-10-19 12:35
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0030_document_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='debounce_key',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=200),
+        ),
+        migrations.CreateModel(
+            name='TripDocumentStatus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('document_type', models.CharField(choices=[('gendec', 'General Declaration'), ('quote', 'Quote Form'), ('customer_itinerary', 'Customer Itinerary'), ('internal_itinerary', 'Internal Itinerary'), ('payment_agreement', 'Payment Agreement'), ('consent_transport', 'Consent for Transport'), ('psa', 'Patient Service Agreement'), ('handling_request', 'Handling Request'), ('letter_of_medical_necessity', 'Letter of Medical Necessity'), ('insurance_card', 'Insurance Card')], max_length=50)),
+                ('stale', models.BooleanField(default=True)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('generated_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('document', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.document')),
+                ('trip', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='document_statuses', to='api.trip')),
+            ],
+            options={
+                'ordering': ['document_type'],
+                'unique_together': {('trip', 'document_type')},
+            },
+        ),
+    ]
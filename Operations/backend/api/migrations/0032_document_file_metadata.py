@@ -0,0 +1,32 @@
+# Generated by Django 5.1.15 on 2026-10-19 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0031_trip_document_status'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='document',
+            options={'base_manager_name': 'objects'},
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='file_sha256',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='file_size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='mime_type',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-19 12:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0032_document_file_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='storage_key',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-19 12:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0033_document_storage_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='encrypted',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.15 on 2026-10-19 12:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0034_document_encrypted'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentPreview',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('thumbnail', 'Thumbnail'), ('preview', 'Preview'), ('display', 'Display copy')], max_length=20)),
+                ('storage_key', models.CharField(max_length=255)),
+                ('mime_type', models.CharField(max_length=100)),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('file_size', models.BigIntegerField()),
+                ('file_sha256', models.CharField(max_length=64)),
+                ('encrypted', models.BooleanField(default=False)),
+                ('created_on', models.DateTimeField(auto_now_add=True)),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='previews', to='api.document')),
+            ],
+            options={
+                'unique_together': {('document', 'kind')},
+            },
+        ),
+    ]
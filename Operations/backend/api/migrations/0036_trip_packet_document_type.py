@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-19 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0035_document_preview'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='document',
+            name='document_type',
+            field=models.CharField(blank=True, choices=[('gendec', 'General Declaration'), ('quote', 'Quote Form'), ('customer_itinerary', 'Customer Itinerary'), ('internal_itinerary', 'Internal Itinerary'), ('payment_agreement', 'Payment Agreement'), ('consent_transport', 'Consent for Transport'), ('psa', 'Patient Service Agreement'), ('handling_request', 'Handling Request'), ('letter_of_medical_necessity', 'Letter of Medical Necessity'), ('insurance_card', 'Insurance Card'), ('trip_packet', 'Trip Packet')], max_length=50, null=True),
+        ),
+        migrations.AlterField(
+            model_name='tripdocumentstatus',
+            name='document_type',
+            field=models.CharField(choices=[('gendec', 'General Declaration'), ('quote', 'Quote Form'), ('customer_itinerary', 'Customer Itinerary'), ('internal_itinerary', 'Internal Itinerary'), ('payment_agreement', 'Payment Agreement'), ('consent_transport', 'Consent for Transport'), ('psa', 'Patient Service Agreement'), ('handling_request', 'Handling Request'), ('letter_of_medical_necessity', 'Letter of Medical Necessity'), ('insurance_card', 'Insurance Card'), ('trip_packet', 'Trip Packet')], max_length=50),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.15 on 2026-10-19 13:14
+
+from django.db import migrations, models
+
+
+def copy_documents(apps, schema_editor):
+    TripDocumentStatus = apps.get_model('api', 'TripDocumentStatus')
+    for status in TripDocumentStatus.objects.exclude(document=None):
+        status.documents.add(status.document_id)
+    # Itineraries are now rendered per crew line and handling requests per leg
+    TripDocumentStatus.objects.filter(
+        document_type__in=['customer_itinerary', 'internal_itinerary', 'handling_request']
+    ).update(stale=True)
+
+
+def copy_documents_back(apps, schema_editor):
+    TripDocumentStatus = apps.get_model('api', 'TripDocumentStatus')
+    for status in TripDocumentStatus.objects.all():
+        status.document = status.documents.order_by('filename').first()
+        status.save(update_fields=['document'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0037_document_export_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tripdocumentstatus',
+            name='documents',
+            field=models.ManyToManyField(blank=True, related_name='+', to='api.document'),
+        ),
+        migrations.RunPython(copy_documents, copy_documents_back),
+        migrations.RemoveField(
+            model_name='tripdocumentstatus',
+            name='document',
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import User
+import mimetypes
+import os
 import uuid
 from django.utils import timezone
 from django.contrib.contenttypes.fields import GenericForeignKey
@@ -674,11 +676,39 @@ class Airport(BaseModel):
     grounds = models.ManyToManyField(Ground, related_name="airports", blank=True)
 
     timezone = models.CharField(max_length=50)
+    # SHA-256 of the source CSV row, used by import_airports --incremental to skip unchanged rows
+    import_hash = models.CharField(max_length=64, blank=True, null=True, editable=False)
 
     def __str__(self):
         return f"{self.name} ({self.icao_code}/{self.iata_code})"
 
+# Scraped Jet-A price observations (append-only time series)
+class FuelPrice(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    airport = models.ForeignKey(Airport, on_delete=models.CASCADE, related_name="fuel_prices")
+    fbo = models.ForeignKey(FBO, on_delete=models.SET_NULL, null=True, blank=True, related_name="fuel_prices")
+    fbo_name = models.CharField(max_length=255)
+    jet_a_price = models.DecimalField(max_digits=8, decimal_places=2)
+    observed_at = models.DateTimeField()
+    source = models.CharField(max_length=50, default="flightaware")
+
+    class Meta:
+        ordering = ['-observed_at']
+        indexes = [
+            models.Index(fields=['airport', 'observed_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.fbo_name} @ {self.airport_id}: {self.jet_a_price} ({self.observed_at})"
+
 # Document model (for file storage)
+class DocumentManager(models.Manager):
+    """Leaves the content blob out of every query; it loads on first access to document.content."""
+
+    def get_queryset(self):
+        return super().get_queryset().defer('content')
+
+
 class Document(models.Model):
     DOCUMENT_TYPES = [
         ('gendec', 'General Declaration'),
@@ -691,13 +721,21 @@ class Document(models.Model):
         ('handling_request', 'Handling Request'),
         ('letter_of_medical_necessity', 'Letter of Medical Necessity'),
         ('insurance_card', 'Insurance Card'),
+        ('trip_packet', 'Trip Packet'),  # merged packet documents (api/trip_packet.py)
+        ('document_export', 'Document Export'),  # ZIP of exported documents (api/document_export.py)
     ]
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     filename = models.CharField(max_length=255)
     content = models.BinaryField(null=True, blank=True)  # Making it optional since we'll use file_path
-    file_path = models.CharField(max_length=500, blank=True, null=True)  # Path to file on filesystem
+    file_path = models.CharField(max_length=500, blank=True, null=True)  # Legacy path to file on filesystem, before storage_key
     document_type = models.CharField(max_length=50, choices=DOCUMENT_TYPES, null=True, blank=True)
+    content_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True)  # Hash of a generated document's inputs
+    storage_key = models.CharField(max_length=255, null=True, blank=True)  # Relative key in document storage (api/document_storage.py)
+    file_size = models.BigIntegerField(null=True, blank=True)  # bytes, of the plaintext if encrypted
+    file_sha256 = models.CharField(max_length=64, null=True, blank=True)
+    mime_type = models.CharField(max_length=100, null=True, blank=True)
+    encrypted = models.BooleanField(default=False)  # stored file is in FileEncryption's chunked format
     flag = models.IntegerField(default=0)
     created_on = models.DateTimeField(auto_now_add=True)
     
@@ -708,10 +746,46 @@ class Document(models.Model):
     passenger = models.ForeignKey('Passenger', on_delete=models.CASCADE, related_name='passenger_documents', null=True, blank=True)
     created_by = models.ForeignKey('auth.User', on_delete=models.SET_NULL, null=True, blank=True, related_name='created_documents')
     
+    objects = DocumentManager()
+    
+    class Meta:
+        # Related lookups (patient.insurance_card, contract.signed_document) defer content too
+        base_manager_name = 'objects'
+    
     def __str__(self):
         doc_type = dict(self.DOCUMENT_TYPES).get(self.document_type, 'Document')
         return f"{doc_type}: {self.filename}"
 
+class DocumentPreview(models.Model):
+    """A downscaled image of a Document, rendered by api/document_previews.py."""
+    KINDS = [
+        ('thumbnail', 'Thumbnail'),
+        ('preview', 'Preview'),
+        ('display', 'Display copy'),  # recompressed copy of an oversized photo
+    ]
+
+    document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name='previews')
+    kind = models.CharField(max_length=20, choices=KINDS)
+    storage_key = models.CharField(max_length=255)
+    mime_type = models.CharField(max_length=100)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    file_size = models.BigIntegerField()  # bytes, of the plaintext if encrypted
+    file_sha256 = models.CharField(max_length=64)
+    encrypted = models.BooleanField(default=False)
+    created_on = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = [('document', 'kind')]
+
+    @property
+    def filename(self):
+        stem = os.path.splitext(self.document.filename or str(self.document_id))[0]
+        return f"{stem}_{self.kind}{mimetypes.guess_extension(self.mime_type) or ''}"
+
+    def __str__(self):
+        return f"{self.kind} of {self.document_id}"
+
 # Aircraft model
 class Aircraft(BaseModel):
     tail_number = models.CharField(max_length=20, unique=True, db_index=True)
@@ -1537,4 +1611,84 @@ class SMSVerificationCode(models.Model):
         return timezone.now() > self.expires_at
 
     def can_attempt(self):
-        return self.attempts < 5 and not self.verified and not self.is_expired()
\ No newline at end of file
+        return self.attempts < 5 and not self.verified and not self.is_expired()
+
+    @classmethod
+    def cleanup_expired(cls):
+        """Delete expired, unverified codes in chunks; returns how many were deleted."""
+        from utils.schedulers.periodic import delete_in_chunks
+        return delete_in_chunks(cls.objects.filter(expires_at__lt=timezone.now(), verified=False))
+
+# Background job queue (claimed by `manage.py run_workers`)
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    queue = models.CharField(max_length=50, default='default')
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=255, blank=True, default='')
+    result = models.JSONField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    debounce_key = models.CharField(max_length=200, blank=True, default='', db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['queue', 'status', 'run_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} [{self.status}] ({self.id})"
+
+
+# Periodic task state and runtime metrics (see utils/schedulers/periodic.py)
+class ScheduledTask(models.Model):
+    name = models.CharField(max_length=100, primary_key=True)
+    last_started_at = models.DateTimeField(null=True, blank=True)
+    last_finished_at = models.DateTimeField(null=True, blank=True)
+    last_status = models.CharField(max_length=20, blank=True, default='')
+    last_result = models.JSONField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    last_duration_ms = models.IntegerField(default=0)
+    max_duration_ms = models.IntegerField(default=0)
+    total_duration_ms = models.BigIntegerField(default=0)
+    run_count = models.IntegerField(default=0)
+    failure_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return f"{self.name} ({self.last_status or 'never run'})"
+
+
+# Freshness of a trip's pre-generated packet documents (see api/document_pregeneration.py)
+class TripDocumentStatus(models.Model):
+    trip = models.ForeignKey(Trip, on_delete=models.CASCADE, related_name='document_statuses')
+    document_type = models.CharField(max_length=50, choices=Document.DOCUMENT_TYPES)
+    stale = models.BooleanField(default=True)
+    changed_at = models.DateTimeField(default=timezone.now)  # last change to the trip that affects this document
+    generated_at = models.DateTimeField(null=True, blank=True)
+    documents = models.ManyToManyField(Document, blank=True, related_name='+')  # one per crew line or leg for some types
+    last_error = models.TextField(blank=True, default='')
+
+    class Meta:
+        unique_together = [('trip', 'document_type')]
+        ordering = ['document_type']
+
+    def __str__(self):
+        return f"{self.trip_id} {self.document_type} ({'stale' if self.stale else 'fresh'})"
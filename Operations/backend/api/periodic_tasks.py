@@ -0,0 +1,133 @@
+"""
+Periodic maintenance tasks, run by `manage.py run_scheduler`.
+
+Each returns a small JSON-serialisable summary that is stored on its
+ScheduledTask row alongside the runtime metrics.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from utils.schedulers.periodic import delete_in_chunks, periodic
+
+from .models import Contract, Document, Job, SMSVerificationCode, UserActivationToken
+
+logger = logging.getLogger(__name__)
+
+
+@periodic('cleanup_sms_codes', '*/15 * * * *')
+def cleanup_sms_codes():
+    """Delete expired, unverified SMS verification codes."""
+    return {'deleted': SMSVerificationCode.cleanup_expired()}
+
+
+@periodic('cleanup_activation_tokens', '5 * * * *')
+def cleanup_activation_tokens():
+    """Delete activation/password reset tokens that expired or were used more than ACTIVATION_TOKEN_RETENTION_DAYS ago."""
+    cutoff = timezone.now() - timedelta(days=getattr(settings, 'ACTIVATION_TOKEN_RETENTION_DAYS', 7))
+    stale = UserActivationToken.objects.filter(
+        Q(expires_at__lt=cutoff) | Q(is_used=True, used_at__lt=cutoff)
+    )
+    return {'deleted': delete_in_chunks(stale)}
+
+
+@periodic('flush_expired_jwt', '30 3 * * *')
+def flush_expired_jwt():
+    """Delete expired outstanding (and with them blacklisted) refresh tokens."""
+    if not apps.is_installed('rest_framework_simplejwt.token_blacklist'):
+        return {'skipped': 'rest_framework_simplejwt.token_blacklist is not installed'}
+
+    from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+    expired = OutstandingToken.objects.filter(expires_at__lte=timezone.now())
+    return {'deleted': delete_in_chunks(expired)}
+
+
+@periodic('cleanup_jobs', '15 4 * * *')
+def cleanup_jobs():
+    """Delete finished background jobs older than JOB_RETENTION_DAYS."""
+    cutoff = timezone.now() - timedelta(days=getattr(settings, 'JOB_RETENTION_DAYS', 14))
+    finished = Job.objects.filter(status__in=['succeeded', 'failed'], finished_at__lt=cutoff)
+    return {'deleted': delete_in_chunks(finished)}
+
+
+@periodic('cleanup_document_exports', '45 4 * * *')
+def cleanup_document_exports():
+    """Delete bulk document exports (and their files) older than DOCUMENT_EXPORT_RETENTION_DAYS."""
+    from .document_storage import delete_document_file
+
+    cutoff = timezone.now() - timedelta(days=getattr(settings, 'DOCUMENT_EXPORT_RETENTION_DAYS', 7))
+    deleted = 0
+    for document in Document.objects.filter(document_type='document_export', created_on__lt=cutoff):
+        delete_document_file(document)
+        document.delete()
+        deleted += 1
+    return {'deleted': deleted}
+
+
+@periodic('refresh_docuseal_status', '*/30 * * * *')
+def refresh_docuseal_status():
+    """Poll DocuSeal for pending contracts whose completion webhook may have been missed."""
+    from utils.services.docuseal_service import DocuSealService
+
+    from .jobs import enqueue
+
+    min_age = timezone.now() - timedelta(minutes=getattr(settings, 'DOCUSEAL_STATUS_REFRESH_MIN_AGE', 30))
+    pending = Contract.objects.filter(
+        status='pending', docuseal_submission_id__isnull=False, date_sent__lt=min_age
+    ).order_by('date_sent')[:getattr(settings, 'DOCUSEAL_STATUS_REFRESH_BATCH', 100)]
+
+    service = DocuSealService()
+    summary = {'checked': 0, 'signed': 0, 'expired': 0, 'failed': 0}
+    for contract in pending:
+        summary['checked'] += 1
+        try:
+            submission = service.get_submission(contract.docuseal_submission_id)
+        except Exception as e:
+            logger.warning(f"DocuSeal status refresh failed for contract {contract.id}: {str(e)}")
+            summary['failed'] += 1
+            continue
+
+        submission_status = submission.get('status')
+        if submission_status == 'completed':
+            contract.status = 'signed'
+            contract.date_signed = contract.date_signed or timezone.now()
+            summary['signed'] += 1
+        elif submission_status == 'expired':
+            contract.status = 'expired'
+            contract.date_expired = contract.date_expired or timezone.now()
+            summary['expired'] += 1
+
+        contract.docuseal_response_data.update({
+            'last_status_refresh': timezone.now().isoformat(),
+            'last_submission_status': submission_status,
+        })
+        contract.save()
+
+        # Only after the save above, so the job's own save of the contract can't be overwritten by it
+        if submission_status == 'completed' and not contract.signed_document_id:
+            enqueue('contracts.download_signed_document', {
+                'contract_id': str(contract.id),
+                'submission_id': contract.docuseal_submission_id,
+            })
+
+    return summary
+
+
+@periodic('warm_fuel_prices', '*/10 * * * *')
+def warm_fuel_prices():
+    """
+    Refresh fuel prices for airports on upcoming trips and record them in the price history.
+
+    Web workers' lookups read recent scrapes from the history, so this warms
+    them too, not just the scheduler's own cache.
+    """
+    from .fuel_prices import warm_fuel_prices as warm
+
+    result = warm()
+    return {key: len(codes) for key, codes in result.items()}
@@ -0,0 +1,131 @@
+"""
+Quote PDFs, rendered once per version of the quote.
+
+A quote has two PDFs: the branded reportlab layout downloaded from
+QuoteViewSet.pdf ('report', documents/templates/quote_report.py) and the
+Quote.pdf form template emailed to customers and generated by
+generate_quote_document ('form'). Both render through
+api/document_rendering.py, so the Document is keyed by a hash of everything
+printed on it plus the renderer (template file, populate function and
+RENDER_VERSION): until the quote, its contact, patient or airports change,
+repeated downloads and emails get the stored PDF back without rendering.
+Form PDFs are the quote paperwork and are linked to the trip booked from the
+quote; report PDFs only back the download and aren't, and are named
+quote_report_<id> so the two are never mistaken for each other.
+
+`python manage.py benchmark_quote_pdf` compares the two renderers.
+"""
+
+import os
+
+from django.conf import settings
+
+from .document_rendering import RenderTask, render_documents
+
+RENDERERS = ['report', 'form']
+
+
+def quote_form_data(quote):
+    """QuoteData for the Quote.pdf form template."""
+    from documents.templates.docs import QuoteData
+
+    return QuoteData(
+        quote_id=str(quote.id.hex[:8].upper()),
+        inquiry_date=quote.inquiry_date.strftime('%Y-%m-%d') if quote.inquiry_date else '',
+        patient_name=f"{quote.patient.info.first_name} {quote.patient.info.last_name}" if quote.patient and quote.patient.info else '',
+        aircraft_type=quote.get_aircraft_type_display(),
+        pickup_airport=f"{quote.pickup_airport.name} ({quote.pickup_airport.ident})" if quote.pickup_airport else '',
+        dropoff_airport=f"{quote.dropoff_airport.name} ({quote.dropoff_airport.ident})" if quote.dropoff_airport else '',
+        trip_date=quote.created_on.strftime('%Y-%m-%d') if quote.created_on else '',
+        esitmated_flight_time=str(quote.estimated_flight_time) if quote.estimated_flight_time else '',
+        number_of_stops=str(quote.number_of_stops),
+        medical_team=quote.get_medical_team_display(),
+        include_grounds='Yes' if quote.includes_grounds else 'No',
+        our_availability='Available',
+        amount=f"${quote.quoted_amount:,.2f}" if quote.quoted_amount else '',
+        notes=f"Quote generated on {quote.created_on.strftime('%Y-%m-%d')}" if quote.created_on else '',
+    )
+
+
+def quote_report_data(quote):
+    """QuoteReportData for the reportlab quote layout."""
+    from documents.templates.quote_report import QuoteReportData
+
+    bill_to = []
+    contact = quote.contact
+    if contact:
+        name = f"{contact.first_name} {contact.last_name}"
+        bill_to += [contact.business_name, name] if contact.business_name else [name]
+        bill_to += [line for line in (contact.address_line1, contact.address_line2) if line]
+        if contact.city:
+            city_line = contact.city
+            if contact.state:
+                city_line += f", {contact.state}"
+            if contact.zip:
+                city_line += f" {contact.zip}"
+            bill_to.append(city_line)
+        if contact.email:
+            bill_to.append(f"Email: {contact.email}")
+        if contact.phone:
+            bill_to.append(f"Phone: {contact.phone}")
+
+    patient = []
+    if quote.patient and quote.patient.info:
+        info = quote.patient.info
+        patient.append(('Patient Name:', f"{info.first_name} {info.last_name}"))
+        if info.date_of_birth:
+            patient.append(('Date of Birth:', info.date_of_birth.strftime('%B %d, %Y')))
+        if info.nationality:
+            patient.append(('Nationality:', info.nationality))
+
+    route = "Medical Air Transport"
+    if quote.pickup_airport and quote.dropoff_airport:
+        route = f"{quote.pickup_airport.name} → {quote.dropoff_airport.name}"
+
+    return QuoteReportData(
+        quote_number=quote.id.hex[:8].upper(),
+        date=quote.created_on.strftime('%B %d, %Y') if quote.created_on else 'N/A',
+        bill_to=bill_to,
+        route=route,
+        aircraft=quote.get_aircraft_type_display(),
+        medical_team=quote.get_medical_team_display(),
+        flight_time=str(quote.estimated_flight_time) if quote.estimated_flight_time else 'TBD',
+        amount=f"${quote.quoted_amount:,.2f}",
+        includes_grounds=quote.includes_grounds,
+        patient=patient,
+    )
+
+
+def quote_render_task(quote, renderer: str = 'report') -> RenderTask:
+    """The render task for one of a quote's PDFs."""
+    output_dir = os.path.join(settings.BASE_DIR, 'documents', 'generated')
+    if renderer == 'report':
+        from documents.templates.quote_report import TEMPLATE_PATH, populate_quote_report
+        name = f"quote_report_{quote.id.hex[:8]}"
+        return RenderTask(populate_quote_report, TEMPLATE_PATH, output_dir, name, quote_report_data(quote), 'quote')
+    if renderer == 'form':
+        from documents.templates.docs import populate_quote_pdf
+        template_path = os.path.join(settings.BASE_DIR, 'documents', 'templates', 'nosign_pdf', 'Quote.pdf')
+        name = f"quote_{quote.id.hex[:8]}"
+        return RenderTask(populate_quote_pdf, template_path, output_dir, name, quote_form_data(quote), 'quote')
+    raise ValueError(f"Unknown quote renderer '{renderer}'")
+
+
+def quote_document(quote, renderer: str = 'report', created_by=None):
+    """
+    The quote's PDF Document, rendered only if this version of the quote
+    hasn't been rendered by this renderer before.
+
+    A form PDF is linked to the trip booked from the quote, if there is
+    one; a report PDF belongs to no trip.
+
+    Raises:
+        RuntimeError: If rendering fails
+    """
+    from .models import Trip
+
+    trip = Trip.objects.filter(quote=quote).first() if renderer == 'form' else None
+    result = render_documents([quote_render_task(quote, renderer)], trip=trip, created_by=created_by)[0]
+    if not result.success:
+        raise RuntimeError(f"Failed to generate quote document for {quote.id}: {result.error}")
+    return result.document
@@ -0,0 +1,196 @@
+"""
+Batch route estimation for quoting.
+
+Given many candidate routes (pickup, optional fuel stops, dropoff) and one or
+more aircraft types, this module computes distance, flight time, block time and
+stop count for every combination in a single vectorized pass. Results for each
+(origin, destination, aircraft) leg are cached so that re-pricing the same
+alternatives is effectively free.
+"""
+
+import hashlib
+from dataclasses import astuple, dataclass
+from datetime import timedelta
+from typing import Dict, List, Sequence
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .spatial import haversine
+
+
+@dataclass(frozen=True)
+class AircraftProfile:
+    code: str
+    name: str
+    cruise_speed_kts: float       # average block cruise true airspeed
+    max_range_nm: float           # usable still-air range with medevac load and reserves
+    climb_descent_minutes: float  # added per leg over pure cruise time
+    taxi_minutes: float           # taxi out + taxi in per leg
+    fuel_stop_minutes: float      # ground time at each fuel stop
+
+
+DEFAULT_AIRCRAFT_PROFILES = {
+    '35': AircraftProfile('35', 'Learjet 35', cruise_speed_kts=420, max_range_nm=1700,
+                          climb_descent_minutes=12, taxi_minutes=15, fuel_stop_minutes=45),
+    '65': AircraftProfile('65', 'Learjet 65', cruise_speed_kts=450, max_range_nm=2100,
+                          climb_descent_minutes=12, taxi_minutes=15, fuel_stop_minutes=45),
+}
+
+# Quotes with an undecided aircraft are estimated with the shorter-legged aircraft
+TBD_PROFILE = '35'
+
+# Bump when the estimation formula changes to orphan old cache entries (profile values are part of the key)
+ESTIMATOR_VERSION = 1
+LEG_CACHE_TTL = 60 * 60 * 24
+
+NM_TO_SM = 1.150779
+
+
+def get_aircraft_profiles() -> Dict[str, AircraftProfile]:
+    overrides = getattr(settings, 'AIRCRAFT_PERFORMANCE_PROFILES', None) or {}
+    profiles = dict(DEFAULT_AIRCRAFT_PROFILES)
+    for code, values in overrides.items():
+        profiles[code] = AircraftProfile(code=code, **values)
+    return profiles
+
+
+def get_profile(aircraft_type: str) -> AircraftProfile:
+    profiles = get_aircraft_profiles()
+    if aircraft_type == 'TBD':
+        aircraft_type = TBD_PROFILE
+    try:
+        return profiles[aircraft_type]
+    except KeyError:
+        raise ValueError(f"No performance profile for aircraft type '{aircraft_type}'")
+
+
+def _profile_fingerprint(profile: AircraftProfile) -> str:
+    """Short hash of a profile's values, so overriding a profile doesn't serve estimates made with the old one."""
+    return hashlib.sha1(repr(astuple(profile)).encode()).hexdigest()[:12]
+
+
+def _leg_cache_key(origin_id, destination_id, profile: AircraftProfile, fingerprint: str = ''):
+    fingerprint = fingerprint or _profile_fingerprint(profile)
+    return f"route_leg:v{ESTIMATOR_VERSION}:{origin_id}:{destination_id}:{profile.code}:{fingerprint}"
+
+
+def estimate_legs(leg_coords: np.ndarray, profile: AircraftProfile) -> Dict[str, np.ndarray]:
+    """
+    Vectorized estimates for an array of legs flown by one aircraft.
+
+    Args:
+        leg_coords: float array of shape (n, 4) with origin lat/lon and destination lat/lon
+        profile: Aircraft performance profile
+
+    Returns:
+        Dict of arrays (length n): distance_nm, fuel_stops, flight_minutes, block_minutes
+    """
+    distance_nm = haversine(leg_coords[:, 0], leg_coords[:, 1], leg_coords[:, 2], leg_coords[:, 3], unit='nm')
+    distance_nm = np.atleast_1d(distance_nm)
+
+    # A leg beyond range is split into equal segments with a fuel stop between each
+    segments = np.maximum(np.ceil(distance_nm / profile.max_range_nm), 1.0)
+    fuel_stops = segments - 1.0
+
+    flight_minutes = distance_nm / profile.cruise_speed_kts * 60.0 + segments * profile.climb_descent_minutes
+    block_minutes = flight_minutes + segments * profile.taxi_minutes + fuel_stops * profile.fuel_stop_minutes
+
+    return {
+        'distance_nm': distance_nm,
+        'fuel_stops': fuel_stops,
+        'flight_minutes': flight_minutes,
+        'block_minutes': block_minutes,
+    }
+
+
+def estimate_routes(routes: Sequence[Sequence], aircraft_types: Sequence[str], airports: Dict) -> List[dict]:
+    """
+    Estimate every route for every aircraft type.
+
+    Args:
+        routes: Sequence of waypoint lists; each is [origin_id, *stop_ids, destination_id]
+        aircraft_types: Aircraft type codes as used on Quote.aircraft_type ('35', '65', 'TBD')
+        airports: Mapping of airport id to Airport (must contain every waypoint)
+
+    Returns:
+        One dict per (route, aircraft_type), in input order, with distance,
+        number_of_stops, estimated_flight_time and block_time
+    """
+    # Flatten all routes into a unique list of legs
+    legs = []
+    leg_position = {}
+    route_legs = []
+    for waypoints in routes:
+        positions = []
+        for origin_id, destination_id in zip(waypoints[:-1], waypoints[1:]):
+            key = (origin_id, destination_id)
+            if key not in leg_position:
+                leg_position[key] = len(legs)
+                legs.append(key)
+            positions.append(leg_position[key])
+        route_legs.append(positions)
+
+    results = []
+    for aircraft_type in aircraft_types:
+        profile = get_profile(aircraft_type)
+        leg_estimates = _estimate_legs_cached(legs, profile, airports)
+
+        for waypoints, positions in zip(routes, route_legs):
+            idx = np.asarray(positions, dtype=np.int64)
+            distance_nm = float(leg_estimates[idx, 0].sum())
+            fuel_stops = int(leg_estimates[idx, 1].sum())
+            flight_minutes = float(leg_estimates[idx, 2].sum())
+            block_minutes = float(leg_estimates[idx, 3].sum())
+            planned_stops = len(waypoints) - 2
+            # Ground time at planned stops is not part of any single leg's block time
+            block_minutes += planned_stops * profile.fuel_stop_minutes
+
+            results.append({
+                'route': list(waypoints),
+                'aircraft_type': aircraft_type,
+                'aircraft_profile': profile.code,
+                'distance_nm': round(distance_nm, 1),
+                'distance_sm': round(distance_nm * NM_TO_SM, 1),
+                'number_of_stops': planned_stops + fuel_stops,
+                'additional_fuel_stops': fuel_stops,
+                'estimated_flight_time': timedelta(minutes=round(flight_minutes)),
+                'block_time': timedelta(minutes=round(block_minutes)),
+            })
+
+    return results
+
+
+def _estimate_legs_cached(legs, profile, airports) -> np.ndarray:
+    """
+    Estimates for unique legs as an (n, 4) array, served from cache where possible.
+    Columns: distance_nm, fuel_stops, flight_minutes, block_minutes
+    """
+    fingerprint = _profile_fingerprint(profile)
+    keys = [_leg_cache_key(o, d, profile, fingerprint) for o, d in legs]
+    cached = cache.get_many(keys) if keys else {}
+
+    estimates = np.zeros((len(legs), 4), dtype=np.float64)
+    missing = []
+    for i, key in enumerate(keys):
+        if key in cached:
+            estimates[i] = cached[key]
+        else:
+            missing.append(i)
+
+    if missing:
+        coords = np.array([
+            [float(airports[legs[i][0]].latitude), float(airports[legs[i][0]].longitude),
+             float(airports[legs[i][1]].latitude), float(airports[legs[i][1]].longitude)]
+            for i in missing
+        ], dtype=np.float64)
+        computed = estimate_legs(coords, profile)
+        block = np.column_stack([
+            computed['distance_nm'], computed['fuel_stops'],
+            computed['flight_minutes'], computed['block_minutes'],
+        ])
+        estimates[missing] = block
+        cache.set_many({keys[i]: tuple(float(v) for v in row) for i, row in zip(missing, block)}, LEG_CACHE_TTL)
+
+    return estimates
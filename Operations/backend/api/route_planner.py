@@ -0,0 +1,268 @@
+"""
+Range-constrained fuel-stop route planning.
+
+Plans the minimum-time sequence of fuel stops between two airports for a given
+aircraft profile. The search runs A* over a graph of airports suitable for a
+fuel stop (filtered by airport type as a proxy for runway class, optionally
+requiring an FBO). Graph nodes live in a spatial grid built once per process;
+edges (every suitable airport within range) are generated on demand with a
+vectorized radius query and memoized per node.
+"""
+
+import heapq
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .route_estimation import AircraftProfile
+from .spatial import AirportSpatialIndex, get_airport_index, haversine
+
+
+# Airport types a Learjet can plan a fuel stop at; small airports rarely have the runway or Jet-A
+DEFAULT_STOP_AIRPORT_TYPES = ('large_airport', 'medium_airport')
+DEFAULT_MAX_STOPS = 4
+NEIGHBOR_CACHE_SIZE = 2048
+
+
+class NoRouteFound(Exception):
+    """Raised when no stop sequence satisfies the range and stop constraints."""
+
+
+@dataclass
+class RouteLegPlan:
+    origin_id: object
+    destination_id: object
+    distance_nm: float
+    flight_minutes: float
+
+
+@dataclass
+class RoutePlan:
+    airport_ids: List[object]
+    legs: List[RouteLegPlan] = field(default_factory=list)
+    total_minutes: float = 0.0
+
+    @property
+    def number_of_stops(self) -> int:
+        return max(len(self.airport_ids) - 2, 0)
+
+    @property
+    def distance_nm(self) -> float:
+        return sum(leg.distance_nm for leg in self.legs)
+
+
+class RouteGraph:
+    """
+    Fuel-stop candidates for one (airport types, FBO requirement) combination.
+    """
+
+    def __init__(self, index: AirportSpatialIndex):
+        self.index = index
+        self._neighbors = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.index)
+
+    def neighbors(self, position: int, range_nm: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Positions and distances (nm) of every stop candidate within range of a node."""
+        key = (position, range_nm)
+        with self._lock:
+            cached = self._neighbors.get(key)
+            if cached is not None:
+                self._neighbors.move_to_end(key)
+                return cached
+
+        result = self.index.query_radius(
+            float(self.index.lats[position]), float(self.index.lons[position]), range_nm, unit='nm'
+        )
+        with self._lock:
+            self._neighbors[key] = result
+            if len(self._neighbors) > NEIGHBOR_CACHE_SIZE:
+                self._neighbors.popitem(last=False)
+        return result
+
+    def plan(self, origin: Tuple[object, float, float], destination: Tuple[object, float, float],
+             profile: AircraftProfile, max_range_nm: Optional[float] = None,
+             max_stops: int = DEFAULT_MAX_STOPS) -> RoutePlan:
+        """
+        Minimum-time route from origin to destination.
+
+        Args:
+            origin, destination: (airport_id, lat, lon); they need not be stop candidates
+            profile: Aircraft performance profile (speed, per-leg and per-stop overheads)
+            max_range_nm: Overrides the profile's range, e.g. for a heavier payload
+            max_stops: Upper bound on intermediate fuel stops
+
+        Raises:
+            NoRouteFound: If the destination cannot be reached within the constraints
+        """
+        range_nm = float(max_range_nm or profile.max_range_nm)
+        speed = float(profile.cruise_speed_kts)
+        leg_overhead = profile.climb_descent_minutes + profile.taxi_minutes
+        stop_overhead = profile.fuel_stop_minutes + leg_overhead
+
+        origin_id, origin_lat, origin_lon = origin
+        destination_id, destination_lat, destination_lon = destination
+
+        def leg_minutes(distance_nm):
+            return distance_nm / speed * 60.0 + leg_overhead
+
+        def heuristic(distance_nm):
+            # Lower bound: straight-line flight time plus the fewest stops that distance forces
+            forced_stops = np.maximum(np.ceil(distance_nm / range_nm) - 1.0, 0.0)
+            return distance_nm / speed * 60.0 + leg_overhead + forced_stops * stop_overhead
+
+        lats, lons = self.index.lats, self.index.lons
+        # Distance from every stop candidate to the destination, computed once per query
+        to_destination = np.atleast_1d(haversine(lats, lons, destination_lat, destination_lon, unit='nm'))
+
+        n = len(self.index)
+        best = np.full(n, np.inf)
+        stops = np.zeros(n, dtype=np.int64)
+        closed = np.zeros(n, dtype=bool)
+        parent = {}
+
+        # Endpoints are never fuel stops, even when they are also stop candidates
+        for endpoint_id in (origin_id, destination_id):
+            position = self.index.position(endpoint_id)
+            if position is not None:
+                closed[position] = True
+
+        ORIGIN = -1
+        best_total = math.inf
+        best_total_parent = None
+
+        direct_nm = haversine(origin_lat, origin_lon, destination_lat, destination_lon, unit='nm')
+        if direct_nm <= range_nm:
+            best_total = leg_minutes(direct_nm)
+            best_total_parent = ORIGIN
+
+        # Seed with stop candidates reachable from the origin
+        heap = []
+        positions, distances = self.index.query_radius(origin_lat, origin_lon, range_nm, unit='nm')
+        self._relax(heap, positions, distances, 0.0, ORIGIN, 1, best, stops, closed, parent,
+                    to_destination, leg_minutes, heuristic, profile.fuel_stop_minutes, best_total, max_stops)
+
+        while heap:
+            f, g, position = heapq.heappop(heap)
+            if f >= best_total:
+                break
+            if closed[position] or g > best[position]:
+                continue
+            closed[position] = True
+
+            remaining = float(to_destination[position])
+            if remaining <= range_nm:
+                total = g + leg_minutes(remaining)
+                if total < best_total:
+                    best_total, best_total_parent = total, position
+
+            if stops[position] < max_stops:
+                positions, distances = self.neighbors(position, range_nm)
+                self._relax(heap, positions, distances, g, position, stops[position] + 1, best, stops,
+                            closed, parent, to_destination, leg_minutes, heuristic,
+                            profile.fuel_stop_minutes, best_total, max_stops)
+
+        if best_total_parent is None:
+            raise NoRouteFound(
+                f"No route within {range_nm:.0f} nm legs and {max_stops} stops"
+            )
+
+        # Walk parents back from the destination
+        chain = []
+        node = best_total_parent
+        while node != ORIGIN:
+            chain.append(node)
+            node = parent[node]
+        chain.reverse()
+
+        waypoints = [(origin_id, origin_lat, origin_lon)]
+        waypoints += [(self.index.ids[p], float(lats[p]), float(lons[p])) for p in chain]
+        waypoints.append((destination_id, destination_lat, destination_lon))
+
+        plan = RoutePlan(airport_ids=[w[0] for w in waypoints], total_minutes=best_total)
+        for (a_id, a_lat, a_lon), (b_id, b_lat, b_lon) in zip(waypoints[:-1], waypoints[1:]):
+            distance_nm = haversine(a_lat, a_lon, b_lat, b_lon, unit='nm')
+            plan.legs.append(RouteLegPlan(
+                origin_id=a_id,
+                destination_id=b_id,
+                distance_nm=distance_nm,
+                flight_minutes=distance_nm / speed * 60.0 + profile.climb_descent_minutes,
+            ))
+        return plan
+
+    @staticmethod
+    def _relax(heap, positions, distances, g, from_node, stop_count, best, stops, closed, parent,
+               to_destination, leg_minutes, heuristic, stop_minutes, best_total, max_stops):
+        """Push every neighbor whose arrival time improves, pruning anything that can't beat best_total."""
+        if positions.size == 0 or stop_count > max_stops:
+            return
+        open_mask = ~closed[positions]
+        positions, distances = positions[open_mask], distances[open_mask]
+
+        # Arriving at a stop costs the leg plus the time on the ground refuelling
+        arrival = g + leg_minutes(distances) + stop_minutes
+        estimate = arrival + heuristic(to_destination[positions])
+        improved = (arrival < best[positions]) & (estimate < best_total)
+
+        for position, g_new, f_new in zip(positions[improved], arrival[improved], estimate[improved]):
+            position = int(position)
+            best[position] = g_new
+            stops[position] = stop_count
+            parent[position] = from_node
+            heapq.heappush(heap, (float(f_new), float(g_new), position))
+
+
+_graphs: Dict[tuple, Tuple[AirportSpatialIndex, RouteGraph]] = {}
+_graphs_lock = threading.Lock()
+
+
+def get_route_graph(airport_types: Iterable[str] = DEFAULT_STOP_AIRPORT_TYPES,
+                    require_fbo: bool = False) -> RouteGraph:
+    """
+    Return the cached stop-candidate graph, rebuilding it when the airport index changes.
+    """
+    from .models import Airport
+
+    airport_types = tuple(sorted(set(airport_types)))
+    key = (airport_types, require_fbo)
+    index = get_airport_index()
+
+    with _graphs_lock:
+        cached = _graphs.get(key)
+        if cached is not None and cached[0] is index:
+            return cached[1]
+
+    mask = np.isin(index.airport_types, list(airport_types)) if airport_types else np.ones(len(index), dtype=bool)
+    if require_fbo:
+        with_fbo = set(Airport.objects.filter(fbos__isnull=False).values_list('id', flat=True).distinct())
+        mask &= np.fromiter((airport_id in with_fbo for airport_id in index.ids), dtype=bool, count=len(index))
+
+    graph = RouteGraph(AirportSpatialIndex(
+        index.ids[mask], index.lats[mask], index.lons[mask], index.airport_types[mask],
+        cell_size=index.cell_size,
+    ))
+    with _graphs_lock:
+        _graphs[key] = (index, graph)
+    return graph
+
+
+def plan_route(origin, destination, profile: AircraftProfile, airport_types=DEFAULT_STOP_AIRPORT_TYPES,
+               require_fbo: bool = False, max_range_nm: Optional[float] = None,
+               max_stops: int = DEFAULT_MAX_STOPS) -> RoutePlan:
+    """
+    Plan fuel stops between two Airport instances.
+    """
+    graph = get_route_graph(airport_types, require_fbo)
+    return graph.plan(
+        (origin.id, float(origin.latitude), float(origin.longitude)),
+        (destination.id, float(destination.latitude), float(destination.longitude)),
+        profile,
+        max_range_nm=max_range_nm,
+        max_stops=max_stops,
+    )
@@ -1,10 +1,10 @@
 from rest_framework import serializers
 from .models import (
     Modification, Permission, Role, Department, UserProfile, Contact,
-    FBO, Ground, Airport, Document, Aircraft, Transaction, Agreement,
+    FBO, Ground, Airport, FuelPrice, Document, Aircraft, Transaction, Agreement,
     Patient, Quote, Passenger, CrewLine, Trip, TripLine, Staff, StaffRole,
     StaffRoleMembership, TripEvent, Comment, Contract, LostReason,
-    UserActivationToken
+    UserActivationToken, Job
 )
 from django.contrib.auth.models import User
 
@@ -332,6 +332,12 @@ class FBOSerializer(serializers.ModelSerializer):
         airports = obj.airports.all()
         return [airport.name for airport in airports] if airports else []
 
+class FuelPriceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = FuelPrice
+        fields = ['id', 'fbo', 'fbo_name', 'jet_a_price', 'observed_at', 'source']
+        read_only_fields = fields
+
 class GroundSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ground
@@ -756,6 +762,9 @@ class TripLineWriteSerializer(serializers.ModelSerializer):
     departure_time_utc = serializers.DateTimeField(required=False, allow_null=True)
     arrival_time_local = serializers.DateTimeField(required=False, allow_null=True)
     arrival_time_utc = serializers.DateTimeField(required=False, allow_null=True)
+
+    # Optional - filled with the great-circle distance between the airports when omitted
+    distance = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
     
     class Meta:
         model = TripLine
@@ -777,6 +786,15 @@ class TripLineWriteSerializer(serializers.ModelSerializer):
         
         origin_airport = data.get('origin_airport')
         destination_airport = data.get('destination_airport')
+
+        # Auto-fill leg distance (statute miles) when the airports change and none was given
+        if data.get('distance') is None and (origin_airport or destination_airport):
+            from decimal import Decimal
+            from .spatial import airport_distance
+            origin = origin_airport or getattr(self.instance, 'origin_airport', None)
+            destination = destination_airport or getattr(self.instance, 'destination_airport', None)
+            if origin and destination:
+                data['distance'] = Decimal(str(round(airport_distance(origin, destination), 2)))
         
         # Get timezone info
         origin_timezone = origin_airport.timezone if origin_airport else None
@@ -1371,6 +1389,54 @@ class EmailQuoteSerializer(serializers.Serializer):
     message = serializers.CharField()
 
 
+class RouteCandidateSerializer(serializers.Serializer):
+    """One candidate route: pickup, optional planned stops, dropoff (airport ids, resolved in bulk)."""
+    pickup_airport = serializers.UUIDField()
+    dropoff_airport = serializers.UUIDField()
+    stops = serializers.ListField(child=serializers.UUIDField(), required=False, default=list)
+
+
+class RouteEstimateSerializer(serializers.Serializer):
+    """Serializer for batch quote estimation over candidate routes and aircraft types."""
+    routes = RouteCandidateSerializer(many=True)
+    aircraft_types = serializers.ListField(
+        child=serializers.ChoiceField(choices=["65", "35", "TBD"]),
+        required=False,
+        default=["35", "65"]
+    )
+
+    def validate_routes(self, value):
+        if not value:
+            raise serializers.ValidationError("At least one route is required")
+        if len(value) > 100:
+            raise serializers.ValidationError("A maximum of 100 routes can be estimated per request")
+        return value
+
+
+class RoutePlanSerializer(serializers.Serializer):
+    """Serializer for planning fuel stops between two airports."""
+    origin_airport = serializers.PrimaryKeyRelatedField(queryset=Airport.objects.all())
+    destination_airport = serializers.PrimaryKeyRelatedField(queryset=Airport.objects.all())
+    aircraft_type = serializers.ChoiceField(choices=["65", "35", "TBD"], required=False)
+    airport_types = serializers.ListField(
+        child=serializers.ChoiceField(choices=['large_airport', 'medium_airport', 'small_airport']),
+        required=False,
+        default=['large_airport', 'medium_airport']
+    )
+    require_fbo = serializers.BooleanField(required=False, default=False)
+    max_range_nm = serializers.FloatField(required=False, allow_null=True, min_value=100)
+    max_stops = serializers.IntegerField(required=False, default=4, min_value=0, max_value=8)
+
+
+class TripRoutePlanSerializer(RoutePlanSerializer):
+    """Plan fuel stops and create the resulting legs as TripLines."""
+    departure_time_utc = serializers.DateTimeField()
+    crew_line = serializers.PrimaryKeyRelatedField(
+        queryset=CrewLine.objects.all(), required=False, allow_null=True
+    )
+    passenger_leg = serializers.BooleanField(required=False, default=True)
+
+
 # 7) Documents
 class DocumentReadSerializer(serializers.ModelSerializer):
     content_type = serializers.SerializerMethodField()
@@ -1819,3 +1885,12 @@ class SetPasswordSerializer(serializers.Serializer):
 class ForgotPasswordSerializer(serializers.Serializer):
     """Serializer for forgot password request."""
     email = serializers.EmailField()
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Status of a background job."""
+    class Meta:
+        model = Job
+        fields = ['id', 'name', 'queue', 'status', 'attempts', 'max_attempts', 'run_at',
+                  'result', 'last_error', 'created_at', 'finished_at']
+        read_only_fields = fields
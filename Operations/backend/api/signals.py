@@ -1,11 +1,13 @@
-from django.db.models.signals import pre_save, post_save
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
 from django.apps import apps
 from django.contrib.contenttypes.models import ContentType
 import json
 import threading
 
-from .models import Modification, BaseModel
+from .models import (
+    Modification, BaseModel, Airport, Contact, CrewLine, Document, Passenger, Patient, Trip, TripLine,
+)
 
 # Thread-local storage for the current user and tracking state
 _local = threading.local()
@@ -103,3 +105,109 @@ def track_model_changes(sender, instance, **kwargs):
     except Exception as e:
         # Log the error but don't prevent the save
         print(f"Error tracking changes: {e}")
+
+
+@receiver(post_save, sender=Airport)
+@receiver(post_delete, sender=Airport)
+def invalidate_airport_spatial_index(sender, instance, **kwargs):
+    """Rebuild the nearest-airport index after airport coordinates change"""
+    from .spatial import invalidate_airport_index
+    invalidate_airport_index()
+
+
+# Trip packet pre-generation: flag the documents a change affects stale (see api/document_pregeneration.py)
+
+def _documents_changed(trip_ids, change):
+    from django.db import transaction
+    from .document_pregeneration import AFFECTED_DOCUMENT_TYPES, mark_stale
+
+    trip_ids = list(trip_ids)
+    if not trip_ids:
+        return
+
+    def mark():
+        try:
+            # Trips deleted in the same transaction (their legs' post_delete lands here) are skipped
+            mark_stale(Trip.objects.filter(id__in=trip_ids).values_list('id', flat=True), AFFECTED_DOCUMENT_TYPES[change])
+        except Exception as e:
+            # Never fail the save over pre-generation bookkeeping
+            print(f"Error marking trip documents stale: {e}")
+
+    # After commit, so the job never runs ahead of the change it regenerates for
+    transaction.on_commit(mark)
+
+
+@receiver(post_save, sender=Trip)
+def trip_documents_on_trip_change(sender, instance, created, raw=False, **kwargs):
+    if not raw and not created:
+        _documents_changed([instance.pk], 'trip')
+
+
+@receiver(post_save, sender=TripLine)
+@receiver(post_delete, sender=TripLine)
+def trip_documents_on_trip_line_change(sender, instance, raw=False, **kwargs):
+    if not raw and instance.trip_id:
+        _documents_changed([instance.trip_id], 'trip_line')
+
+
+@receiver(post_save, sender=CrewLine)
+def trip_documents_on_crew_line_change(sender, instance, created, raw=False, **kwargs):
+    if not raw and not created:
+        _documents_changed(instance.trip_lines.values_list('trip_id', flat=True), 'crew')
+
+
+@receiver(m2m_changed, sender=CrewLine.medic_ids.through)
+def trip_documents_on_medics_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        trip_ids = TripLine.objects.filter(crew_line__medic_ids=instance).values_list('trip_id', flat=True)
+    else:
+        trip_ids = instance.trip_lines.values_list('trip_id', flat=True)
+    _documents_changed(trip_ids, 'crew')
+
+
+@receiver(m2m_changed, sender=Trip.passengers.through)
+def trip_documents_on_passengers_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        _documents_changed([instance.pk], 'passengers')
+    elif action == 'pre_clear':
+        _documents_changed(instance.trips.values_list('id', flat=True), 'passengers')
+    else:
+        _documents_changed(pk_set or [], 'passengers')
+
+
+@receiver(post_save, sender=Passenger)
+def trip_documents_on_passenger_change(sender, instance, created, raw=False, **kwargs):
+    if not raw and not created:
+        _documents_changed(instance.trips.values_list('id', flat=True), 'passengers')
+
+
+@receiver(post_save, sender=Patient)
+def trip_documents_on_patient_change(sender, instance, created, raw=False, **kwargs):
+    if not raw and not created:
+        _documents_changed(Trip.objects.filter(patient=instance).values_list('id', flat=True), 'patient')
+
+
+@receiver(post_save, sender=Contact)
+def trip_documents_on_contact_change(sender, instance, created, raw=False, **kwargs):
+    from django.db.models import Q
+
+    if raw or created:
+        return
+    trip_ids = Trip.objects.filter(
+        Q(passengers__info=instance) | Q(patient__info=instance)
+        | Q(trip_lines__crew_line__primary_in_command=instance)
+        | Q(trip_lines__crew_line__secondary_in_command=instance)
+        | Q(trip_lines__crew_line__medic_ids=instance)
+    ).values_list('id', flat=True).distinct()
+    _documents_changed(trip_ids, 'contact')
+
+
+@receiver(pre_delete, sender=Document)
+def trip_documents_on_document_delete(sender, instance, **kwargs):
+    """A deleted packet document has to be rendered again (before the delete clears the link)"""
+    from .models import TripDocumentStatus
+    TripDocumentStatus.objects.filter(documents=instance).update(stale=True)
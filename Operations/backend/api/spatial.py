@@ -0,0 +1,286 @@
+"""
+Spatial utilities for airport distance and proximity queries.
+
+This module provides vectorized great-circle (haversine) distances over airport
+coordinate arrays and a grid-based spatial index for nearest-airport and
+within-radius lookups. TripLine distances are recorded in statute miles, so
+that is the default unit throughout.
+"""
+
+import math
+import threading
+import time
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+EARTH_RADIUS = {
+    'sm': 3958.7613,   # statute miles
+    'nm': 3440.0648,   # nautical miles
+    'km': 6371.0088,   # kilometres
+}
+
+DEFAULT_UNIT = 'sm'
+
+# Seconds between checks of the airport table for changes made by other processes
+INDEX_STALE_CHECK_SECONDS = 60
+
+
+def _earth_radius(unit: str) -> float:
+    try:
+        return EARTH_RADIUS[unit]
+    except KeyError:
+        raise ValueError(f"Unknown distance unit '{unit}'. Use one of: {', '.join(EARTH_RADIUS)}")
+
+
+def haversine(lat1, lon1, lat2, lon2, unit: str = DEFAULT_UNIT):
+    """
+    Great-circle distance between points given in decimal degrees.
+
+    Arguments may be scalars or NumPy arrays and are broadcast against each
+    other, so one origin can be measured against many destinations at once.
+
+    Args:
+        lat1, lon1: Origin latitude/longitude in degrees
+        lat2, lon2: Destination latitude/longitude in degrees
+        unit: 'sm' (statute miles), 'nm' (nautical miles) or 'km'
+
+    Returns:
+        Distance as a float (scalar inputs) or ndarray (array inputs)
+    """
+    radius = _earth_radius(unit)
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+
+    a = (np.sin((lat2 - lat1) / 2.0) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2)
+    distance = 2.0 * radius * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+    return float(distance) if distance.ndim == 0 else distance
+
+
+def haversine_matrix(lats_a, lons_a, lats_b, lons_b, unit: str = DEFAULT_UNIT) -> np.ndarray:
+    """
+    Pairwise great-circle distances between two sets of points.
+
+    Returns:
+        ndarray of shape (len(a), len(b)) where [i, j] is the distance from
+        point a[i] to point b[j]
+    """
+    lats_a = np.asarray(lats_a, dtype=np.float64)[:, np.newaxis]
+    lons_a = np.asarray(lons_a, dtype=np.float64)[:, np.newaxis]
+    lats_b = np.asarray(lats_b, dtype=np.float64)[np.newaxis, :]
+    lons_b = np.asarray(lons_b, dtype=np.float64)[np.newaxis, :]
+    return haversine(lats_a, lons_a, lats_b, lons_b, unit=unit)
+
+
+def airport_distance(origin, destination, unit: str = DEFAULT_UNIT) -> float:
+    """
+    Great-circle distance between two Airport instances.
+    """
+    return haversine(
+        float(origin.latitude), float(origin.longitude),
+        float(destination.latitude), float(destination.longitude),
+        unit=unit,
+    )
+
+
+class AirportSpatialIndex:
+    """
+    Fixed-size latitude/longitude grid over airport coordinates.
+
+    Airports are bucketed into cells of ``cell_size`` degrees and stored sorted
+    by cell key, so a radius query only computes exact distances for airports
+    in the handful of cells overlapping the query's bounding box.
+    """
+
+    def __init__(self, ids: Sequence, lats: Sequence[float], lons: Sequence[float],
+                 airport_types: Optional[Sequence[str]] = None, cell_size: float = 1.0):
+        self.cell_size = float(cell_size)
+        self.n_rows = int(math.ceil(180.0 / self.cell_size))
+        self.n_cols = int(math.ceil(360.0 / self.cell_size))
+
+        ids = np.asarray(ids, dtype=object)
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        if airport_types is None:
+            airport_types = [''] * len(ids)
+        airport_types = np.asarray(airport_types, dtype=object)
+
+        keys = self._cell_rows(lats) * self.n_cols + self._cell_cols(lons)
+        order = np.argsort(keys, kind='stable')
+
+        self.ids = ids[order]
+        self.lats = lats[order]
+        self.lons = lons[order]
+        self.airport_types = airport_types[order]
+        self.keys = keys[order]
+        self._position = {airport_id: i for i, airport_id in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_queryset(cls, queryset, cell_size: float = 1.0) -> 'AirportSpatialIndex':
+        rows = list(queryset.values_list('id', 'latitude', 'longitude', 'airport_type'))
+        if not rows:
+            return cls([], [], [], [], cell_size=cell_size)
+        ids, lats, lons, types = zip(*rows)
+        return cls(ids, [float(v) for v in lats], [float(v) for v in lons], types, cell_size=cell_size)
+
+    def _cell_rows(self, lats):
+        rows = np.floor((np.asarray(lats) + 90.0) / self.cell_size).astype(np.int64)
+        return np.clip(rows, 0, self.n_rows - 1)
+
+    def _cell_cols(self, lons):
+        cols = np.floor((np.asarray(lons) + 180.0) / self.cell_size).astype(np.int64)
+        return np.mod(cols, self.n_cols)
+
+    def position(self, airport_id) -> Optional[int]:
+        """Position of an airport id in this index's arrays, or None."""
+        return self._position.get(airport_id)
+
+    def coordinates(self, airport_id) -> Optional[Tuple[float, float]]:
+        """Return (lat, lon) for an indexed airport id, or None."""
+        i = self._position.get(airport_id)
+        if i is None:
+            return None
+        return float(self.lats[i]), float(self.lons[i])
+
+    def _candidates(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """Indices of airports in grid cells overlapping the search circle."""
+        angular = radius_km / EARTH_RADIUS['km']
+        if angular >= math.pi / 2:
+            return np.arange(len(self.ids))
+
+        dlat = math.degrees(angular)
+        lat_min, lat_max = lat - dlat, lat + dlat
+        rows = np.arange(self._cell_rows(max(lat_min, -90.0)), self._cell_rows(min(lat_max, 90.0)) + 1)
+
+        cos_lat = math.cos(math.radians(lat))
+        if lat_min <= -90.0 or lat_max >= 90.0 or math.sin(angular) >= cos_lat:
+            cols = np.arange(self.n_cols)
+        else:
+            dlon = math.degrees(math.asin(math.sin(angular) / cos_lat))
+            first = int(math.floor((lon - dlon + 180.0) / self.cell_size))
+            last = int(math.floor((lon + dlon + 180.0) / self.cell_size))
+            cols = np.unique(np.mod(np.arange(first, last + 1), self.n_cols))
+
+        cell_keys = (rows[:, np.newaxis] * self.n_cols + cols[np.newaxis, :]).ravel()
+        starts = np.searchsorted(self.keys, cell_keys, side='left')
+        ends = np.searchsorted(self.keys, cell_keys, side='right')
+        occupied = ends > starts
+        if not occupied.any():
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(s, e) for s, e in zip(starts[occupied], ends[occupied])])
+
+    def query_radius(self, lat: float, lon: float, radius: float,
+                     unit: str = DEFAULT_UNIT) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Unordered positions (into this index's arrays) and distances of all
+        airports within ``radius`` of a point.
+        """
+        radius_km = radius * EARTH_RADIUS['km'] / _earth_radius(unit)
+        candidates = self._candidates(lat, lon, radius_km)
+        if candidates.size == 0:
+            return candidates, np.empty(0, dtype=np.float64)
+
+        distances = np.atleast_1d(haversine(lat, lon, self.lats[candidates], self.lons[candidates], unit=unit))
+        inside = distances <= radius
+        return candidates[inside], distances[inside]
+
+    def within_radius(self, lat: float, lon: float, radius: float, unit: str = DEFAULT_UNIT,
+                      airport_types: Optional[Iterable[str]] = None, exclude: Optional[Iterable] = None,
+                      limit: Optional[int] = None) -> List[Tuple[object, float]]:
+        """
+        Airports within ``radius`` of a point, nearest first.
+
+        Returns:
+            List of (airport_id, distance) tuples, distance in ``unit``
+        """
+        candidates, distances = self.query_radius(lat, lon, radius, unit=unit)
+
+        keep = np.ones(candidates.size, dtype=bool)
+        if airport_types:
+            keep &= np.isin(self.airport_types[candidates], list(airport_types))
+        if exclude:
+            excluded = [self._position[x] for x in exclude if x in self._position]
+            if excluded:
+                keep &= ~np.isin(candidates, excluded)
+        candidates, distances = candidates[keep], distances[keep]
+
+        if limit is not None and limit < distances.size:
+            nearest = np.argpartition(distances, limit)[:limit]
+            candidates, distances = candidates[nearest], distances[nearest]
+        order = np.argsort(distances, kind='stable')
+
+        return [(self.ids[i], float(d)) for i, d in zip(candidates[order], distances[order])]
+
+    def nearest(self, lat: float, lon: float, k: int = 1, unit: str = DEFAULT_UNIT,
+                airport_types: Optional[Iterable[str]] = None, exclude: Optional[Iterable] = None,
+                max_radius: Optional[float] = None) -> List[Tuple[object, float]]:
+        """
+        The ``k`` airports nearest to a point, nearest first.
+
+        The search radius starts small and doubles until ``k`` matches are
+        found; anything outside the final radius is farther than everything
+        inside it, so the result is exact.
+        """
+        half_circumference = math.pi * _earth_radius(unit)
+        ceiling = min(max_radius, half_circumference) if max_radius else half_circumference
+        radius = min(50.0 * _earth_radius(unit) / EARTH_RADIUS['sm'], ceiling)
+
+        while True:
+            found = self.within_radius(lat, lon, radius, unit=unit, airport_types=airport_types,
+                                       exclude=exclude, limit=k)
+            if len(found) >= k or radius >= ceiling:
+                return found
+            radius = min(radius * 2.0, ceiling)
+
+
+_index = None
+_index_signature = None
+_index_checked_at = 0.0
+_index_lock = threading.Lock()
+
+
+def _airport_table_signature():
+    from django.db.models import Count, Max
+    from .models import Airport
+
+    stats = Airport.objects.aggregate(count=Count('id'), last_modified=Max('modified_on'))
+    return stats['count'], stats['last_modified']
+
+
+def get_airport_index() -> AirportSpatialIndex:
+    """
+    Return the process-wide airport index, building it on first use.
+
+    The index is rebuilt when the airport table changes. Changes made in this
+    process invalidate it immediately via signals; changes made by other
+    workers are picked up within INDEX_STALE_CHECK_SECONDS.
+    """
+    global _index, _index_signature, _index_checked_at
+    from .models import Airport
+
+    now = time.monotonic()
+    if _index is not None and now - _index_checked_at < INDEX_STALE_CHECK_SECONDS:
+        return _index
+
+    with _index_lock:
+        if _index is not None and now - _index_checked_at < INDEX_STALE_CHECK_SECONDS:
+            return _index
+        signature = _airport_table_signature()
+        if _index is None or signature != _index_signature:
+            _index = AirportSpatialIndex.from_queryset(Airport.objects.all())
+            _index_signature = signature
+        _index_checked_at = time.monotonic()
+        return _index
+
+
+def invalidate_airport_index():
+    """Drop the cached airport index so the next lookup rebuilds it."""
+    global _index, _index_signature
+    with _index_lock:
+        _index = None
+        _index_signature = None
@@ -0,0 +1,365 @@
+"""
+Background job handlers.
+
+These run in `manage.py run_workers`, not in the request that enqueued them
+(see api/jobs.py). Payloads carry ids rather than model instances, and each
+handler re-reads its rows so a retry sees current state.
+"""
+
+import logging
+import os
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from utils.services.docuseal_service import DocuSealService
+
+from .document_storage import store_document
+from .jobs import PermanentJobError, job
+from .models import Contract, Document, Quote, Trip
+
+logger = logging.getLogger(__name__)
+
+
+@job('quotes.email', queue='email')
+def email_quote(quote_id, email, subject, message, user_id=None):
+    """Generate the quote PDF (or reuse it, for an unchanged quote) and email a download link."""
+    from utils.smtp.email import send_template
+    from .quote_documents import quote_document
+
+    try:
+        quote = Quote.objects.select_related(
+            'contact', 'patient__info', 'pickup_airport', 'dropoff_airport'
+        ).get(id=quote_id)
+    except Quote.DoesNotExist:
+        raise PermanentJobError(f"Quote {quote_id} no longer exists")
+
+    logger.info(f"Generating quote document for {quote.id}")
+    try:
+        document = quote_document(
+            quote, 'form', created_by=User.objects.filter(id=user_id).first() if user_id else None
+        )
+    except RuntimeError as e:
+        raise PermanentJobError(str(e))
+
+    # Get public download URL for document access (no authentication required)
+    backend_url = getattr(settings, 'BACKEND_URL', 'http://localhost:8001')
+    document_url = f"{backend_url}/api/documents/{document.id}/public_download/"
+
+    # Build clean email content (without quote details)
+    email_content = f"""
+    {message}
+
+    Please click the button below to view your quote document.
+
+    Best regards,
+    JET ICU Medical Transport Team
+    Phone: (352) 796-2540
+    Email: info@jeticu.com
+    """
+
+    # Send email with "Download Quote PDF" button
+    success = send_template(
+        subject=subject,
+        targets=[email],
+        title=email_content,
+        link=document_url,
+        link_text="Download Quote PDF"
+    )
+    if not success:
+        raise RuntimeError(f"Failed to send quote #{str(quote.id)[:8]} to {email}")
+
+    quote.quote_pdf_email = email
+    quote.save()
+
+    logger.info(f"Quote #{str(quote.id)[:8]} with document emailed successfully to {email}")
+    return {'document_id': str(document.id), 'document_url': document_url}
+
+
+def _mark_contract_send_failed(job_row, error):
+    contract = Contract.objects.filter(id=job_row.payload.get('contract_id')).first()
+    if contract is not None:
+        contract.status = 'failed'
+        contract.notes = f"Failed to send: {error}"
+        contract.save()
+
+
+@job('contracts.send_for_signature', queue='docuseal', max_attempts=3, on_failure=_mark_contract_send_failed)
+def send_contract(contract_id, manual_price=None, manual_price_description=None):
+    """Send a contract to DocuSeal for signature."""
+    try:
+        contract = Contract.objects.select_related(
+            'trip__quote', 'customer_contact', 'patient__info'
+        ).get(id=contract_id)
+    except Contract.DoesNotExist:
+        raise PermanentJobError(f"Contract {contract_id} no longer exists")
+
+    # A retry after a send that succeeded but failed to report back must not email the signer twice
+    if contract.docuseal_submission_id:
+        logger.info(f"Contract {contract.id} already has submission {contract.docuseal_submission_id}, not resending")
+        return {'submission_id': contract.docuseal_submission_id}
+
+    result = send_contract_for_signature(contract, DocuSealService(), manual_price, manual_price_description)
+    return {'submission_id': contract.docuseal_submission_id, 'docuseal_response': result}
+
+
+@job('contracts.download_signed_document', queue='docuseal')
+def download_signed_document(contract_id, submission_id):
+    """Store the signed PDF for a completed DocuSeal submission."""
+    try:
+        contract = Contract.objects.select_related('trip').get(id=contract_id)
+    except Contract.DoesNotExist:
+        raise PermanentJobError(f"Contract {contract_id} no longer exists")
+
+    if contract.signed_document_id:
+        return {'document_id': str(contract.signed_document_id)}
+
+    signed_doc_content = DocuSealService().get_submission_documents(submission_id)
+
+    signed_document = Document(
+        filename=f"{contract.title}_signed.pdf",
+        document_type='contract',
+        trip=contract.trip,
+        created_by_id=1  # System user
+    )
+    store_document(signed_document, signed_doc_content)
+    signed_document.save()
+    contract.signed_document = signed_document
+    # Only the field this job owns: the contract may have been updated (status, webhook data) since it was read
+    contract.save(update_fields=['signed_document', 'modified_on'])
+
+    logger.info(f"Stored signed document {signed_document.id} for contract {contract.id}")
+    return {'document_id': str(signed_document.id)}
+
+
+@job('trips.pregenerate_documents', queue='documents', max_attempts=3)
+def pregenerate_trip_documents(trip_id):
+    """Render a trip's stale packet documents ahead of anyone asking for them."""
+    from .document_pregeneration import generate_packet
+    from .models import TripDocumentStatus
+
+    trip = Trip.objects.filter(id=trip_id).first()
+    if trip is None:
+        raise PermanentJobError(f"Trip {trip_id} no longer exists")
+    if not trip.trip_lines.exists():
+        return {'skipped': 'trip has no trip lines'}
+
+    stale_types = list(TripDocumentStatus.objects.filter(trip=trip, stale=True).values_list('document_type', flat=True))
+    if not stale_types:
+        return {'generated': []}
+
+    documents, errors = generate_packet(trip, stale_types, live_enrichment=True)
+    if errors:
+        raise RuntimeError(f"Failed to generate {', '.join(sorted(errors))} for trip {trip.trip_number}: {errors}")
+    logger.info(f"Pre-generated {', '.join(documents)} for trip {trip.trip_number}")
+    return {'generated': {
+        document_type: [str(document.id) for document in type_documents]
+        for document_type, type_documents in documents.items()
+    }}
+
+
+@job('documents.render_previews', queue='documents', max_attempts=3)
+def render_document_previews(document_id):
+    """Render the thumbnail and previews of an uploaded document."""
+    from .document_previews import PreviewError, render_previews
+
+    document = Document.objects.filter(id=document_id).first()
+    if document is None:
+        raise PermanentJobError(f"Document {document_id} no longer exists")
+    try:
+        previews = render_previews(document)
+    except PreviewError as e:
+        raise PermanentJobError(str(e))
+    return {preview.kind: f"{preview.width}x{preview.height}" for preview in previews}
+
+
+@job('documents.export', queue='documents', max_attempts=3)
+def export_documents(filters, compression='stored', user_id=None):
+    """Build a bulk document export too big to stream and store it as a Document to download."""
+    import tempfile
+
+    from .document_export import export_filename, export_queryset, zip_chunks
+    from .document_storage import store_document_file
+
+    queryset = export_queryset(filters)
+    document = Document(
+        filename=export_filename(filters),
+        document_type='document_export',
+        created_by=User.objects.filter(id=user_id).first() if user_id else None,
+    )
+    fd, path = tempfile.mkstemp(suffix='.zip')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in zip_chunks(queryset.iterator(chunk_size=100), compression):
+                f.write(chunk)
+        stored = store_document_file(document, path)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+    document.save()
+
+    logger.info(f"Exported {document.filename} ({stored.size} bytes) as document {document.id}")
+    return {'document_id': str(document.id), 'filename': document.filename, 'size': stored.size}
+
+
+def send_contract_for_signature(contract, docuseal_service, manual_price=None, manual_price_description=None):
+    """Build the DocuSeal submission for a contract and send it for signature."""
+    # Get template configuration
+    template_config = settings.DOCUSEAL_CONTRACT_SETTINGS['templates'].get(contract.contract_type)
+    if not template_config:
+        raise ValueError(f"No template configuration found for contract type: {contract.contract_type}")
+    
+    # Use the pre-configured template ID
+    template_id = template_config['template_id']
+    requires_jet_icu_signature = template_config.get('requires_jet_icu_signature', False)
+    
+    # Prepare data for field mapping
+    trip_data = {
+        'trip_number': contract.trip.trip_number,
+        'type': contract.trip.type,
+        'estimated_departure_time': str(contract.trip.estimated_departure_time) if contract.trip.estimated_departure_time else '',
+        'notes': contract.trip.notes or '',
+    }
+    
+    # Get trip lines data - pass as objects for easier access
+    trip_lines_data = list(contract.trip.trip_lines.all().order_by('departure_time_utc'))
+    
+    # Get quote data if available, otherwise use manual pricing
+    quote_data = None
+    if contract.trip.quote:
+        quote_data = {
+            'quoted_amount': str(contract.trip.quote.quoted_amount)
+        }
+    elif manual_price is not None:
+        quote_data = {
+            'quoted_amount': str(manual_price)
+        }
+    
+    # Get contact data
+    contact_data = None
+    if contract.customer_contact:
+        contact_data = {
+            'first_name': contract.customer_contact.first_name or '',
+            'last_name': contract.customer_contact.last_name or '',
+            'business_name': contract.customer_contact.business_name or '',
+            'email': contract.customer_contact.email or '',
+            'phone': contract.customer_contact.phone or '',
+            'address_line1': contract.customer_contact.address_line1 or '',
+            'address_line2': contract.customer_contact.address_line2 or '',
+            'city': contract.customer_contact.city or '',
+            'state': contract.customer_contact.state or '',
+            'zip': contract.customer_contact.zip or '',
+            'country': contract.customer_contact.country or '',
+        }
+    
+    # Get patient data
+    patient_data = None
+    if contract.patient:
+        patient_data = {
+            'info': {
+                'first_name': contract.patient.info.first_name or '',
+                'last_name': contract.patient.info.last_name or '',
+                'phone': contract.patient.info.phone or '',
+                'address_line1': contract.patient.info.address_line1 or '',
+                'city': contract.patient.info.city or '',
+                'state': contract.patient.info.state or '',
+                'zip': contract.patient.info.zip or '',
+            },
+            'date_of_birth': str(contract.patient.date_of_birth) if contract.patient.date_of_birth else '',
+            'nationality': contract.patient.nationality or '',
+            'passport_number': contract.patient.passport_number or '',
+            'special_instructions': contract.patient.special_instructions or '',
+        }
+    
+    # Get passengers data
+    passengers = contract.trip.passengers.all()
+    passengers_data = []
+    for passenger in passengers:
+        passengers_data.append({
+            'info': {
+                'first_name': passenger.info.first_name or '',
+                'last_name': passenger.info.last_name or '',
+            }
+        })
+    
+    # Generate field mappings based on contract type
+    fields = docuseal_service.create_contract_fields_mapping(
+        contract_type=contract.contract_type,
+        trip_data=trip_data,
+        trip_lines_data=trip_lines_data,
+        contact_data=contact_data,
+        patient_data=patient_data,
+        passengers_data=passengers_data,
+        quote_data=quote_data
+    )
+    
+    # Get roles from template configuration
+    customer_role = template_config.get('customer_role', 'patient')
+    jet_icu_role = template_config.get('jet_icu_role', 'jet_icu')
+    
+    # Prepare submitters list - assign fields to JET ICU role as requested
+    if requires_jet_icu_signature:
+        # For contracts requiring JET ICU signature, customer signs but JET ICU gets the field data
+        submitters = [
+            {
+                'name': contract.signer_name,
+                'email': contract.signer_email,
+                'role': customer_role,
+                'fields': {}  # Customer doesn't fill fields, just signs
+            },
+            {
+                'name': 'JET ICU Representative', 
+                'email': settings.DOCUSEAL_JET_ICU_SIGNER_EMAIL,
+                'role': jet_icu_role,
+                'fields': fields  # JET ICU gets all the field data
+            }
+        ]
+    else:
+        # For single-signature contracts, assign fields to the JET ICU role (First Party)
+        submitters = [
+            {
+                'name': contract.signer_name,
+                'email': contract.signer_email, 
+                'role': customer_role,
+                'fields': {}  # Customer signs as Second Party with no fields
+            },
+            {
+                'name': 'JET ICU Representative',
+                'email': settings.DOCUSEAL_JET_ICU_SIGNER_EMAIL,
+                'role': jet_icu_role,
+                'fields': fields  # JET ICU (First Party) gets all the field data
+            }
+        ]
+    
+    # Store template ID in contract
+    contract.docuseal_template_id = template_id
+    
+    # Create submission
+    submission_result = docuseal_service.create_submission(
+        template_id=template_id,
+        submitters=submitters,
+        send_email=True
+    )
+    
+    # DocuSeal returns an array of submitters, get the submission_id from the first one
+    if isinstance(submission_result, list) and len(submission_result) > 0:
+        first_submitter = submission_result[0]
+        submission_id = first_submitter.get('submission_id')
+        
+        # Update contract
+        contract.docuseal_submission_id = str(submission_id)
+        contract.status = 'pending'
+        contract.date_sent = timezone.now()
+        contract.docuseal_response_data = {
+            'submitters': submission_result,
+            'submission_id': submission_id
+        }
+        contract.save()
+        
+        logger.info(f"Contract {contract.id} updated with submission_id: {submission_id}")
+    else:
+        logger.error(f"Unexpected DocuSeal response format: {type(submission_result)}")
+        raise ValueError("Unexpected DocuSeal response format")
+    
+    return submission_result
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for FlightAware airport pages.
+
+Serves a minimal airport page with a fuel table for any
+/resources/airport/<code> path (and an FBO page for
+/resources/airport/<code>/services/FBO/<name>) and counts requests per
+airport, so tests can check caching and single-flight behaviour without
+scraping the real site.
+
+Run the Django server with FLIGHTAWARE_BASE_URL pointing at the stub:
+
+    python api/tests/flightaware_stub.py --port 8765
+    FLIGHTAWARE_BASE_URL=http://127.0.0.1:8765 python manage.py runserver
+"""
+import argparse
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+
+AIRPORT_PAGE = """<html><body>
+<table>
+<tr class="fuel_facility"><td><a href="#">{code} Jet Center</a></td><td></td><td></td><td></td><td></td><td></td><td>$6.25</td></tr>
+<tr class="fuel_facility"><td><a href="#">{code} Aviation</a></td><td></td><td></td><td></td><td></td><td></td><td>$6.75</td></tr>
+<tr class="fuel_facility"><td><a href="#">{code} Self Serve</a></td><td></td><td></td><td></td><td></td><td></td><td></td></tr>
+</table>
+</body></html>"""
+
+FBO_PAGE = """<html><body>
+<div class="airportBoardContainer"><table><tr>
+<td><a href="#">www.{slug}.example</a></td><td>Hours</td><td>24h</td><td>+1-555-0100</td>
+</tr></table></div>
+</body></html>"""
+
+
+class FlightAwareStub:
+    """Threaded HTTP server serving fake airport pages."""
+
+    def __init__(self, host="127.0.0.1", port=8765, delay=0.5):
+        self.hits = Counter()
+        self.delay = delay
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parts = self.path.strip("/").split("/")
+                if len(parts) == 3 and parts[:2] == ["resources", "airport"]:
+                    code = parts[2].upper()
+                    page = AIRPORT_PAGE.format(code=code)
+                elif len(parts) == 6 and parts[:2] == ["resources", "airport"] and parts[3:5] == ["services", "FBO"]:
+                    code = f"{parts[2].upper()}/FBO"
+                    page = FBO_PAGE.format(slug=unquote(parts[5]).lower().replace(" ", ""))
+                else:
+                    self.send_error(404)
+                    return
+                stub.hits[code] += 1
+                # Simulate a slow upstream so concurrent requests overlap
+                time.sleep(stub.delay)
+                body = page.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.5)
+    args = parser.parse_args()
+
+    stub = FlightAwareStub(args.host, args.port, args.delay)
+    print(f"FlightAware stub listening on {stub.base_url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
@@ -96,7 +96,14 @@ def main():
         "test_quotes.py",
         "test_patients.py",
         "test_documents.py",
-        "test_transactions.py"
+        "test_transactions.py",
+        "test_airports.py",
+        "test_fuel_prices.py",
+        "test_file_encryption.py",
+        "test_file_delivery.py",
+        "test_document_export.py",
+        "test_s3_document_storage.py",
+        "test_smtp_transport.py"
     ]
     
     # Track results
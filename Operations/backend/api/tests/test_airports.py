@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Test Airport spatial endpoints (/api/airports/nearby/, /alternates/, /distance/)
+and fuel stop planning (/api/airports/plan_route/, /api/trips/{id}/plan_trip_lines/).
+Run this against a live server with imported airport data.
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from base_test import APITester
+
+
+def test_airport_spatial_endpoints():
+    """Test nearest-airport and distance endpoints."""
+    tester = APITester()
+    
+    print("🧪 TESTING AIRPORT SPATIAL ENDPOINTS")
+    print("=" * 80)
+    
+    # Test authentication
+    print("Attempting authentication...")
+    if not tester.authenticate("admin", "admin"):
+        print("⚠️  Authentication failed, continuing without auth...")
+    
+    # Test 1: Airports near a point (Los Angeles)
+    print("\n📍 TEST 1: Airports Near a Point")
+    response = tester.test_endpoint(
+        "/api/airports/nearby/?lat=33.9425&lon=-118.4081&radius=50&limit=10",
+        method="GET",
+        title="Airports within 50 sm of LAX"
+    )
+    
+    airport_ids = []
+    if response and response.status_code == 200:
+        results = response.json()
+        distances = [a.get('distance') for a in results]
+        if distances == sorted(distances):
+            print("✅ Results are ordered nearest first")
+        else:
+            print("❌ Results are not ordered by distance")
+        airport_ids = [a.get('id') for a in results]
+    
+    # Test 2: Missing coordinates should fail
+    print("\n🚫 TEST 2: Nearby Without Coordinates")
+    tester.test_endpoint(
+        "/api/airports/nearby/",
+        method="GET",
+        expect_status=400,
+        title="Nearby without lat/lon (should fail)"
+    )
+    
+    if airport_ids:
+        # Test 3: Alternates for an airport
+        print(f"\n🔁 TEST 3: Alternates for Airport {airport_ids[0]}")
+        tester.test_endpoint(
+            f"/api/airports/{airport_ids[0]}/alternates/?radius=100&airport_type=large_airport,medium_airport",
+            method="GET",
+            title="Alternate airports within 100 sm"
+        )
+    
+    if len(airport_ids) >= 2:
+        # Test 4: Distance between two airports
+        print("\n📏 TEST 4: Distance Between Airports")
+        tester.test_endpoint(
+            f"/api/airports/distance/?origin={airport_ids[0]}&destination={airport_ids[1]}",
+            method="GET",
+            title="Great-circle distance"
+        )
+    
+    if airport_ids:
+        # Test 5: Recorded fuel prices and trend for an airport
+        print(f"\n⛽ TEST 5: Fuel Price History for Airport {airport_ids[0]}")
+        tester.test_endpoint(
+            f"/api/airports/{airport_ids[0]}/fuel_prices/",
+            method="GET",
+            title="Latest fuel price per FBO"
+        )
+        tester.test_endpoint(
+            f"/api/airports/{airport_ids[0]}/fuel_price_trend/?days=30",
+            method="GET",
+            title="Daily fuel price trend"
+        )
+    
+    print("\n✅ Airport spatial endpoint tests completed!")
+
+
+def find_airport(tester, ident):
+    response = tester.session.get(f"{tester.base_url}/api/airports/", params={'search': ident})
+    if response.status_code != 200:
+        return None
+    data = response.json()
+    results = data.get('results', data) if isinstance(data, dict) else data
+    return next((airport['id'] for airport in results if airport.get('ident') == ident), None)
+
+
+def check_plan(plan, max_stops=None, max_range_nm=None):
+    """Print whether a plan's legs join up and respect the stop and range limits."""
+    legs = plan.get('legs', [])
+    if plan.get('number_of_stops') == len(legs) - 1 and len(plan.get('route', [])) == len(legs) + 1:
+        print(f"✅ {len(legs)} legs via {' → '.join(plan['route_idents'])}")
+    else:
+        print(f"❌ Route and legs don't match: {plan}")
+    if max_stops is not None:
+        if plan['number_of_stops'] <= max_stops:
+            print(f"✅ {plan['number_of_stops']} stops is within the limit of {max_stops}")
+        else:
+            print(f"❌ {plan['number_of_stops']} stops is over the limit of {max_stops}")
+    if max_range_nm is not None:
+        longest = max(leg['distance_nm'] for leg in legs)
+        if longest <= max_range_nm:
+            print(f"✅ The longest leg ({longest} nm) is within range ({max_range_nm} nm)")
+        else:
+            print(f"❌ The longest leg ({longest} nm) is over range ({max_range_nm} nm)")
+
+
+def test_route_planning():
+    """Test the fuel stop planner and planning trip lines from it."""
+    tester = APITester()
+
+    print("\n🧪 TESTING ROUTE PLANNING")
+    print("=" * 80)
+    if not tester.authenticate("admin", "admin"):
+        print("⚠️  Authentication failed, continuing without auth...")
+
+    airports = {ident: find_airport(tester, ident) for ident in ('KLAX', 'KBUR', 'KJFK')}
+    if not all(airports.values()):
+        print(f"⚠️  Missing airports {[ident for ident, airport_id in airports.items() if not airport_id]}, skipping route planning tests")
+        return
+    lax_jfk = {"origin_airport": airports['KLAX'], "destination_airport": airports['KJFK']}
+
+    # Test 1: a short hop needs no fuel stop
+    print("\n🛫 TEST 1: Direct Flight in Range")
+    response = tester.test_endpoint(
+        "/api/airports/plan_route/",
+        method="POST",
+        data={"origin_airport": airports['KLAX'], "destination_airport": airports['KBUR']},
+        title="Plan KLAX → KBUR"
+    )
+    if response and response.status_code == 200:
+        plan = response.json()
+        if plan['number_of_stops'] == 0 and plan['route_idents'] == ['KLAX', 'KBUR']:
+            print("✅ Flown direct")
+        else:
+            print(f"❌ Expected a direct flight, got {plan['route_idents']}")
+
+    # Test 2: a route just beyond the range takes one fuel stop
+    print("\n⛽ TEST 2: One Fuel Stop")
+    response = tester.test_endpoint(
+        "/api/airports/plan_route/",
+        method="POST",
+        data={**lax_jfk, "max_range_nm": 1500},
+        title="Plan KLAX → KJFK with a 1500 nm range"
+    )
+    if response and response.status_code == 200:
+        plan = response.json()
+        if plan['number_of_stops'] == 1:
+            print(f"✅ One fuel stop at {plan['route_idents'][1]}")
+        else:
+            print(f"❌ Expected one fuel stop, got {plan['route_idents']}")
+        check_plan(plan, max_range_nm=1500)
+
+    # Test 3: the stop limit is respected, and a route that needs more stops fails
+    print("\n🔢 TEST 3: Stop Limit")
+    response = tester.test_endpoint(
+        "/api/airports/plan_route/",
+        method="POST",
+        data={**lax_jfk, "max_range_nm": 900, "max_stops": 2},
+        title="Plan KLAX → KJFK with a 900 nm range and at most 2 stops"
+    )
+    if response and response.status_code == 200:
+        check_plan(response.json(), max_stops=2, max_range_nm=900)
+    tester.test_endpoint(
+        "/api/airports/plan_route/",
+        method="POST",
+        data={**lax_jfk, "max_range_nm": 900, "max_stops": 1},
+        expect_status=400,
+        title="Plan KLAX → KJFK with a 900 nm range and 1 stop (should fail)"
+    )
+
+    # Test 4: an unreachable destination is a 400 with an error, not a 500
+    print("\n🚫 TEST 4: Unreachable Destination")
+    response = tester.test_endpoint(
+        "/api/airports/plan_route/",
+        method="POST",
+        data={**lax_jfk, "max_range_nm": 100},
+        expect_status=400,
+        title="Plan KLAX → KJFK with a 100 nm range (should fail)"
+    )
+    if response is not None and response.status_code == 400 and 'error' in response.json():
+        print(f"✅ Explained: {response.json()['error']}")
+
+    # Test 5: planning trip lines creates one leg per planned leg
+    response = tester.session.get(f"{tester.base_url}/api/trips/")
+    trips = response.json().get('results', []) if response.status_code == 200 else []
+    if not trips:
+        print("\n⚠️  No trips found, skipping plan_trip_lines tests")
+        print("\n✅ Route planning tests completed!")
+        return
+    trip_id = trips[0]['id']
+    print(f"\n🧭 TEST 5: Plan Trip Lines (Trip ID: {trip_id})")
+    response = tester.test_endpoint(
+        f"/api/trips/{trip_id}/plan_trip_lines/",
+        method="POST",
+        data={**lax_jfk, "max_range_nm": 1500, "departure_time_utc": "2030-01-15T15:00:00Z"},
+        expect_status=201,
+        title="Plan trip lines KLAX → KJFK"
+    )
+    if response and response.status_code == 201:
+        result = response.json()
+        trip_lines = result['trip_lines']
+        if len(trip_lines) == len(result['plan']['legs']):
+            print(f"✅ Created {len(trip_lines)} trip lines, one per leg")
+        else:
+            print(f"❌ Created {len(trip_lines)} trip lines for {len(result['plan']['legs'])} legs")
+        for trip_line in trip_lines:
+            tester.test_endpoint(
+                f"/api/trip-lines/{trip_line['id']}/",
+                method="DELETE",
+                expect_status=204,
+                title="Remove planned trip line"
+            )
+    tester.test_endpoint(
+        f"/api/trips/{trip_id}/plan_trip_lines/",
+        method="POST",
+        data={**lax_jfk, "max_range_nm": 100, "departure_time_utc": "2030-01-15T15:00:00Z"},
+        expect_status=400,
+        title="Plan unreachable trip lines (should fail)"
+    )
+
+    print("\n✅ Route planning tests completed!")
+
+
+if __name__ == "__main__":
+    test_airport_spatial_endpoints()
+    test_route_planning()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Test bulk document export (api/document_export.py and /api/documents/export/).
+Runs in-process - no server needed - with the project settings on a throwaway
+SQLite database and document store, so the stream limit can be lowered to
+exercise the background job hand-off.
+"""
+import sys
+import os
+import io
+import base64
+import shutil
+import tempfile
+import zipfile
+from datetime import datetime
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import django
+from django.conf import settings
+
+TEMP_DIR = tempfile.mkdtemp(prefix='document-export-test-')
+STREAM_MAX_FILES = 2
+if not settings.configured:
+    from backend import settings as project_settings
+
+    overrides = dict(
+        DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(TEMP_DIR, 'db.sqlite3')}},
+        DOCUMENT_STORAGE_BACKEND='local',
+        DOCUMENT_STORAGE_DIR=os.path.join(TEMP_DIR, 'stored'),
+        ENCRYPTION_KEY=base64.b64encode(os.urandom(32)).decode(),
+        DOCUMENT_EXPORT_STREAM_MAX_FILES=STREAM_MAX_FILES,
+        ALLOWED_HOSTS=['testserver'],
+    )
+    project = {name: getattr(project_settings, name) for name in dir(project_settings) if name.isupper()}
+    settings.configure(**{**project, **overrides})
+    django.setup()
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from api.document_export import zip_chunks
+
+
+failures = []
+
+
+def check(ok, message):
+    print(f"{'✅' if ok else '❌'} {message}")
+    if not ok:
+        failures.append(message)
+
+
+def unzip(data):
+    """Entries of a ZIP as {name: bytes}, or None if it doesn't read back cleanly."""
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            if archive.testzip() is not None:
+                return None
+            return {name: archive.read(name) for name in archive.namelist()}
+    except zipfile.BadZipFile:
+        return None
+
+
+def fake_document(filename, content, file_size='actual', storage_key=None):
+    return SimpleNamespace(
+        id=filename, filename=filename, content=content, storage_key=storage_key, file_path=None,
+        encrypted=False, trip_id=None, trip=None, created_on=datetime(2026, 1, 2, 3, 4, 5),
+        file_size=len(content or b'') if file_size == 'actual' else file_size,
+    )
+
+
+def test_zip_chunks():
+    print("\n🗜️  TEST 1: Streamed ZIP Archives")
+    small, large = b'%PDF-1.7 small', os.urandom(300 * 1024)
+    for compression in ('stored', 'deflate'):
+        for label, file_size in (('recorded', 'actual'), ('missing', None), ('too small', 10), ('too large', 10 ** 7)):
+            documents = [fake_document('a.pdf', small, file_size), fake_document('b.pdf', large, file_size)]
+            entries = unzip(b''.join(zip_chunks(documents, compression)))
+            check(entries == {'a.pdf': small, 'b.pdf': large},
+                  f"{compression}, {label} file sizes: the archive unzips to the original files")
+
+    documents = [fake_document('same.pdf', b'one'), fake_document('same.pdf', b'two'),
+                 fake_document('gone.pdf', None, storage_key='ab/cd/gone.pdf'), fake_document('last.pdf', b'three')]
+    entries = unzip(b''.join(zip_chunks(documents)))
+    check(entries is not None and entries.get('same.pdf') == b'one' and entries.get('same (2).pdf') == b'two',
+          f"duplicate names are numbered ({sorted(entries or {})})")
+    check(entries is not None and 'gone.pdf' not in entries and entries.get('last.pdf') == b'three',
+          "a missing file is left out and the export carries on")
+    errors = (entries or {}).get('EXPORT_ERRORS.txt', b'').decode()
+    check(errors.startswith('gone.pdf: ') and errors.count('\n') == 1,
+          f"EXPORT_ERRORS.txt lists the missing file ({errors.strip()})")
+    check('EXPORT_ERRORS.txt' not in unzip(b''.join(zip_chunks(documents[:2]))),
+          "no EXPORT_ERRORS.txt when every file was read")
+
+
+def test_export_endpoint():
+    from api.document_storage import read_document
+    from api.jobs import claim_job, run_job
+    from api.models import Document, Job
+
+    print("\n🗜️  TEST 2: Export Endpoint")
+    call_command('migrate', verbosity=0)
+    user = User.objects.create_user('export-test', password='export-test')
+    client = APIClient()
+    client.force_authenticate(user)
+
+    check(client.get('/api/documents/export/').status_code == 400, "document_type is required")
+    check(client.get('/api/documents/export/', {'document_type': 'insurance_card'}).status_code == 400,
+          "patient uploads can't be exported")
+    check(client.get('/api/documents/export/', {'document_type': 'quote'}).status_code == 404,
+          "no matching documents: 404")
+
+    contents = {f"quote-{i}.pdf": os.urandom(1000 + i) for i in range(STREAM_MAX_FILES + 1)}
+    for filename, content in list(contents.items())[:STREAM_MAX_FILES]:
+        Document.objects.create(filename=filename, document_type='quote', content=content, file_size=len(content))
+    response = client.get('/api/documents/export/', {'document_type': 'quote', 'compression': 'deflate'})
+    streamed = unzip(b''.join(response.streaming_content)) if response.status_code == 200 else None
+    check(streamed == dict(list(contents.items())[:STREAM_MAX_FILES]),
+          f"{STREAM_MAX_FILES} files are streamed as a ZIP ({response.status_code})")
+
+    print("\n🗜️  TEST 3: Background Export")
+    filename, content = list(contents.items())[-1]
+    Document.objects.create(filename=filename, document_type='quote', content=content, file_size=len(content))
+    response = client.get('/api/documents/export/', {'document_type': 'quote'})
+    job_id = response.json().get('job', {}).get('id') if response.status_code == 202 else None
+    check(job_id is not None and response.json()['files'] == len(contents),
+          f"{len(contents)} files (over the limit of {STREAM_MAX_FILES}) are handed to a job: {response.status_code}")
+    if job_id is None:
+        return
+
+    job = claim_job(['documents'], 'export-test')
+    check(job is not None and str(job.id) == job_id, "the export job is queued on the documents queue")
+    if job is None:
+        return
+    run_job(job)
+    job.refresh_from_db()
+    check(job.status == 'succeeded', f"the export job {job.status} {job.last_error}")
+    if job.status != 'succeeded':
+        return
+    export = Document.objects.get(id=job.result['document_id'])
+    check(export.document_type == 'document_export' and export.created_by_id == user.id,
+          f"the export is stored as {export.filename} for the requesting user")
+    check(unzip(read_document(export)) == contents, "the stored export unzips to every file")
+    check(Job.objects.filter(name='documents.export').count() == 1, "one job was enqueued")
+
+
+if __name__ == "__main__":
+    print("🧪 TESTING DOCUMENT EXPORT")
+    print("=" * 80)
+    try:
+        test_zip_chunks()
+        test_export_endpoint()
+    finally:
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+    if failures:
+        print(f"\n❌ {len(failures)} document export check(s) failed")
+        sys.exit(1)
+    print("\n✅ Document export tests completed!")
@@ -180,5 +180,108 @@ def test_document_endpoints():
     print("\n✅ Document endpoint tests completed!")
 
 
+def generated_document_ids(tester, trip_id, title):
+    response = tester.test_endpoint(
+        f"/api/trips/{trip_id}/generate_documents/",
+        method="POST",
+        data={},
+        expect_status=201,
+        title=title
+    )
+    if not response or response.status_code != 201:
+        return None
+    return sorted(document['id'] for document in response.json().get('documents', []))
+
+
+def trip_document_count(tester, trip_id):
+    response = tester.session.get(f"{tester.base_url}/api/trips/{trip_id}/documents/")
+    return len(response.json()) if response.status_code == 200 else None
+
+
+def test_trip_document_reuse():
+    """Unchanged trips reuse their rendered documents; a changed trip renders new ones."""
+    tester = APITester()
+
+    print("\n🧪 TESTING TRIP DOCUMENT REUSE")
+    print("=" * 80)
+    if not tester.authenticate("admin", "admin"):
+        print("⚠️  Authentication failed, continuing without auth...")
+
+    response = tester.session.get(f"{tester.base_url}/api/trips/")
+    results = response.json().get('results', []) if response.status_code == 200 else []
+    if not results:
+        print("⚠️  No trips found, skipping trip document reuse tests")
+        return
+    trip = results[0]
+    trip_id = trip['id']
+
+    # Test 1: generating twice returns the same documents and stores nothing new
+    print(f"\n♻️  TEST 1: Repeated Generation Reuses Documents (Trip ID: {trip_id})")
+    first_ids = generated_document_ids(tester, trip_id, "Generate Trip Documents")
+    count = trip_document_count(tester, trip_id)
+    second_ids = generated_document_ids(tester, trip_id, "Generate Trip Documents Again")
+    if first_ids is None or second_ids is None:
+        print("❌ Could not generate trip documents")
+        return
+    if first_ids and first_ids == second_ids:
+        print(f"✅ Both calls returned the same {len(first_ids)} documents")
+    else:
+        print(f"❌ Document ids changed between calls: {first_ids} -> {second_ids}")
+    if trip_document_count(tester, trip_id) == count:
+        print(f"✅ The trip still has {count} documents")
+    else:
+        print("❌ The second call stored new documents")
+
+    # Test 2: the merged packet is reused too
+    print(f"\n♻️  TEST 2: Repeated Packet Reuses the Merged PDF (Trip ID: {trip_id})")
+    packets, counts = [], []
+    for _ in range(2):
+        packets.append(tester.session.get(f"{tester.base_url}/api/trips/{trip_id}/packet/"))
+        counts.append(trip_document_count(tester, trip_id))
+    if all(packet.status_code == 200 for packet in packets):
+        if packets[0].headers.get('ETag') and packets[0].headers['ETag'] == packets[1].headers.get('ETag'):
+            print(f"✅ Both packet requests served the same file ({packets[0].headers['ETag']})")
+        else:
+            print(f"❌ Packet ETags differ: {[packet.headers.get('ETag') for packet in packets]}")
+        if counts[0] == counts[1]:
+            print(f"✅ The second packet request stored nothing new ({counts[1]} trip documents)")
+        else:
+            print(f"❌ The second packet request stored new documents: {counts[0]} -> {counts[1]}")
+        if generated_document_ids(tester, trip_id, "Generate Trip Documents After Packet") == first_ids:
+            print("✅ The packet used the already generated documents")
+        else:
+            print("❌ The packet regenerated its documents")
+    else:
+        print(f"⚠️  Packet returned {[packet.status_code for packet in packets]}, skipping packet reuse checks")
+
+    # Test 3: a change to the trip renders new documents
+    print(f"\n🔄 TEST 3: Changed Trip Renders New Documents (Trip ID: {trip_id})")
+    original_number = trip.get('trip_number') or ''
+    tester.test_endpoint(
+        f"/api/trips/{trip_id}/",
+        method="PATCH",
+        data={"trip_number": f"{original_number}-T"[:20]},
+        expect_status=200,
+        title="Change Trip Number"
+    )
+    try:
+        changed_ids = generated_document_ids(tester, trip_id, "Generate Trip Documents After Change")
+        if changed_ids and not set(changed_ids) & set(first_ids):
+            print(f"✅ The changed trip got {len(changed_ids)} new documents")
+        else:
+            print(f"❌ Documents were reused after the trip changed: {changed_ids}")
+    finally:
+        tester.test_endpoint(
+            f"/api/trips/{trip_id}/",
+            method="PATCH",
+            data={"trip_number": original_number},
+            expect_status=200,
+            title="Restore Trip Number"
+        )
+
+    print("\n✅ Trip document reuse tests completed!")
+
+
 if __name__ == "__main__":
     test_document_endpoints()
+    test_trip_document_reuse()
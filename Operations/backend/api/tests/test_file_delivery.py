@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Test conditional and ranged download responses (api/file_delivery.py).
+Runs in-process - no server needed - against a temporary file, an in-memory
+blob and an encrypted file in a temporary document store.
+"""
+import sys
+import os
+import base64
+import shutil
+import tempfile
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import django
+from django.conf import settings
+
+STORAGE_DIR = tempfile.mkdtemp(prefix='file-delivery-test-')
+if not settings.configured:
+    settings.configure(
+        DEBUG=False,
+        ALLOWED_HOSTS=['testserver'],
+        DOCUMENT_ACCEL_REDIRECT=False,
+        BASE_DIR=STORAGE_DIR,
+        DOCUMENT_STORAGE_BACKEND='local',
+        DOCUMENT_STORAGE_DIR=STORAGE_DIR,
+        ENCRYPTION_KEY=base64.b64encode(os.urandom(32)).decode(),
+    )
+    django.setup()
+
+from django.test import RequestFactory
+from django.utils.http import http_date
+
+from api.document_storage import get_document_storage
+from api.encryption import FileEncryption
+from api.file_delivery import file_etag, parse_range, serve_content, serve_encrypted, serve_file
+
+
+SIZE = 1000
+DATA = os.urandom(SIZE)
+failures = []
+factory = RequestFactory()
+
+
+def check(ok, message):
+    print(f"{'✅' if ok else '❌'} {message}")
+    if not ok:
+        failures.append(message)
+
+
+def body(response):
+    if response.streaming:
+        return b''.join(response.streaming_content)
+    return response.content
+
+
+def get(serve, *args, **headers):
+    request = factory.get('/download', **{f"HTTP_{name.upper()}": value for name, value in headers.items()})
+    return serve(request, *args, 'application/pdf')
+
+
+def test_parse_range():
+    print("\n📄 TEST 1: Range Header Parsing")
+    cases = [
+        ('bytes=0-99', (0, 99)),
+        ('bytes=900-', (900, 999)),
+        ('bytes=900-5000', (900, 999)),
+        ('bytes=-100', (900, 999)),
+        ('bytes=-5000', (0, 999)),
+        ('bytes=-0', (SIZE, SIZE)),
+        ('bytes=1000-', (SIZE, SIZE)),
+        ('bytes=5000-6000', (SIZE, SIZE)),
+        ('bytes=0-9,20-29', None),
+        ('bytes=50-10', None),
+        ('bytes=abc-', None),
+        ('items=0-9', None),
+        ('', None),
+    ]
+    for header, expected in cases:
+        result = parse_range(header, SIZE)
+        check(result == expected, f"'{header}' -> {result}")
+
+
+def check_ranges(serve, *args):
+    """Ranges common to files and blobs (serve_file/serve_content/serve_encrypted)."""
+    response = get(serve, *args)
+    check(response.status_code == 200 and body(response) == DATA and response['Accept-Ranges'] == 'bytes',
+          "no Range: the whole file with Accept-Ranges")
+    etag = response['ETag']
+
+    response = get(serve, *args, range='bytes=10-19')
+    check(response.status_code == 206 and body(response) == DATA[10:20]
+          and response['Content-Range'] == f'bytes 10-19/{SIZE}', "bytes=10-19: 206 with those bytes")
+
+    response = get(serve, *args, range='bytes=-100')
+    check(response.status_code == 206 and body(response) == DATA[-100:]
+          and response['Content-Range'] == f'bytes 900-999/{SIZE}', "bytes=-100: 206 with the last 100 bytes")
+
+    for header in ('bytes=-0', 'bytes=1000-', 'bytes=5000-'):
+        response = get(serve, *args, range=header)
+        check(response.status_code == 416 and response['Content-Range'] == f'bytes */{SIZE}',
+              f"{header}: 416 with the size")
+
+    response = get(serve, *args, range='bytes=0-9,20-29')
+    check(response.status_code == 200 and body(response) == DATA, "a multi-range request gets the whole file")
+
+    response = get(serve, *args, range='bytes=10-19', if_range=etag)
+    check(response.status_code == 206 and body(response) == DATA[10:20], "If-Range with the current ETag: 206")
+    response = get(serve, *args, range='bytes=10-19', if_range='"stale"')
+    check(response.status_code == 200 and body(response) == DATA, "a stale If-Range gets the whole file")
+
+    response = get(serve, *args, if_none_match=etag)
+    check(response.status_code == 304 and not body(response) and response['ETag'] == etag,
+          "If-None-Match with the current ETag: 304")
+    response = get(serve, *args, if_none_match='"stale"')
+    check(response.status_code == 200, "If-None-Match with another ETag: 200")
+    return etag
+
+
+def test_serve_file():
+    print("\n📄 TEST 2: Files on Disk")
+    with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as f:
+        f.write(DATA)
+    try:
+        etag = check_ranges(serve_file, f.name, 'trip.pdf')
+        check(etag == file_etag(os.stat(f.name)), f"the ETag is nginx-style mtime-size ({etag})")
+
+        last_modified = http_date(int(os.stat(f.name).st_mtime))
+        response = get(serve_file, f.name, 'trip.pdf', if_modified_since=last_modified)
+        check(response.status_code == 304, "If-Modified-Since the file's mtime: 304")
+        response = get(serve_file, f.name, 'trip.pdf', range='bytes=10-19', if_range=last_modified)
+        check(response.status_code == 206, "If-Range with the file's Last-Modified date: 206")
+
+        os.utime(f.name, (0, 0))
+        response = get(serve_file, f.name, 'trip.pdf', if_none_match=etag)
+        check(response.status_code == 200 and response['ETag'] != etag, "a changed file no longer matches its old ETag")
+    finally:
+        os.unlink(f.name)
+
+
+def test_serve_content():
+    print("\n📄 TEST 3: In-Memory Blobs")
+    check_ranges(serve_content, DATA, 'trip.pdf')
+
+
+def test_serve_encrypted():
+    print("\n📄 TEST 4: Encrypted Files")
+    key = 'ab/cd/encrypted.pdf'
+    size, _ = get_document_storage().save(key, FileEncryption.encrypt_chunks([DATA]), 'application/pdf')
+    document = SimpleNamespace(storage_key=key, file_sha256='a' * 64, file_size=SIZE, filename='trip.pdf')
+    check(size > SIZE, f"stored {size} encrypted bytes for {SIZE} plaintext bytes")
+    check_ranges(serve_encrypted, document)
+
+    get_document_storage().delete(key)
+    check(get(serve_encrypted, document) is None, "a missing stored file returns None (a 404 in the views)")
+
+
+if __name__ == "__main__":
+    print("🧪 TESTING FILE DELIVERY")
+    print("=" * 80)
+    try:
+        test_parse_range()
+        test_serve_file()
+        test_serve_content()
+        test_serve_encrypted()
+    finally:
+        shutil.rmtree(STORAGE_DIR, ignore_errors=True)
+    if failures:
+        print(f"\n❌ {len(failures)} file delivery check(s) failed")
+        sys.exit(1)
+    print("\n✅ File delivery tests completed!")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test fuel price endpoint (/api/airport/fuel-prices/<code>/)
+Run this against a live server started with
+FLIGHTAWARE_BASE_URL=http://127.0.0.1:8765 - this script serves the stub on that port.
+"""
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from base_test import APITester
+from flightaware_stub import FlightAwareStub
+
+
+STUB_PORT = int(os.environ.get("FLIGHTAWARE_STUB_PORT", 8765))
+
+
+def test_fuel_price_endpoints():
+    """Test caching and single-flight behaviour of the fuel price endpoint."""
+    tester = APITester()
+    stub = FlightAwareStub(port=STUB_PORT).start()
+
+    print("🧪 TESTING FUEL PRICE ENDPOINTS")
+    print("=" * 80)
+
+    # Test authentication
+    print("Attempting authentication...")
+    if not tester.authenticate("admin", "admin"):
+        print("⚠️  Authentication failed, continuing without auth...")
+
+    try:
+        # Test 1: Concurrent first requests for one airport share one scrape
+        print("\n⛽ TEST 1: Concurrent Requests (single-flight)")
+        code = "KSTB"
+        with ThreadPoolExecutor(max_workers=5) as pool:
+            responses = list(pool.map(
+                lambda _: tester.session.get(f"{tester.base_url}/api/airport/fuel-prices/{code}/"),
+                range(5),
+            ))
+        statuses = [r.status_code for r in responses]
+        print(f"Statuses: {statuses}, upstream fetches: {stub.hits[code]}")
+        if all(s == 200 for s in statuses) and stub.hits[code] == 1:
+            print("✅ Concurrent requests collapsed into one upstream fetch")
+        else:
+            print("❌ Expected 5 × 200 with exactly one upstream fetch")
+
+        # Test 2: Repeat request is served from cache
+        print("\n⛽ TEST 2: Cached Request")
+        response = tester.test_endpoint(
+            f"/api/airport/fuel-prices/{code}/",
+            method="GET",
+            title=f"Fuel prices for {code} (cached)"
+        )
+        if response and response.status_code == 200:
+            data = response.json()
+            if data.get("cached") and stub.hits[code] == 1 and len(data.get("fuel_prices", [])) == 2:
+                print("✅ Served from cache without a new upstream fetch")
+            else:
+                print("❌ Expected a cached response with two priced FBOs")
+
+        # Test 3: Forced refresh goes upstream again
+        print("\n⛽ TEST 3: Forced Refresh")
+        response = tester.test_endpoint(
+            f"/api/airport/fuel-prices/{code}/?refresh=true",
+            method="GET",
+            title=f"Fuel prices for {code} (refresh)"
+        )
+        if response and response.status_code == 200 and stub.hits[code] == 2:
+            print("✅ Refresh triggered a new upstream fetch")
+        else:
+            print("❌ Expected refresh to fetch upstream")
+    finally:
+        stub.stop()
+
+    print("\n✅ Fuel price endpoint tests completed!")
+
+
+if __name__ == "__main__":
+    test_fuel_price_endpoints()
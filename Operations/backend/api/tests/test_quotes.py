@@ -133,7 +133,17 @@ def test_quote_endpoints():
             expect_status=200,
             title=f"Update Quote {quote_id} with IDs only"
         )
-    
+
+    # Test 6: Batch route estimation with no routes should fail validation
+    print("\n🧮 TEST 6: Batch Route Estimation (empty)")
+    tester.test_endpoint(
+        "/api/quotes/estimate/",
+        method="POST",
+        data={"routes": [], "aircraft_types": ["35", "65"]},
+        expect_status=400,
+        title="Estimate with no routes (should fail)"
+    )
+
     print("\n✅ Quote endpoint tests completed!")
 
 
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test the shared SMTP connection (utils/smtp/transport.py) against a local SMTP sink.
+Runs in-process - no server needed - and needs aiosmtpd (pip install aiosmtpd);
+the sink accepts, refuses or drops each message by recipient.
+"""
+import sys
+import os
+import smtplib
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from utils.smtp.transport import SMTPTransport
+
+
+SMTP_PORT = int(os.environ.get("SMTP_SINK_PORT", 8025))
+MESSAGE = "Subject: transport test\r\n\r\nHello"
+failures = []
+
+
+def check(ok, message):
+    print(f"{'✅' if ok else '❌'} {message}")
+    if not ok:
+        failures.append(message)
+
+
+class SinkHandler:
+    """Replies by recipient: unknown@ 550, busy@ 451, drop-once@ 421 on the first DATA, anyone else 250."""
+
+    def __init__(self):
+        self.connections = 0
+        self.delivered = []
+        self.dropped = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("unknown@"):
+            return "550 5.1.1 No such user"
+        if address.startswith("busy@"):
+            return "451 4.7.1 Try again later"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        if "drop-once@example.com" in envelope.rcpt_tos and not self.dropped:
+            self.dropped += 1
+            return "421 4.3.2 Service shutting down"
+        self.delivered.append(list(envelope.rcpt_tos))
+        return "250 Message accepted"
+
+
+def raises(error_type, transport, to):
+    try:
+        transport.send("ops@example.com", to, MESSAGE)
+    except error_type as e:
+        return e
+    return None
+
+
+def test_transport():
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        print("⚠️  aiosmtpd is not installed (pip install aiosmtpd), skipping SMTP transport tests")
+        return
+
+    print("🧪 TESTING SMTP TRANSPORT")
+    print("=" * 80)
+    handler = SinkHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=SMTP_PORT)
+    controller.start()
+    transport = SMTPTransport("127.0.0.1", SMTP_PORT, use_tls=False)
+    try:
+        # Test 1: messages share one connection
+        print("\n📧 TEST 1: Connection Reuse")
+        for _ in range(5):
+            transport.send("ops@example.com", ["ok@example.com"], MESSAGE)
+        check(handler.connections == 1 and len(handler.delivered) == 5,
+              f"5 messages sent over {handler.connections} connection(s)")
+
+        # Test 2: rejections are reported and leave the connection usable
+        print("\n📧 TEST 2: Rejections")
+        refused = transport.send("ops@example.com", ["ok@example.com", "unknown@example.com"], MESSAGE)
+        check(list(refused) == ["unknown@example.com"] and refused["unknown@example.com"][0] == 550,
+              f"a recipient refused alongside an accepted one is returned ({refused})")
+        error = raises(smtplib.SMTPRecipientsRefused, transport, ["unknown@example.com"])
+        check(error is not None and error.recipients["unknown@example.com"][0] == 550,
+              "550 for every recipient raises SMTPRecipientsRefused")
+        error = raises(smtplib.SMTPRecipientsRefused, transport, ["busy@example.com"])
+        check(error is not None and error.recipients["busy@example.com"][0] == 451,
+              "451 for every recipient raises SMTPRecipientsRefused")
+        transport.send("ops@example.com", ["ok@example.com"], MESSAGE)
+        check(handler.connections == 1, "the connection is still used after rejections")
+
+        # Test 3: a dropped connection is reopened and the message sent again once
+        print("\n📧 TEST 3: Dropped Connection")
+        delivered = len(handler.delivered)
+        transport.send("ops@example.com", ["drop-once@example.com"], MESSAGE)
+        check(handler.dropped == 1 and handler.connections == 2 and len(handler.delivered) == delivered + 1,
+              f"421 reconnects and resends once ({handler.connections} connections)")
+
+        # Test 4: a connection that has sat idle is checked first; a restarted server is reconnected to
+        print("\n📧 TEST 4: Server Restart")
+        controller.stop()
+        controller = Controller(handler, hostname="127.0.0.1", port=SMTP_PORT)
+        controller.start()
+        transport.max_idle = 0
+        transport.send("ops@example.com", ["ok@example.com"], MESSAGE)
+        check(handler.connections == 3, "an idle connection to a restarted server is replaced")
+
+        # Test 5: an unreachable server raises after the retry
+        print("\n📧 TEST 5: Server Down")
+        controller.stop()
+        controller = None
+        error = raises(OSError, transport, ["ok@example.com"])
+        check(error is not None and transport.connection is None, f"an unreachable server raises ({type(error).__name__})")
+    finally:
+        transport.close()
+        if controller is not None:
+            controller.stop()
+
+
+if __name__ == "__main__":
+    test_transport()
+    if failures:
+        print(f"\n❌ {len(failures)} SMTP transport check(s) failed")
+        sys.exit(1)
+    print("\n✅ SMTP transport tests completed!")
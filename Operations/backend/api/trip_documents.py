@@ -0,0 +1,371 @@
+"""
+Precomputed trip snapshot shared by the trip document generators.
+
+Itineraries, handling requests, general declarations and quotes all describe
+the same trip graph: its aircraft, patient, legs with their airports and
+FBOs, crew lines and passengers. TripDocumentContext.load() reads that graph
+in a fixed number of queries however many legs, crew lines or passengers the
+trip has, and decrypts each person's details once. The *_data() methods then
+build the docs.py / gen_dec.py dataclasses from memory, so a generator that
+renders one document per crew line or per leg costs no extra queries.
+"""
+
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, List, Optional
+
+from .models import Contact, CrewLine, Trip, TripLine
+
+DEFAULT_OPERATOR = 'JET Aviation Operations'
+
+
+def _format_date(value) -> str:
+    return value.strftime('%Y-%m-%d') if isinstance(value, date) else ''
+
+
+@dataclass
+class Person:
+    """Decrypted details of a passenger or the patient."""
+    name: str
+    title: str = ''
+    nationality: str = ''
+    date_of_birth: str = ''
+    passport_number: str = ''
+    passport_expiration: str = ''
+    contact_number: str = ''
+
+
+@dataclass
+class TripDocumentContext:
+    trip: Trip
+    trip_lines: List[TripLine]
+    crew_lines: List[CrewLine]
+    passengers: List[Person]
+    patient: Optional[Person] = None
+    live_enrichment: bool = False
+    _names: Dict[object, str] = field(default_factory=dict, repr=False)
+    _enrichment: Optional[dict] = field(default=None, repr=False)
+
+    @classmethod
+    def load(cls, trip: Trip, live_enrichment: bool = False) -> 'TripDocumentContext':
+        """
+        Load a trip's document graph: the trip with its aircraft, patient and
+        quote (1 query), its legs with airports, FBOs and crew (1), their
+        crew lines' medics (1) and the passengers (1).
+
+        live_enrichment lets FBO and fuel details missing from the database
+        and cache be scraped from FlightAware; only background jobs set it.
+        """
+        trip = Trip.objects.select_related('aircraft', 'patient__info', 'quote').get(pk=trip.pk)
+        trip_lines = list(
+            trip.trip_lines.select_related(
+                'origin_airport', 'destination_airport', 'departure_fbo', 'arrival_fbo',
+                'crew_line__primary_in_command', 'crew_line__secondary_in_command',
+            ).prefetch_related('crew_line__medic_ids').order_by('departure_time_utc')
+        )
+
+        crew_lines = {}
+        for trip_line in trip_lines:
+            if trip_line.crew_line is not None:
+                crew_lines.setdefault(trip_line.crew_line_id, trip_line.crew_line)
+
+        context = cls(trip=trip, trip_lines=trip_lines, crew_lines=list(crew_lines.values()), passengers=[],
+                      live_enrichment=live_enrichment)
+        context.passengers = [
+            context._passenger(passenger)
+            for passenger in trip.passengers.select_related('info') if passenger.info
+        ]
+        if trip.patient and trip.patient.info:
+            context.patient = context._patient(trip.patient)
+        return context
+
+    def name(self, contact: Optional[Contact]) -> str:
+        """A contact's full name, decrypted once per contact."""
+        if contact is None:
+            return ''
+        if contact.id not in self._names:
+            self._names[contact.id] = f"{contact.get_first_name()} {contact.get_last_name()}".strip()
+        return self._names[contact.id]
+
+    def _passenger(self, passenger) -> Person:
+        info = passenger.info
+        return Person(
+            name=self.name(info),
+            nationality=passenger.get_nationality() or info.get_nationality() or '',
+            date_of_birth=_format_date(passenger.get_date_of_birth() or info.get_date_of_birth()),
+            passport_number=passenger.get_passport_number() or info.get_passport_number() or '',
+            passport_expiration=_format_date(passenger.get_passport_expiration_date() or info.get_passport_expiration_date()),
+            contact_number=passenger.get_contact_number() or info.get_phone() or '',
+        )
+
+    def _patient(self, patient) -> Person:
+        info = patient.info
+        return Person(
+            name=self.name(info),
+            title='Patient',
+            nationality=patient.get_nationality() or info.get_nationality() or '',
+            date_of_birth=_format_date(patient.get_date_of_birth() or info.get_date_of_birth()),
+            passport_number=patient.get_passport_number() or info.get_passport_number() or '',
+            passport_expiration=_format_date(patient.get_passport_expiration_date() or info.get_passport_expiration_date()),
+        )
+
+    @property
+    def first_trip_line(self) -> Optional[TripLine]:
+        return self.trip_lines[0] if self.trip_lines else None
+
+    @property
+    def trip_date(self) -> str:
+        first = self.first_trip_line
+        return first.departure_time_local.strftime('%Y-%m-%d') if first and first.departure_time_local else ''
+
+    @property
+    def mission(self) -> str:
+        return self.trip.type.title() if self.trip.type else 'Charter'
+
+    @property
+    def occupants(self) -> List[Person]:
+        """Passengers plus the patient, unless the patient is already listed as a passenger."""
+        people = list(self.passengers)
+        if self.patient and self.patient.name and all(p.name != self.patient.name for p in people):
+            people.append(self.patient)
+        return people
+
+    @property
+    def enrichment(self) -> dict:
+        """FBO and fuel details for every airport on the trip, looked up on first use."""
+        if self._enrichment is None:
+            from .airport_enrichment import enrich_trip_airports
+            self._enrichment = enrich_trip_airports(
+                self.trip, trip_lines=self.trip_lines, fetch_missing=self.live_enrichment
+            )
+        return self._enrichment
+
+    def trip_lines_for(self, crew_line: Optional[CrewLine]) -> List[TripLine]:
+        if crew_line is None:
+            return self.trip_lines
+        return [trip_line for trip_line in self.trip_lines if trip_line.crew_line_id == crew_line.id]
+
+    def itinerary_data(self, crew_line: Optional[CrewLine] = None):
+        """
+        Itinerary for one crew line's legs, or for the whole trip (crewed by
+        its first crew line) when crew_line is None.
+        """
+        from documents.templates.docs import AirportInfo, CrewInfo, FlightLeg, ItineraryData, TimeInfo
+
+        trip = self.trip
+        trip_lines = self.trip_lines_for(crew_line)
+        crew_line = crew_line or (self.crew_lines[0] if self.crew_lines else None)
+
+        crew_info = CrewInfo()
+        if crew_line:
+            crew_info.pic = self.name(crew_line.primary_in_command)
+            crew_info.sic = self.name(crew_line.secondary_in_command)
+            medics = [self.name(medic) for medic in crew_line.medic_ids.all()]
+            crew_info.med_1, crew_info.med_2, crew_info.med_4 = (medics + ['', '', ''])[:3]
+
+        flight_legs = [
+            FlightLeg(
+                leg=str(i),
+                departure_id=trip_line.origin_airport.ident if trip_line.origin_airport else '',
+                edt_utc_local=trip_line.departure_time_local.strftime('%H:%M %Z') if trip_line.departure_time_local else '',
+                arrival_id=trip_line.destination_airport.ident if trip_line.destination_airport else '',
+                flight_time=str(trip_line.flight_time) if trip_line.flight_time else '',
+                eta_utc_local=trip_line.arrival_time_local.strftime('%H:%M %Z') if trip_line.arrival_time_local else '',
+                ground_time=str(trip_line.ground_time) if trip_line.ground_time else '',
+                pax_leg='Yes' if trip_line.passenger_leg else 'No'
+            )
+            for i, trip_line in enumerate(trip_lines, 1)
+        ]
+
+        enrichment = self.enrichment
+        airports = []
+        seen_airports = set()
+        for trip_line in trip_lines:
+            for airport in (trip_line.origin_airport, trip_line.destination_airport):
+                if airport is None or airport.id in seen_airports:
+                    continue
+                seen_airports.add(airport.id)
+                details = enrichment.get(airport.id)
+                airports.append(AirportInfo(
+                    icao=airport.icao_code or airport.ident,
+                    airport_city_name=airport.name,
+                    state_country=f"{airport.iso_region}, {airport.iso_country}",
+                    time_zone=airport.timezone or '',
+                    fbo_handler=details.fbo_handler if details else '',
+                    phone_fax=details.phone_fax if details else '',
+                    fuel=details.fuel if details else ''
+                ))
+
+        patient = trip.patient
+        return ItineraryData(
+            trip_number=trip.trip_number or '',
+            tail_number=trip.aircraft.tail_number if trip.aircraft else '',
+            trip_date=self.trip_date,
+            trip_type=self.mission,
+            patient_name=self.patient.name if self.patient else '',
+            bed_at_origin=patient.bed_at_origin if patient else False,
+            bed_at_dest=patient.bed_at_destination if patient else False,
+            special_instructions=patient.get_special_instructions() if patient else trip.get_notes(),
+            passengers=[person.name for person in self.passengers],
+            crew=crew_info,
+            flight_legs=flight_legs,
+            airports=airports,
+            times=TimeInfo(
+                origin_edt=trip.estimated_departure_time.strftime('%H:%M %Z') if trip.estimated_departure_time else '',
+                pre_flight_duty_time=str(trip.pre_flight_duty_time) if trip.pre_flight_duty_time else '',
+                post_flight_duty_time=str(trip.post_flight_duty_time) if trip.post_flight_duty_time else ''
+            )
+        )
+
+    def handling_request_data(self, trip_line: Optional[TripLine] = None):
+        """Handling request for one leg, or without leg times when trip_line is None."""
+        from documents.templates.docs import HandlingRequestData, PassengerInfo
+
+        aircraft = self.trip.aircraft
+        passengers = [
+            PassengerInfo(
+                name=person.name,
+                title=person.title,
+                nationality=person.nationality,
+                date_of_birth=person.date_of_birth,
+                passport_number=person.passport_number,
+                passport_expiration=person.passport_expiration,
+                contact_number=person.contact_number
+            )
+            for person in self.occupants
+        ]
+        return HandlingRequestData(
+            company=(aircraft.company if aircraft else '') or DEFAULT_OPERATOR,
+            make=aircraft.make if aircraft else '',
+            model=aircraft.model if aircraft else '',
+            tail_number=aircraft.tail_number if aircraft else '',
+            serial_number=aircraft.serial_number if aircraft else '',
+            mgtow=str(aircraft.mgtow) if aircraft and aircraft.mgtow else '',
+            mission=self.mission,
+            depart_origin=trip_line.departure_time_local.strftime('%H:%M') if trip_line and trip_line.departure_time_local else '',
+            arrive_dest=trip_line.arrival_time_local.strftime('%H:%M') if trip_line and trip_line.arrival_time_local else '',
+            passengers=passengers
+        )
+
+    def gen_dec_data(self):
+        """General declaration for the first leg with every occupant titled PAX, PIC, SIC or MED."""
+        from documents.templates.gen_dec import Airport, GenDecData, GenDecMember
+
+        members = [
+            GenDecMember(name=person.name, title='PAX', nationality=person.nationality, passport_num=person.passport_number)
+            for person in self.occupants if person.name
+        ]
+
+        crew_added = set()
+        for crew_line in self.crew_lines:
+            crew = [('PIC', crew_line.primary_in_command), ('SIC', crew_line.secondary_in_command)]
+            crew += [('MED', medic) for medic in crew_line.medic_ids.all()]
+            for title, contact in crew:
+                name = self.name(contact)
+                if name and name not in crew_added:
+                    members.append(GenDecMember(name=name, title=title))
+                    crew_added.add(name)
+
+        def gen_dec_airport(airport):
+            if airport is None:
+                return Airport(icao='', city='', country='')
+            return Airport(icao=airport.ident, city=airport.municipality or '', country=airport.iso_country or '')
+
+        first = self.first_trip_line
+        aircraft = self.trip.aircraft
+        return GenDecData(
+            owner=aircraft.company if aircraft else DEFAULT_OPERATOR,
+            tail_num=aircraft.tail_number if aircraft else '',
+            flight_no=self.trip.trip_number or '',
+            date=self.trip_date,
+            depart=gen_dec_airport(first.origin_airport if first else None),
+            arrive=gen_dec_airport(first.destination_airport if first else None),
+            members=members
+        )
+
+    def quote_data(self):
+        """Quote summary for the trip's legs and its linked quote."""
+        from documents.templates.docs import QuoteData
+
+        trip = self.trip
+        quote = trip.quote
+        first, last = self.first_trip_line, (self.trip_lines[-1] if self.trip_lines else None)
+        return QuoteData(
+            quote_id=str(quote.id) if quote else '',
+            inquiry_date=quote.created_on.strftime('%Y-%m-%d') if quote else '',
+            patient_name=self.patient.name if self.patient else '',
+            aircraft_type=f"{trip.aircraft.make} {trip.aircraft.model}" if trip.aircraft else '',
+            pickup_airport=first.origin_airport.name if first else '',
+            dropoff_airport=last.destination_airport.name if last else '',
+            trip_date=self.trip_date,
+            esitmated_flight_time=str(quote.estimated_flight_time) if quote and quote.estimated_flight_time else '',
+            medical_team=quote.medical_team if quote else '',
+            amount=str(quote.quoted_amount) if quote and quote.quoted_amount else '',
+            notes=trip.get_notes()
+        )
+
+
+# Documents in a trip packet, in the order they're generated
+PACKET_DOCUMENT_TYPES = ['quote', 'customer_itinerary', 'handling_request', 'gendec', 'internal_itinerary']
+
+# Packet templates, by document type
+PACKET_TEMPLATES = {
+    'quote': 'Quote.pdf',
+    'customer_itinerary': 'itin.pdf',
+    'internal_itinerary': 'itin.pdf',
+    'handling_request': 'handling_request.pdf',
+    'gendec': 'gen_dec.pdf',
+}
+
+
+def packet_render_tasks(context: TripDocumentContext, document_type: str,
+                        template_dir: Optional[str] = None, output_dir: Optional[str] = None):
+    """
+    Build the render tasks for one packet document type: an itinerary per
+    crew line, a handling request per leg, and one of each other document.
+
+    Returns:
+        List of RenderTasks in packet order; empty if the template is missing
+        or the trip has nothing to put in the document
+    """
+    import os
+
+    from django.conf import settings
+
+    from documents.templates.docs import (
+        populate_handling_request_pdf, populate_itinerary_pdf, populate_quote_pdf,
+    )
+    from documents.templates.gen_dec import populate_gen_dec_pdf_enhanced
+
+    from .document_rendering import RenderTask
+
+    template_dir = template_dir or os.path.join(settings.BASE_DIR, 'documents', 'templates', 'nosign_pdf')
+    output_dir = output_dir or os.path.join(settings.BASE_DIR, 'documents', 'generated')
+
+    input_path = os.path.join(template_dir, PACKET_TEMPLATES[document_type])
+    if not os.path.exists(input_path):
+        print(f"{document_type} template not found: {input_path}")
+        return []
+
+    if document_type == 'quote':
+        populate, data = populate_quote_pdf, [context.quote_data()]
+    elif document_type.endswith('itinerary'):
+        # The whole trip's itinerary until a leg has been crewed
+        populate = populate_itinerary_pdf
+        data = [context.itinerary_data(crew_line) for crew_line in context.crew_lines] or [context.itinerary_data()]
+    elif document_type == 'handling_request':
+        populate = populate_handling_request_pdf
+        data = [context.handling_request_data(trip_line) for trip_line in context.trip_lines] or [context.handling_request_data()]
+    else:
+        populate, data = populate_gen_dec_pdf_enhanced, [context.gen_dec_data()]
+        if data[0].total_occupants == 0:
+            print(f"No occupants found for trip {context.trip.trip_number}, skipping general declaration")
+            return []
+
+    name = f"{context.trip.trip_number}-{document_type}"
+    # Numbered so that ordering a type's documents by filename keeps their packet order
+    names = [name] if len(data) == 1 else [f"{name}-{i:02d}" for i in range(1, len(data) + 1)]
+    return [
+        RenderTask(populate, input_path, output_dir, task_name, task_data, document_type)
+        for task_name, task_data in zip(names, data)
+    ]
@@ -0,0 +1,80 @@
+"""
+A trip's packet documents merged into one PDF for crews and FBOs.
+
+The merged packet is built from the trip's current packet documents (see
+generate_packet): the quote, an itinerary per crew line, a handling request
+per leg and the general declaration. It is kept in document storage as a
+'trip_packet' Document whose content_hash is a hash of its constituents'
+SHA-256s. While none of them change, every request gets that same file,
+served like any other document (nginx X-Accel-Redirect, ranges, ETags); a
+change to any of them produces a new packet, and only the trip's latest
+PACKETS_KEPT are stored.
+"""
+
+import hashlib
+import os
+import tempfile
+from typing import Dict, List
+
+from .document_storage import delete_document_file, document_file_exists, read_document, store_document_file
+
+PACKETS_KEPT = 4  # merged packets stored per trip
+
+
+def packet_hash(documents: Dict[str, List]) -> str:
+    """Hash identifying a merged packet: its documents' types, order and contents."""
+    digest = hashlib.sha256()
+    for document_type, type_documents in documents.items():
+        for document in type_documents:
+            digest.update(f"{document_type}:{document.file_sha256 or document.id}\n".encode())
+    return digest.hexdigest()
+
+
+def merged_packet(trip, documents: Dict[str, List], created_by=None):
+    """
+    The merged PDF of a trip's packet documents, built only if not already stored.
+
+    Args:
+        trip: Trip the documents belong to
+        documents: Lists of packet Documents by type, in packet order (from generate_packet)
+        created_by: User recorded on a newly built packet
+
+    Returns:
+        'trip_packet' Document, or None if there are no documents
+    """
+    from documents.templates.pdf_forms import merge_forms
+
+    from .models import Document
+
+    if not documents:
+        return None
+    content_hash = packet_hash(documents)
+    packets = Document.objects.filter(trip=trip, document_type='trip_packet')
+    packet = packets.filter(content_hash=content_hash).order_by('-created_on').first()
+    if packet is not None and document_file_exists(packet):
+        return packet
+
+    packet = Document(
+        filename=f"{trip.trip_number or trip.id}_packet.pdf",
+        document_type='trip_packet',
+        content_hash=content_hash,
+        trip=trip,
+        created_by=created_by,
+    )
+    fd, path = tempfile.mkstemp(suffix='.pdf')
+    os.close(fd)
+    try:
+        merge_forms([
+            read_document(document) for type_documents in documents.values() for document in type_documents
+        ], path)
+        store_document_file(packet, path)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+    packet.save()
+
+    # Keep only the trip's most recent few (different 'types' selections make different packets)
+    for stale in packets.exclude(pk=packet.pk).order_by('-created_on')[PACKETS_KEPT - 1:]:
+        delete_document_file(stale)
+        stale.delete()
+    return packet
@@ -37,6 +37,9 @@ urlpatterns = [
     path("health/", health_check),
     path('airport/fuel-prices/<str:airport_code>/', views.get_fuel_prices, name='fuel-prices'),
     path('dashboard/stats/', views.dashboard_stats, name='dashboard-stats'),
+    path('integrations/metrics/', views.integration_metrics, name='integration-metrics'),
+    path('jobs/<uuid:job_id>/', views.job_status, name='job-status'),
+    path('scheduler/status/', views.scheduler_status, name='scheduler-status'),
     path('contacts/create-with-related/', views.create_contact_with_related, name='create-contact-with-related'),
     # Timezone utility endpoints
     path('airports/<uuid:airport_id>/timezone-info/', views.get_airport_timezone_info, name='airport-timezone-info'),
@@ -2,7 +2,7 @@ from django.shortcuts import render
 from rest_framework import viewsets, permissions, status, filters
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.decorators import action, api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.response import Response
 from django.contrib.auth import authenticate
 from rest_framework.pagination import PageNumberPagination
@@ -16,17 +16,11 @@ import os
 import uuid
 from datetime import datetime
 from itertools import chain
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from io import BytesIO
 import logging
 from .decorators import is_hipaa_protected
 # TripEvent imports moved to consolidated imports section below
 
-from .external.airport import get_airport, parse_fuel_cost
+from .fuel_prices import FuelPriceUnavailable, get_fuel_prices as get_cached_fuel_prices
 
 def health_check(request):
     return JsonResponse({"status": "ok"})
@@ -36,24 +30,82 @@ def health_check(request):
 def get_fuel_prices(request, airport_code):
     """
     Get fuel prices for a specific airport
+
+    Served from a per-airport cache; pass ?refresh=true to force a new scrape.
     """
+    force_refresh = request.query_params.get('refresh', '').lower() in ('1', 'true', 'yes')
     try:
-        # Get airport data from FlightAware
-        soup = get_airport(airport_code)
-        if not soup:
-            return JsonResponse({'error': 'Failed to retrieve airport data'}, status=400)
-        
-        # Parse fuel prices
-        fuel_prices = parse_fuel_cost(soup)
-        
-        return JsonResponse({'fuel_prices': fuel_prices})
+        entry, cached = get_cached_fuel_prices(airport_code, force_refresh=force_refresh)
+    except FuelPriceUnavailable as e:
+        logger.warning("Fuel prices unavailable: %s", e)
+        return JsonResponse({'error': 'Failed to retrieve airport data'}, status=400)
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
+    return JsonResponse({
+        'fuel_prices': entry['fuel_prices'],
+        'fetched_at': entry['fetched_at'],
+        'cached': cached,
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def integration_metrics(request):
+    """
+    Request counts, latency and circuit state for each external integration
+    client in this worker process
+    """
+    from utils.services.http_client import get_metrics
+    return Response(get_metrics())
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def scheduler_status(request):
+    """
+    Schedule, last run and runtime metrics for each periodic maintenance task
+    """
+    from .models import ScheduledTask
+    from utils.schedulers.periodic import PERIODIC_TASKS, load_tasks
+
+    load_tasks()
+    states = {state.name: state for state in ScheduledTask.objects.all()}
+    tasks = []
+    for name, task in sorted(PERIODIC_TASKS.items()):
+        state = states.get(name) or ScheduledTask(name=name)
+        tasks.append({
+            'name': name,
+            'description': task.description,
+            'schedule': str(task.schedule) if task.schedule else None,
+            'last_started_at': state.last_started_at,
+            'last_finished_at': state.last_finished_at,
+            'last_status': state.last_status,
+            'last_result': state.last_result,
+            'last_error': state.last_error,
+            'last_duration_ms': state.last_duration_ms,
+            'avg_duration_ms': round(state.total_duration_ms / state.run_count) if state.run_count else 0,
+            'max_duration_ms': state.max_duration_ms,
+            'run_count': state.run_count,
+            'failure_count': state.failure_count,
+        })
+    return Response(tasks)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def job_status(request, job_id):
+    """
+    Status of a background job; users see their own jobs, staff see all
+    """
+    jobs = Job.objects.all() if request.user.is_staff else Job.objects.filter(created_by=request.user)
+    try:
+        job = jobs.get(id=job_id)
+    except Job.DoesNotExist:
+        return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(JobSerializer(job).data)
+
 from .models import (
     Modification, Permission, Role, Department, UserProfile, Contact, 
     FBO, Ground, Airport, Document, Aircraft, Transaction, Agreement,
-    Patient, Quote, Passenger, CrewLine, Trip, TripLine, Staff, StaffRole, StaffRoleMembership, TripEvent, Comment, Contract, LostReason
+    Patient, Quote, Passenger, CrewLine, Trip, TripLine, Staff, StaffRole, StaffRoleMembership, TripEvent, Comment, Contract, LostReason, Job
 )
 from .utils import track_creation, track_deletion
 from .contact_service import ContactCreationService, ContactCreationSerializer
@@ -78,7 +130,7 @@ from .serializers import (
     StaffRoleSerializer,
     StaffRoleMembershipReadSerializer, StaffRoleMembershipWriteSerializer,
     ContractReadSerializer, ContractWriteSerializer, ContractCreateFromTripSerializer,
-    ContractDocuSealActionSerializer, DocuSealWebhookSerializer,
+    ContractDocuSealActionSerializer, DocuSealWebhookSerializer, JobSerializer,
 )
 from .permissions import (
     IsAuthenticatedOrPublicEndpoint, IsTransactionOwner,
@@ -257,6 +309,237 @@ class AirportViewSet(BaseViewSet):
         serializer = self.get_serializer(airports, many=True)
         return Response(serializer.data)
 
+    def _spatial_params(self, request):
+        """Parse the shared radius/limit/unit/airport_type query params."""
+        from .spatial import EARTH_RADIUS
+
+        unit = request.query_params.get('unit', 'sm')
+        if unit not in EARTH_RADIUS:
+            raise ValueError(f"unit must be one of: {', '.join(EARTH_RADIUS)}")
+        radius = float(request.query_params.get('radius', 100))
+        limit = min(int(request.query_params.get('limit', 25)), 100)
+        if radius <= 0 or limit <= 0:
+            raise ValueError("radius and limit must be positive")
+        airport_types = [t for t in request.query_params.get('airport_type', '').split(',') if t]
+        return radius, limit, unit, airport_types
+
+    def _spatial_response(self, matches, unit):
+        airports = Airport.objects.prefetch_related('fbos', 'grounds').in_bulk([airport_id for airport_id, _ in matches])
+        results = []
+        for airport_id, distance in matches:
+            airport = airports.get(airport_id)
+            if airport is None:
+                continue
+            data = self.get_serializer(airport).data
+            data['distance'] = round(distance, 2)
+            data['distance_unit'] = unit
+            results.append(data)
+        return Response(results)
+
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """
+        Airports within a radius of a point, nearest first.
+        Query params: lat, lon, radius (default 100), unit (sm/nm/km), limit, airport_type (comma separated)
+        """
+        from .spatial import get_airport_index
+
+        try:
+            lat = float(request.query_params['lat'])
+            lon = float(request.query_params['lon'])
+            radius, limit, unit, airport_types = self._spatial_params(request)
+        except KeyError:
+            return Response({"detail": "lat and lon are required"}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        matches = get_airport_index().within_radius(
+            lat, lon, radius, unit=unit, airport_types=airport_types, limit=limit
+        )
+        return self._spatial_response(matches, unit)
+
+    @action(detail=True, methods=['get'])
+    def alternates(self, request, pk=None):
+        """
+        Alternate airports near this airport, nearest first, excluding itself.
+        Query params: radius (default 100), unit (sm/nm/km), limit, airport_type (comma separated)
+        """
+        from .spatial import get_airport_index
+
+        airport = self.get_object()
+        try:
+            radius, limit, unit, airport_types = self._spatial_params(request)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        matches = get_airport_index().within_radius(
+            float(airport.latitude), float(airport.longitude), radius, unit=unit,
+            airport_types=airport_types, exclude=[airport.id], limit=limit
+        )
+        return self._spatial_response(matches, unit)
+
+    @action(detail=False, methods=['get'])
+    def distance(self, request):
+        """
+        Great-circle distance between two airports.
+        Query params: origin, destination (airport ids)
+        """
+        from .spatial import airport_distance
+
+        origin_id = request.query_params.get('origin')
+        destination_id = request.query_params.get('destination')
+        if not origin_id or not destination_id:
+            return Response({"detail": "origin and destination are required"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            airports = Airport.objects.in_bulk([origin_id, destination_id])
+        except Exception:
+            return Response({"detail": "Invalid airport id"}, status=status.HTTP_400_BAD_REQUEST)
+        origin = next((a for a in airports.values() if str(a.id) == str(origin_id)), None)
+        destination = next((a for a in airports.values() if str(a.id) == str(destination_id)), None)
+        if origin is None or destination is None:
+            return Response({"detail": "Airport not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'origin': origin.ident,
+            'destination': destination.ident,
+            'distance_sm': round(airport_distance(origin, destination, unit='sm'), 2),
+            'distance_nm': round(airport_distance(origin, destination, unit='nm'), 2),
+            'distance_km': round(airport_distance(origin, destination, unit='km'), 2),
+        })
+
+    @action(detail=True, methods=['get'])
+    def fuel_prices(self, request, pk=None):
+        """
+        Latest recorded Jet-A price per FBO at this airport, cheapest first.
+        Query params: max_age_days (default 7)
+        """
+        from .fuel_prices import LATEST_PRICE_MAX_AGE_DAYS, latest_fuel_prices
+        from .serializers import FuelPriceSerializer
+
+        airport = self.get_object()
+        try:
+            max_age_days = int(request.query_params.get('max_age_days', LATEST_PRICE_MAX_AGE_DAYS))
+        except ValueError:
+            return Response({"detail": "max_age_days must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        observations = latest_fuel_prices([airport.id], max_age_days=max_age_days).get(airport.id, [])
+        return Response({
+            'airport': airport.ident,
+            'fuel_prices': FuelPriceSerializer(observations, many=True).data,
+        })
+
+    @action(detail=True, methods=['get'])
+    def fuel_price_trend(self, request, pk=None):
+        """
+        Daily average/min/max Jet-A price at this airport.
+        Query params: days (default 30, max 365), fbo (FBO name, optional)
+        """
+        from .fuel_prices import fuel_price_trend
+
+        airport = self.get_object()
+        try:
+            days = min(int(request.query_params.get('days', 30)), 365)
+        except ValueError:
+            return Response({"detail": "days must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        trend = fuel_price_trend(airport.id, days=days, fbo_name=request.query_params.get('fbo'))
+        return Response({
+            'airport': airport.ident,
+            'days': days,
+            'trend': [
+                {
+                    'day': row['day'],
+                    'average': round(row['average'], 2),
+                    'minimum': row['minimum'],
+                    'maximum': row['maximum'],
+                    'observations': row['observations'],
+                }
+                for row in trend
+            ],
+        })
+
+    @action(detail=False, methods=['post'])
+    def plan_route(self, request):
+        """
+        Plan the minimum-time fuel stop sequence between two airports.
+
+        Request body:
+        {
+            "origin_airport": "uuid",
+            "destination_airport": "uuid",
+            "aircraft_type": "35",
+            "airport_types": ["large_airport", "medium_airport"],
+            "require_fbo": false,
+            "max_range_nm": null,
+            "max_stops": 4
+        }
+        """
+        from .serializers import RoutePlanSerializer
+
+        serializer = RoutePlanSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            plan, profile = plan_route_from_request(serializer.validated_data)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(serialize_route_plan(plan, profile))
+
+
+def plan_route_from_request(validated_data, default_aircraft_type='35'):
+    """
+    Run the fuel-stop planner for validated RoutePlanSerializer data.
+    Raises ValueError (including NoRouteFound) when no plan is possible.
+    """
+    from .route_estimation import get_profile
+    from .route_planner import plan_route, NoRouteFound
+
+    profile = get_profile(validated_data.get('aircraft_type') or default_aircraft_type)
+    try:
+        plan = plan_route(
+            validated_data['origin_airport'],
+            validated_data['destination_airport'],
+            profile,
+            airport_types=validated_data['airport_types'],
+            require_fbo=validated_data['require_fbo'],
+            max_range_nm=validated_data.get('max_range_nm'),
+            max_stops=validated_data['max_stops'],
+        )
+    except NoRouteFound as e:
+        raise ValueError(str(e))
+    return plan, profile
+
+
+def serialize_route_plan(plan, profile):
+    """Response payload for a RoutePlan."""
+    from datetime import timedelta
+    from .route_estimation import NM_TO_SM
+
+    airports = Airport.objects.only('id', 'ident', 'name').in_bulk(plan.airport_ids)
+    return {
+        'aircraft_profile': profile.name,
+        'route': [str(airport_id) for airport_id in plan.airport_ids],
+        'route_idents': [airports[airport_id].ident for airport_id in plan.airport_ids],
+        'number_of_stops': plan.number_of_stops,
+        'distance_nm': round(plan.distance_nm, 1),
+        'distance_sm': round(plan.distance_nm * NM_TO_SM, 1),
+        'total_time': str(timedelta(minutes=round(plan.total_minutes))),
+        'legs': [
+            {
+                'origin_airport': str(leg.origin_id),
+                'origin_ident': airports[leg.origin_id].ident,
+                'destination_airport': str(leg.destination_id),
+                'destination_ident': airports[leg.destination_id].ident,
+                'distance_nm': round(leg.distance_nm, 1),
+                'flight_time': str(timedelta(minutes=round(leg.flight_minutes))),
+            }
+            for leg in plan.legs
+        ],
+    }
+
 # Document ViewSet
 class DocumentViewSet(BaseViewSet):
     queryset = Document.objects.all()
@@ -479,10 +762,6 @@ class PatientViewSet(BaseViewSet):
                 )
             
             try:
-                # Create upload directory if it doesn't exist
-                upload_dir = os.path.join(settings.MEDIA_ROOT, 'patient_documents')
-                os.makedirs(upload_dir, exist_ok=True)
-                
                 # Get or create trip reference if provided
                 trip = None
                 if trip_id:
@@ -511,23 +790,22 @@ class PatientViewSet(BaseViewSet):
                 # Add timestamp for uniqueness
                 timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                 filename = f"{descriptive_name}_{timestamp}{file_extension}"
-                file_path = os.path.join(upload_dir, filename)
-                
-                # Save file
-                with open(file_path, 'wb+') as destination:
-                    for chunk in file.chunks():
-                        destination.write(chunk)
-                
                 
-                # Create document record
-                document = Document.objects.create(
+                # Encrypt the file into document storage as it streams in and create document record
+                from .document_storage import store_document
+                document = Document(
                     filename=filename,
                     document_type=document_type,
-                    file_path=f"patient_documents/{filename}",
                     trip=trip,
                     patient=patient,
                     created_by=request.user
                 )
+                store_document(document, file.chunks(), encrypt=True)
+                document.save()
+                
+                # Thumbnails and previews are rendered by the background workers
+                from .jobs import enqueue
+                enqueue('documents.render_previews', {'document_id': str(document.id)}, created_by=request.user)
                 
                 # Update patient with document reference
                 if document_type == 'insurance_card':
@@ -540,7 +818,7 @@ class PatientViewSet(BaseViewSet):
                 return Response({
                     'message': 'Document uploaded successfully',
                     'document_id': document.id,
-                    'file_path': document.file_path
+                    'file_path': document.storage_key
                 }, status=status.HTTP_201_CREATED)
                 
             except Exception as e:
@@ -569,15 +847,14 @@ class PatientViewSet(BaseViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        from .document_storage import delete_document_file
+        
         try:
             if document_type == 'insurance_card' and patient.insurance_card:
                 document = patient.insurance_card
                 
                 # Delete physical file
-                if document.file_path:
-                    file_path = os.path.join(settings.MEDIA_ROOT, document.file_path)
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
+                delete_document_file(document)
                 
                 # Remove reference from patient
                 patient.insurance_card = None
@@ -611,10 +888,7 @@ class PatientViewSet(BaseViewSet):
                 
                 # Delete all matching documents
                 for document in documents:
-                    if document.file_path:
-                        file_path = os.path.join(settings.MEDIA_ROOT, document.file_path)
-                        if os.path.exists(file_path):
-                            os.remove(file_path)
+                    delete_document_file(document)
                     document.delete()
                 
                 return Response({'message': 'Document(s) deleted successfully'})
@@ -693,438 +967,115 @@ class QuoteViewSet(BaseViewSet):
         )
         
         quote.transactions.add(transaction)
-        
+
         return Response(TransactionReadSerializer(transaction).data, status=status.HTTP_201_CREATED)
-    
+
+    @action(detail=False, methods=['post'])
+    def estimate(self, request):
+        """
+        Estimate distance, flight time, block time and stops for many candidate routes at once.
+
+        Request body:
+        {
+            "routes": [{"pickup_airport": "uuid", "dropoff_airport": "uuid", "stops": ["uuid"]}],
+            "aircraft_types": ["35", "65"]
+        }
+        """
+        from .serializers import RouteEstimateSerializer
+        from .route_estimation import estimate_routes
+
+        serializer = RouteEstimateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        routes = [
+            [route['pickup_airport'], *route['stops'], route['dropoff_airport']]
+            for route in serializer.validated_data['routes']
+        ]
+        airport_ids = {airport_id for waypoints in routes for airport_id in waypoints}
+        airports = Airport.objects.only('id', 'ident', 'latitude', 'longitude').in_bulk(airport_ids)
+        missing = airport_ids - set(airports)
+        if missing:
+            return Response(
+                {'error': f"Airports not found: {', '.join(sorted(str(a) for a in missing))}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            estimates = estimate_routes(routes, serializer.validated_data['aircraft_types'], airports)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        for estimate in estimates:
+            estimate['route_idents'] = [airports[airport_id].ident for airport_id in estimate['route']]
+            estimate['route'] = [str(airport_id) for airport_id in estimate['route']]
+            estimate['estimated_flight_time'] = str(estimate['estimated_flight_time'])
+            estimate['block_time'] = str(estimate['block_time'])
+
+        return Response({'results': estimates})
+
     @action(detail=True, methods=['get'])
     def pdf(self, request, pk=None):
         """
-        Generate and return a professional quote PDF
+        Generate and return a professional quote PDF.
+        Rendered once per version of the quote (see api/quote_documents.py);
+        supports Range and conditional (ETag) requests like document downloads.
         """
-        quote = self.get_object()
-        
-        # Generate PDF
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(
-            buffer, 
-            pagesize=letter, 
-            rightMargin=50, 
-            leftMargin=50, 
-            topMargin=50, 
-            bottomMargin=50
-        )
+        from .file_delivery import serve_document
+        from .quote_documents import quote_document
         
-        # Custom styles
-        styles = getSampleStyleSheet()
-        
-        # Company header style
-        company_style = ParagraphStyle(
-            'CompanyHeader',
-            parent=styles['Normal'],
-            fontSize=18,
-            fontName='Helvetica-Bold',
-            textColor=colors.HexColor('#1E40AF'),
-            alignment=0,  # Left alignment
-            spaceBefore=0,
-            spaceAfter=6,
-            leading=22
-        )
-        
-        # Company info style
-        company_info_style = ParagraphStyle(
-            'CompanyInfo',
-            parent=styles['Normal'],
-            fontSize=9,
-            textColor=colors.HexColor('#6B7280'),
-            alignment=0,
-            spaceBefore=0,
-            spaceAfter=0,
-            leading=11
-        )
-        
-        # Quote title style
-        quote_title_style = ParagraphStyle(
-            'QuoteTitle',
-            parent=styles['Normal'],
-            fontSize=24,
-            fontName='Helvetica-Bold',
-            textColor=colors.HexColor('#1F2937'),
-            alignment=2,  # Right alignment
-            spaceBefore=0,
-            spaceAfter=6,
-            leading=28
-        )
-        
-        # Quote number style
-        quote_number_style = ParagraphStyle(
-            'QuoteNumber',
-            parent=styles['Normal'],
-            fontSize=10,
-            textColor=colors.HexColor('#6B7280'),
-            alignment=2,  # Right alignment
-            spaceBefore=0,
-            spaceAfter=0,
-            leading=12
-        )
-        
-        # Section header style
-        section_header_style = ParagraphStyle(
-            'SectionHeader',
-            parent=styles['Normal'],
-            fontSize=11,
-            fontName='Helvetica-Bold',
-            textColor=colors.HexColor('#1F2937'),
-            spaceBefore=25,
-            spaceAfter=12,
-            leading=13,
-            leftIndent=0,
-            rightIndent=0
-        )
-        
-        # Build PDF content
-        story = []
-        
-        # Header section with company info and quote title
-        header_data = [
-            [
-                Paragraph("JET ICU MEDICAL TRANSPORT", company_style), 
-                Paragraph("QUOTE", quote_title_style)
-            ],
-            [
-                Paragraph("1511 N Westshore Blvd #650<br/>Tampa, FL 33607", company_info_style),
-                Paragraph(f"#{quote.id.hex[:8].upper()}", quote_number_style)
-            ],
-            [
-                Paragraph("Phone: (352) 796-2540<br/>Email: info@jeticu.com", company_info_style),
-                Paragraph(f"Date: {quote.created_on.strftime('%B %d, %Y') if quote.created_on else 'N/A'}", quote_number_style)
-            ]
-        ]
-        
-        header_table = Table(header_data, colWidths=[4.2*inch, 2.3*inch])
-        header_table.setStyle(TableStyle([
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-            ('TOPPADDING', (0, 0), (-1, -1), 4),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-            ('LEFTPADDING', (0, 0), (-1, -1), 0),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-        ]))
-        
-        story.append(header_table)
-        story.append(Spacer(1, 25))
-        
-        # Add customer info style
-        customer_info_style = ParagraphStyle(
-            'CustomerInfo',
-            parent=styles['Normal'],
-            fontSize=10,
-            leading=14,
-            spaceBefore=0,
-            spaceAfter=0,
-            leftIndent=0,
-            rightIndent=0
-        )
-        
-        # Bill To section
-        if quote.contact:
-            story.append(Paragraph("BILL TO", section_header_style))
-            
-            # Customer details
-            customer_lines = []
-            
-            # Name and business
-            name = f"{quote.contact.first_name} {quote.contact.last_name}"
-            if quote.contact.business_name:
-                customer_lines.append(quote.contact.business_name)
-                customer_lines.append(name)
-            else:
-                customer_lines.append(name)
-            
-            # Address
-            if quote.contact.address_line1:
-                customer_lines.append(quote.contact.address_line1)
-            if quote.contact.address_line2:
-                customer_lines.append(quote.contact.address_line2)
-            if quote.contact.city:
-                city_line = quote.contact.city
-                if quote.contact.state:
-                    city_line += f", {quote.contact.state}"
-                if quote.contact.zip:
-                    city_line += f" {quote.contact.zip}"
-                customer_lines.append(city_line)
-            
-            # Contact info
-            if quote.contact.email:
-                customer_lines.append(f"Email: {quote.contact.email}")
-            if quote.contact.phone:
-                customer_lines.append(f"Phone: {quote.contact.phone}")
-            
-            story.append(Paragraph("<br/>".join(customer_lines), customer_info_style))
-            story.append(Spacer(1, 25))
-        
-        # Service Details Section
-        story.append(Paragraph("SERVICE DETAILS", section_header_style))
-        
-        # Service table
-        service_data = [
-            ['Service', 'Details', 'Amount'],
-        ]
-        
-        # Aircraft type description
-        aircraft_desc = dict(quote._meta.get_field('aircraft_type').choices).get(quote.aircraft_type, quote.aircraft_type)
-        medical_desc = dict(quote._meta.get_field('medical_team').choices).get(quote.medical_team, quote.medical_team)
-        
-        # Route description
-        route = "Medical Air Transport"
-        if quote.pickup_airport and quote.dropoff_airport:
-            route = f"{quote.pickup_airport.name} → {quote.dropoff_airport.name}"
-        
-        service_data.append([
-            route,
-            f"Aircraft: {aircraft_desc}<br/>Medical Team: {medical_desc}<br/>Flight Time: {quote.estimated_flight_time if quote.estimated_flight_time else 'TBD'}",
-            f"${quote.quoted_amount:,.2f}"
-        ])
-        
-        # Ground transport if included
-        if quote.includes_grounds:
-            service_data.append([
-                "Ground Transportation",
-                "Airport transfers included",
-                "Included"
-            ])
-        
-        # Service table with better column distribution
-        service_table = Table(service_data, colWidths=[2.2*inch, 2.8*inch, 1.5*inch])
-        service_table.setStyle(TableStyle([
-            # Header row
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1F2937')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-            ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
-            
-            # Data rows
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 9),
-            ('ALIGN', (0, 1), (0, -1), 'LEFT'),      # Service column
-            ('ALIGN', (1, 1), (1, -1), 'LEFT'),      # Details column
-            ('ALIGN', (2, 1), (2, -1), 'RIGHT'),     # Amount column
-            ('VALIGN', (0, 1), (-1, -1), 'TOP'),
-            
-            # Alternating row colors
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F9FAFB')]),
-            
-            # Grid
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#E5E7EB')),
-            ('LINEBELOW', (0, 0), (-1, 0), 2, colors.HexColor('#1F2937')),
-            
-            # Padding - increased for better spacing
-            ('TOPPADDING', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-            ('LEFTPADDING', (0, 0), (-1, -1), 8),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 8),
-        ]))
-        
-        story.append(service_table)
-        story.append(Spacer(1, 25))
-        
-        # Total section
-        total_data = [
-            ['', 'Subtotal:', f"${quote.quoted_amount:,.2f}"],
-            ['', 'Tax:', "$0.00"],
-            ['', 'TOTAL:', f"${quote.quoted_amount:,.2f}"]
-        ]
-        
-        total_table = Table(total_data, colWidths=[3.2*inch, 1.6*inch, 1.7*inch])
-        total_table.setStyle(TableStyle([
-            ('FONTNAME', (1, 0), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (1, 0), (-1, 1), 10),
-            ('FONTSIZE', (1, 2), (-1, 2), 12),  # Total row larger
-            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
-            ('TEXTCOLOR', (1, 2), (-1, 2), colors.HexColor('#1F2937')),
-            ('LINEABOVE', (1, 2), (-1, 2), 1.5, colors.HexColor('#1F2937')),
-            ('TOPPADDING', (1, 0), (-1, -1), 6),
-            ('BOTTOMPADDING', (1, 0), (-1, -1), 6),
-            ('LEFTPADDING', (1, 0), (-1, -1), 4),
-            ('RIGHTPADDING', (1, 0), (-1, -1), 4),
-        ]))
-        
-        story.append(total_table)
-        story.append(Spacer(1, 25))
-        
-        # Patient Information (if applicable)
-        if quote.patient and quote.patient.info:
-            story.append(Paragraph("PATIENT INFORMATION", section_header_style))
-            
-            patient_info_data = [
-                ['Patient Name:', f"{quote.patient.info.first_name} {quote.patient.info.last_name}"],
-            ]
-            
-            if quote.patient.info.date_of_birth:
-                patient_info_data.append(['Date of Birth:', quote.patient.info.date_of_birth.strftime('%B %d, %Y')])
-            
-            if quote.patient.info.nationality:
-                patient_info_data.append(['Nationality:', quote.patient.info.nationality])
-            
-            patient_table = Table(patient_info_data, colWidths=[1.8*inch, 4.7*inch])
-            patient_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-                ('TOPPADDING', (0, 0), (-1, -1), 3),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
-                ('LEFTPADDING', (0, 0), (-1, -1), 0),
-                ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-            ]))
-            
-            story.append(patient_table)
-            story.append(Spacer(1, 25))
-        
-        # Terms and Conditions
-        story.append(Paragraph("TERMS & CONDITIONS", section_header_style))
-        
-        # Terms style
-        terms_style = ParagraphStyle(
-            'Terms',
-            parent=styles['Normal'],
-            fontSize=9,
-            leading=12,
-            spaceBefore=0,
-            spaceAfter=0,
-            leftIndent=0,
-            rightIndent=0
-        )
-        
-        terms_text = """
-        • This quote is valid for 30 days from the date of issue<br/>
-        • Payment is due upon acceptance of services<br/>
-        • Cancellation policy: 24-hour notice required<br/>
-        • Weather and operational delays may affect scheduling<br/>
-        • All flights subject to FAA regulations and crew duty time requirements<br/>
-        • Medical equipment and staff included as specified
-        """
-        
-        story.append(Paragraph(terms_text, terms_style))
-        story.append(Spacer(1, 25))
-        
-        # Footer
-        footer_style = ParagraphStyle(
-            'Footer',
-            parent=styles['Normal'],
-            fontSize=8,
-            textColor=colors.HexColor('#6B7280'),
-            alignment=1,  # Center
-            spaceBefore=0,
-            spaceAfter=0,
-            leading=10
-        )
-        
-        story.append(Paragraph("Thank you for choosing JET ICU Medical Transport", footer_style))
-        story.append(Paragraph("Your trusted partner in medical aviation", footer_style))
-        
-        # Build PDF
-        doc.build(story)
+        quote = self.get_object()
+        try:
+            document = quote_document(quote, 'report', created_by=request.user if request.user.is_authenticated else None)
+        except Exception as e:
+            return Response({
+                'error': f'Error generating quote PDF: {str(e)}'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
-        # Return PDF response
-        buffer.seek(0)
-        response = HttpResponse(buffer, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="quote_{quote.id.hex[:8]}.pdf"'
+        response = serve_document(request, document, 'application/pdf')
+        if response is None:
+            return Response({
+                'error': 'Quote PDF file not found'
+            }, status=status.HTTP_404_NOT_FOUND)
         return response
     
     @action(detail=True, methods=['post'])
     def generate_quote_document(self, request, pk=None):
         """
-        Generate a Quote PDF document using the template and save it to nosign_out directory
+        Generate a Quote PDF document using the template and store it as a Document.
+        An unchanged quote returns the document generated before.
         """
-        import os
-        from datetime import datetime
-        from django.conf import settings
-        from documents.templates.docs import populate_quote_pdf, QuoteData
+        from .quote_documents import quote_document
         
         quote = self.get_object()
         
         try:
-            # Prepare data for the quote document
-            quote_data = QuoteData(
-                quote_id=str(quote.id.hex[:8].upper()),
-                inquiry_date=quote.inquiry_date.strftime('%Y-%m-%d') if quote.inquiry_date else '',
-                patient_name=f"{quote.patient.info.first_name} {quote.patient.info.last_name}" if quote.patient and quote.patient.info else '',
-                aircraft_type=dict(quote._meta.get_field('aircraft_type').choices).get(quote.aircraft_type, quote.aircraft_type),
-                pickup_airport=f"{quote.pickup_airport.name} ({quote.pickup_airport.ident})" if quote.pickup_airport else '',
-                dropoff_airport=f"{quote.dropoff_airport.name} ({quote.dropoff_airport.ident})" if quote.dropoff_airport else '',
-                trip_date=quote.created_on.strftime('%Y-%m-%d') if quote.created_on else '',
-                esitmated_flight_time=str(quote.estimated_flight_time) if quote.estimated_flight_time else '',
-                number_of_stops=str(quote.number_of_stops),
-                medical_team=dict(quote._meta.get_field('medical_team').choices).get(quote.medical_team, quote.medical_team),
-                include_grounds='Yes' if quote.includes_grounds else 'No',
-                our_availability='Available',
-                amount=f"${quote.quoted_amount:,.2f}",
-                notes=quote.notes if hasattr(quote, 'notes') else ''
-            )
-            
-            # Define file paths
-            template_path = os.path.join(settings.BASE_DIR, 'documents', 'templates', 'nosign_pdf', 'Quote.pdf')
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            output_filename = f"quote_{quote.id.hex[:8]}_{timestamp}.pdf"
-            output_path = os.path.join(settings.BASE_DIR, 'documents', 'templates', 'nosign_out', output_filename)
-            
-            # Generate the PDF
-            success = populate_quote_pdf(template_path, output_path, quote_data)
-            
-            if success:
-                # Create Document record for tracking
-                from .models import Document
-                document = Document.objects.create(
-                    filename=output_filename,
-                    file_path=output_path,
-                    document_type='quote',
-                    created_by=request.user if request.user.is_authenticated else None
-                )
-                
-                # Link document to trip that references this quote
-                try:
-                    trip = Trip.objects.get(quote_id=quote.id)
-                    document.trip = trip
-                    document.save()
-                except Trip.DoesNotExist:
-                    # No trip associated with this quote yet
-                    pass
-                
-                return Response({
-                    'success': True,
-                    'message': 'Quote document generated successfully',
-                    'filename': output_filename,
-                    'path': output_path,
-                    'document_id': str(document.id)
-                }, status=status.HTTP_201_CREATED)
-            else:
-                return Response({
-                    'success': False,
-                    'message': 'Failed to generate quote document'
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-                
+            document = quote_document(quote, 'form', created_by=request.user if request.user.is_authenticated else None)
         except Exception as e:
             return Response({
                 'success': False,
                 'message': f'Error generating quote document: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        return Response({
+            'success': True,
+            'message': 'Quote document generated successfully',
+            'filename': document.filename,
+            'path': document.storage_key,
+            'document_id': str(document.id)
+        }, status=status.HTTP_201_CREATED)
 
     @action(detail=True, methods=['post'])
     def email(self, request, pk=None):
         """
-        Email a quote with automatically generated PDF document and clean email content
+        Queue an email of the quote with an automatically generated PDF document.
+
+        Returns 202 with the job to poll; the PDF is generated and the email
+        sent by the background workers.
         """
         from .serializers import EmailQuoteSerializer
-        from utils.smtp.email import send_template
-        from django.conf import settings
-        import logging
-        import os
-        from datetime import datetime
-        from documents.templates.docs import populate_quote_pdf, QuoteData
+        from .jobs import enqueue
 
-        logger = logging.getLogger(__name__)
         quote = self.get_object()
 
         # Validate request data
@@ -1133,111 +1084,19 @@ class QuoteViewSet(BaseViewSet):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         data = serializer.validated_data
-        email = data['email']
-        subject = data['subject']
-        message = data['message']
-
-        try:
-            # Generate quote document first (using existing logic)
-            logger.info(f"Generating quote document for {quote.id}")
-
-            # Prepare data for the quote document
-            quote_data = QuoteData(
-                quote_id=str(quote.id.hex[:8].upper()),
-                inquiry_date=quote.inquiry_date.strftime('%Y-%m-%d') if quote.inquiry_date else '',
-                patient_name=f"{quote.patient.info.first_name} {quote.patient.info.last_name}" if quote.patient and quote.patient.info else '',
-                aircraft_type=str(quote.aircraft_type) if quote.aircraft_type else '',
-                pickup_airport=f"{quote.pickup_airport.name} ({quote.pickup_airport.ident})" if quote.pickup_airport else '',
-                dropoff_airport=f"{quote.dropoff_airport.name} ({quote.dropoff_airport.ident})" if quote.dropoff_airport else '',
-                trip_date=quote.created_on.strftime('%Y-%m-%d') if quote.created_on else '',
-                esitmated_flight_time=str(quote.estimated_flight_time) if quote.estimated_flight_time else '',
-                number_of_stops=str(quote.number_of_stops),
-                medical_team=quote.medical_team if quote.medical_team else '',
-                include_grounds='Yes' if quote.includes_grounds else 'No',
-                our_availability='Available',
-                amount=f"${quote.quoted_amount:,.2f}" if quote.quoted_amount else '',
-                notes=f"Quote generated on {datetime.now().strftime('%Y-%m-%d')}"
-            )
-
-            # Generate PDF and save as document
-            template_base_path = os.path.join(settings.BASE_DIR, 'documents', 'templates', 'nosign_pdf')
-            output_base_path = os.path.join(settings.BASE_DIR, 'documents', 'generated')
-            os.makedirs(output_base_path, exist_ok=True)
-
-            # Create unique filename
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            output_filename = f"quote_{quote.id.hex[:8]}_{timestamp}.pdf"
-            input_path = os.path.join(template_base_path, 'Quote.pdf')
-            output_path = os.path.join(output_base_path, output_filename)
-
-            # Generate the PDF
-            if populate_quote_pdf(input_path, output_path, quote_data):
-                # Create Document record
-                document = Document.objects.create(
-                    filename=output_filename,
-                    file_path=output_path,
-                    document_type='quote',
-                    created_by=request.user
-                )
-
-                # Get public download URL for document access (no authentication required)
-                backend_url = getattr(settings, 'BACKEND_URL', 'http://localhost:8001')
-                document_url = f"{backend_url}/api/documents/{document.id}/public_download/"
-
-                # Build clean email content (without quote details)
-                email_content = f"""
-                {message}
-
-                Please click the button below to view your quote document.
-
-                Best regards,
-                JET ICU Medical Transport Team
-                Phone: (352) 796-2540
-                Email: info@jeticu.com
-                """
-
-                # Send email with "Download Quote PDF" button
-                success = send_template(
-                    subject=subject,
-                    targets=[email],
-                    title=email_content,
-                    link=document_url,
-                    link_text="Download Quote PDF"
-                )
-
-                if success:
-                    # Update quote with sent email info
-                    quote.quote_pdf_email = email
-                    quote.save()
-
-                    logger.info(f"Quote #{str(quote.id)[:8]} with document emailed successfully to {email}")
-
-                    return Response({
-                        'success': True,
-                        'message': f'Quote with PDF document emailed successfully to {email}',
-                        'document_id': str(document.id),
-                        'document_url': document_url
-                    })
-                else:
-                    logger.error(f"Failed to send quote #{str(quote.id)[:8]} to {email}")
-                    return Response({
-                        'success': False,
-                        'message': 'Failed to send email. Please check your email configuration.'
-                    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-            else:
-                logger.error(f"Failed to generate quote document for {quote.id}")
-                return Response({
-                    'success': False,
-                    'message': 'Failed to generate quote document'
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        job = enqueue('quotes.email', {
+            'quote_id': str(quote.id),
+            'email': data['email'],
+            'subject': data['subject'],
+            'message': data['message'],
+            'user_id': request.user.id,
+        }, created_by=request.user)
 
-        except Exception as e:
-            logger.error(f"Error emailing quote #{str(quote.id)[:8]}: {str(e)}")
-            return Response({
-                'success': False,
-                'message': f'Error sending email: {str(e)}'
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response({
+            'success': True,
+            'message': f"Quote email to {data['email']} queued",
+            'job': JobSerializer(job).data
+        }, status=status.HTTP_202_ACCEPTED)
 
 # Passenger ViewSet
 class PassengerViewSet(BaseViewSet):
@@ -1369,6 +1228,8 @@ class TripViewSet(BaseViewSet):
             permission_classes = [permissions.IsAuthenticated, CanWriteTrip]
         elif self.action in ['update', 'partial_update', 'generate_itineraries', 'generate_handling_requests', 'generate_gen_dec']:
             permission_classes = [permissions.IsAuthenticated, CanModifyTrip]
+        elif self.action == 'plan_trip_lines':
+            permission_classes = [permissions.IsAuthenticated, CanModifyTrip, CanWriteTripLine]
         elif self.action == 'destroy':
             permission_classes = [permissions.IsAuthenticated, CanDeleteTrip]
         else:
@@ -1381,147 +1242,61 @@ class TripViewSet(BaseViewSet):
         Generate itinerary documents - one per crew line in the trip
         """
         import os
-        from datetime import datetime
         from django.conf import settings
-        from documents.templates.docs import populate_itinerary_pdf, ItineraryData, CrewInfo, FlightLeg, AirportInfo, TimeInfo
+        from documents.templates.docs import populate_itinerary_pdf
         
+        from .document_rendering import RenderTask, render_documents
+        from .trip_documents import TripDocumentContext
+
         trip = self.get_object()
-        generated_files = []
         
         try:
-            # Get all crew lines for this trip
-            crew_lines = CrewLine.objects.filter(trip_lines__trip=trip).distinct()
+            # Load the trip graph once; every crew line's itinerary is built from it
+            context = TripDocumentContext.load(trip)
             
-            if not crew_lines.exists():
+            if not context.crew_lines:
                 return Response({
                     'success': False,
                     'message': 'No crew lines found for this trip'
                 }, status=status.HTTP_400_BAD_REQUEST)
+
+            template_path = os.path.join(settings.BASE_DIR, 'documents', 'templates', 'nosign_pdf', 'itin-2.pdf')
+            output_dir = os.path.join(settings.BASE_DIR, 'documents', 'templates', 'nosign_out')
+            tasks = []
             
-            for crew_line in crew_lines:
-                # Prepare crew info
-                crew_info = CrewInfo(
-                    pic=f"{crew_line.primary_in_command.first_name} {crew_line.primary_in_command.last_name}" if crew_line.primary_in_command else '',
-                    sic=f"{crew_line.secondary_in_command.first_name} {crew_line.secondary_in_command.last_name}" if crew_line.secondary_in_command else ''
-                )
+            for crew_line in context.crew_lines:
+                itinerary_data = context.itinerary_data(crew_line)
                 
-                # Add medical crew members
-                medics = list(crew_line.medic_ids.all())
-                if len(medics) > 0:
-                    crew_info.med_1 = f"{medics[0].first_name} {medics[0].last_name}"
-                if len(medics) > 1:
-                    crew_info.med_2 = f"{medics[1].first_name} {medics[1].last_name}"
-                if len(medics) > 2:
-                    crew_info.med_4 = f"{medics[2].first_name} {medics[2].last_name}"
-                
-                # Prepare flight legs
-                flight_legs = []
-                trip_lines = trip.trip_lines.filter(crew_line=crew_line).order_by('departure_time_utc')
-                
-                for i, trip_line in enumerate(trip_lines, 1):
-                    leg = FlightLeg(
-                        leg=str(i),
-                        departure_id=trip_line.origin_airport.ident if trip_line.origin_airport else '',
-                        edt_utc_local=trip_line.departure_time_local.strftime('%H:%M %Z') if trip_line.departure_time_local else '',
-                        arrival_id=trip_line.destination_airport.ident if trip_line.destination_airport else '',
-                        flight_time=str(trip_line.flight_time) if trip_line.flight_time else '',
-                        eta_utc_local=trip_line.arrival_time_local.strftime('%H:%M %Z') if trip_line.arrival_time_local else '',
-                        ground_time=str(trip_line.ground_time) if trip_line.ground_time else '',
-                        pax_leg='Yes' if trip_line.passenger_leg else 'No'
-                    )
-                    flight_legs.append(leg)
-                
-                # Prepare airport info
-                airports = []
-                all_airports = set()
-                for trip_line in trip_lines:
-                    all_airports.add(trip_line.origin_airport)
-                    all_airports.add(trip_line.destination_airport)
-                
-                for airport in all_airports:
-                    if airport:
-                        airport_info = AirportInfo(
-                            icao=airport.icao_code or airport.ident,
-                            airport_city_name=airport.name,
-                            state_country=f"{airport.iso_region}, {airport.iso_country}",
-                            time_zone=getattr(airport, 'timezone', ''),
-                            fbo_handler='',  # Will be populated from FBO data if available
-                            freq='',
-                            phone_fax='',
-                            fuel=''
-                        )
-                        airports.append(airport_info)
-                
-                # Prepare timing info
-                times = TimeInfo(
-                    showtime='',
-                    origin_edt=trip.estimated_departure_time.strftime('%H:%M %Z') if trip.estimated_departure_time else '',
-                    total_flight_time='',
-                    total_duty_time='',
-                    pre_flight_duty_time=str(trip.pre_flight_duty_time) if trip.pre_flight_duty_time else '',
-                    post_flight_duty_time=str(trip.post_flight_duty_time) if trip.post_flight_duty_time else ''
-                )
-                
-                # Prepare passenger list
-                passengers = []
-                for passenger in trip.passengers.all():
-                    if passenger.info:
-                        passengers.append(f"{passenger.info.first_name} {passenger.info.last_name}")
-                
-                # Create itinerary data
-                itinerary_data = ItineraryData(
-                    trip_number=trip.trip_number or '',
-                    tail_number=trip.aircraft.tail_number if trip.aircraft else '',
-                    trip_date=trip.trip_lines.first().departure_time_local.strftime('%Y-%m-%d') if trip.trip_lines.exists() and trip.trip_lines.first().departure_time_local else '',
-                    trip_type=trip.type.title() if trip.type else 'Charter',
-                    patient_name=f"{trip.patient.info.first_name} {trip.patient.info.last_name}" if trip.patient and trip.patient.info else '',
-                    bed_at_origin=trip.patient.bed_at_origin if trip.patient else False,
-                    bed_at_dest=trip.patient.bed_at_destination if trip.patient else False,
-                    special_instructions=trip.patient.special_instructions if trip.patient else trip.notes or '',
-                    passengers=passengers,
-                    crew=crew_info,
-                    flight_legs=flight_legs,
-                    airports=airports,
-                    times=times
-                )
-                
-                # Define file paths
-                template_path = os.path.join(settings.BASE_DIR, 'documents', 'templates', 'nosign_pdf', 'itin-2.pdf')
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                output_filename = f"itin_{trip.trip_number}_crew_{crew_line.id.hex[:8]}_{timestamp}.pdf"
-                output_path = os.path.join(settings.BASE_DIR, 'documents', 'templates', 'nosign_out', output_filename)
-                
-                # Generate the PDF
-                success = populate_itinerary_pdf(template_path, output_path, itinerary_data)
-                
-                if success:
-                    # Create Document record for tracking
-                    from .models import Document
-                    document = Document.objects.create(
-                        filename=output_filename,
-                        file_path=output_path,
-                        document_type='customer_itinerary',
-                        trip=trip,
-                        created_by=request.user if request.user.is_authenticated else None
-                    )
-                    
-                    generated_files.append({
-                        'crew_line_id': str(crew_line.id),
-                        'filename': output_filename,
-                        'path': output_path,
-                        'document_id': str(document.id)
-                    })
-                else:
-                    return Response({
-                        'success': False,
-                        'message': f'Failed to generate itinerary for crew line {crew_line.id}'
-                    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                tasks.append(RenderTask(
+                    populate=populate_itinerary_pdf,
+                    template_path=template_path,
+                    output_dir=output_dir,
+                    name=f"itin_{trip.trip_number}_crew_{crew_line.id.hex[:8]}",
+                    data=itinerary_data,
+                    document_type='customer_itinerary',
+                    meta={'crew_line_id': str(crew_line.id)}
+                ))
+
+            # Reuse unchanged itineraries and render the rest in parallel; keep none unless all succeed
+            results = render_documents(tasks, trip=trip, created_by=request.user if request.user.is_authenticated else None, atomic=True)
+            failed = next((result for result in results if not result.success), None)
+            if failed:
+                return Response({
+                    'success': False,
+                    'message': f"Failed to generate itinerary for crew line {failed.task.meta['crew_line_id']}"
+                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+            generated_files = [
+                {**result.task.meta, 'filename': result.document.filename, 'path': result.document.storage_key or result.document.file_path,
+                 'document_id': str(result.document.id), 'reused': result.reused}
+                for result in results
+            ]
             
             return Response({
                 'success': True,
                 'message': f'Generated {len(generated_files)} itinerary documents',
                 'files': generated_files
-            }, status=status.HTTP_201_CREATED)
+            }, status=status.HTTP_201_CREATED if any(not result.reused for result in results) else status.HTTP_200_OK)
             
         except Exception as e:
             return Response({
@@ -1535,114 +1310,65 @@ class TripViewSet(BaseViewSet):
         Generate handling request documents - one per trip leg with FBO info from arriving airport
         """
         import os
-        from datetime import datetime
         from django.conf import settings
-        from documents.templates.docs import populate_handling_request_pdf, HandlingRequestData, PassengerInfo
+        from documents.templates.docs import populate_handling_request_pdf
         
+        from .document_rendering import RenderTask, render_documents
+        from .trip_documents import TripDocumentContext
+
         trip = self.get_object()
-        generated_files = []
         
         try:
-            # Get all trip lines for this trip
-            trip_lines = trip.trip_lines.all().order_by('departure_time_utc')
+            # Load the trip graph once; every leg's request is built from it
+            context = TripDocumentContext.load(trip)
             
-            if not trip_lines.exists():
+            if not context.trip_lines:
                 return Response({
                     'success': False,
                     'message': 'No trip lines found for this trip'
                 }, status=status.HTTP_400_BAD_REQUEST)
+
+            template_path = os.path.join(settings.BASE_DIR, 'documents', 'templates', 'nosign_pdf', 'handling_request.pdf')
+            output_dir = os.path.join(settings.BASE_DIR, 'documents', 'templates', 'nosign_out')
+            tasks = []
             
-            for trip_line in trip_lines:
-                # Prepare aircraft data
-                aircraft = trip.aircraft
-                handling_data = HandlingRequestData(
-                    company='JET Aviation Operations',
-                    make=aircraft.make if aircraft else '',
-                    model=aircraft.model if aircraft else '',
-                    tail_number=aircraft.tail_number if aircraft else '',
-                    serial_number=getattr(aircraft, 'serial_number', '') or '',
-                    mgtow=str(getattr(aircraft, 'mgtow', '')) or '',
-                    mission=trip.type.title() if trip.type else 'Charter',
-                    depart_origin=trip_line.departure_time_local.strftime('%H:%M') if trip_line.departure_time_local else '',
-                    arrive_dest=trip_line.arrival_time_local.strftime('%H:%M') if trip_line.arrival_time_local else '',
-                    depart_dest='',  # For return legs - would need return trip line data
-                    arrive_origin=''  # For return legs - would need return trip line data
-                )
-                
-                # Prepare passenger information
-                passengers = []
-                for passenger in trip.passengers.all():
-                    if passenger.info:
-                        passenger_info = PassengerInfo(
-                            name=f"{passenger.info.first_name} {passenger.info.last_name}",
-                            title='',
-                            nationality=getattr(passenger.info, 'nationality', '') or '',
-                            date_of_birth=passenger.info.date_of_birth.strftime('%Y-%m-%d') if passenger.info.date_of_birth else '',
-                            passport_number=getattr(passenger.info, 'passport_number', '') or '',
-                            passport_expiration='',  # Would need passport expiration field
-                            contact_number=passenger.info.phone or ''
-                        )
-                        passengers.append(passenger_info)
+            for trip_line in context.trip_lines:
+                handling_data = context.handling_request_data(trip_line)
                 
-                # Add patient if exists and not already in passengers
-                if trip.patient and trip.patient.info:
-                    patient_already_added = any(
-                        p.name == f"{trip.patient.info.first_name} {trip.patient.info.last_name}" 
-                        for p in passengers
-                    )
-                    if not patient_already_added:
-                        patient_info = PassengerInfo(
-                            name=f"{trip.patient.info.first_name} {trip.patient.info.last_name}",
-                            title='Patient',
-                            nationality=getattr(trip.patient, 'nationality', ''),
-                            date_of_birth=trip.patient.info.date_of_birth.strftime('%Y-%m-%d') if hasattr(trip.patient.info, 'date_of_birth') and trip.patient.info.date_of_birth else '',
-                            passport_number='',
-                            passport_expiration='',
-                            contact_number=''
-                        )
-                        passengers.append(patient_info)
-                
-                handling_data.passengers = passengers
-                
-                # Define file paths
-                template_path = os.path.join(settings.BASE_DIR, 'documents', 'templates', 'nosign_pdf', 'handling_request.pdf')
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                output_filename = f"handling_{trip.trip_number}_leg_{trip_line.id.hex[:8]}_{timestamp}.pdf"
-                output_path = os.path.join(settings.BASE_DIR, 'documents', 'templates', 'nosign_out', output_filename)
-                
-                # Generate the PDF
-                success = populate_handling_request_pdf(template_path, output_path, handling_data)
-                
-                if success:
-                    # Create Document record for tracking
-                    from .models import Document
-                    document = Document.objects.create(
-                        filename=output_filename,
-                        file_path=output_path,
-                        document_type='handling_request',
-                        trip=trip,
-                        created_by=request.user if request.user.is_authenticated else None
-                    )
-                    
-                    generated_files.append({
+                tasks.append(RenderTask(
+                    populate=populate_handling_request_pdf,
+                    template_path=template_path,
+                    output_dir=output_dir,
+                    name=f"handling_{trip.trip_number}_leg_{trip_line.id.hex[:8]}",
+                    data=handling_data,
+                    document_type='handling_request',
+                    meta={
                         'trip_line_id': str(trip_line.id),
                         'arrival_airport': trip_line.destination_airport.name if trip_line.destination_airport else '',
                         'arrival_fbo': trip_line.arrival_fbo.name if trip_line.arrival_fbo else 'N/A',
-                        'filename': output_filename,
-                        'path': output_path,
-                        'document_id': str(document.id)
-                    })
-                else:
-                    return Response({
-                        'success': False,
-                        'message': f'Failed to generate handling request for trip line {trip_line.id}'
-                    }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                    }
+                ))
+
+            # Reuse unchanged requests and render the rest in parallel; keep none unless all succeed
+            results = render_documents(tasks, trip=trip, created_by=request.user if request.user.is_authenticated else None, atomic=True)
+            failed = next((result for result in results if not result.success), None)
+            if failed:
+                return Response({
+                    'success': False,
+                    'message': f"Failed to generate handling request for trip line {failed.task.meta['trip_line_id']}"
+                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+            generated_files = [
+                {**result.task.meta, 'filename': result.document.filename, 'path': result.document.storage_key or result.document.file_path,
+                 'document_id': str(result.document.id), 'reused': result.reused}
+                for result in results
+            ]
             
             return Response({
                 'success': True,
                 'message': f'Generated {len(generated_files)} handling request documents',
                 'files': generated_files
-            }, status=status.HTTP_201_CREATED)
+            }, status=status.HTTP_201_CREATED if any(not result.reused for result in results) else status.HTTP_200_OK)
             
         except Exception as e:
             return Response({
@@ -1657,24 +1383,26 @@ class TripViewSet(BaseViewSet):
         Uses enhanced gen_dec.py module with proper member titles (PIC, SIC, MED, PAX)
         """
         import os
-        from datetime import datetime
         from django.conf import settings
-        from documents.templates.gen_dec import populate_gen_dec_pdf_enhanced, create_gen_dec_data_from_trip
+        from documents.templates.gen_dec import populate_gen_dec_pdf_enhanced
         
+        from .document_rendering import RenderTask, render_documents
+        from .trip_documents import TripDocumentContext
+
         trip = self.get_object()
         
         try:
-            # Check if trip has required data
-            first_trip_line = trip.trip_lines.first()
+            context = TripDocumentContext.load(trip)
             
-            if not first_trip_line:
+            # Check if trip has required data
+            if not context.trip_lines:
                 return Response({
                     'success': False,
                     'message': 'No trip lines found for this trip'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
             # Create enhanced gen dec data with proper member titles
-            gen_dec_data = create_gen_dec_data_from_trip(trip)
+            gen_dec_data = context.gen_dec_data()
             
             if gen_dec_data.total_occupants == 0:
                 return Response({
@@ -1682,25 +1410,20 @@ class TripViewSet(BaseViewSet):
                     'message': 'No occupants found for this trip'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Define file paths
-            template_path = os.path.join(settings.BASE_DIR, 'documents', 'templates', 'nosign_pdf', 'gen_dec.pdf')
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            output_filename = f"gen_dec_{trip.trip_number}_{timestamp}.pdf"
-            output_path = os.path.join(settings.BASE_DIR, 'documents', 'templates', 'nosign_out', output_filename)
+            task = RenderTask(
+                populate=populate_gen_dec_pdf_enhanced,
+                template_path=os.path.join(settings.BASE_DIR, 'documents', 'templates', 'nosign_pdf', 'gen_dec.pdf'),
+                output_dir=os.path.join(settings.BASE_DIR, 'documents', 'templates', 'nosign_out'),
+                name=f"gen_dec_{trip.trip_number}",
+                data=gen_dec_data,
+                document_type='gendec'
+            )
             
-            # Generate the PDF using enhanced function
-            success = populate_gen_dec_pdf_enhanced(template_path, output_path, gen_dec_data)
+            # Generate the PDF using enhanced function, unless this declaration was already generated
+            result, = render_documents([task], trip=trip, created_by=request.user if request.user.is_authenticated else None)
             
-            if success:
-                # Create Document record for tracking
-                from .models import Document
-                document = Document.objects.create(
-                    filename=output_filename,
-                    file_path=output_path,
-                    document_type='gendec',
-                    trip=trip,
-                    created_by=request.user if request.user.is_authenticated else None
-                )
+            if result.success:
+                document = result.document
                 
                 # Create detailed occupant list with proper titles
                 occupant_details = [str(member) for member in gen_dec_data.members]
@@ -1709,9 +1432,10 @@ class TripViewSet(BaseViewSet):
                     'success': True,
                     'message': 'General declaration document generated successfully',
                     'file': {
-                        'filename': output_filename,
-                        'path': output_path,
+                        'filename': document.filename,
+                        'path': document.storage_key or document.file_path,
                         'document_id': str(document.id),
+                        'reused': result.reused,
                         'total_occupants': gen_dec_data.total_occupants,
                         'occupant_breakdown': {
                             'PIC': gen_dec_data.pic_count,
@@ -1721,7 +1445,7 @@ class TripViewSet(BaseViewSet):
                         },
                         'occupant_details': occupant_details
                     }
-                }, status=status.HTTP_201_CREATED)
+                }, status=status.HTTP_200_OK if result.reused else status.HTTP_201_CREATED)
             else:
                 return Response({
                     'success': False,
@@ -1741,6 +1465,63 @@ class TripViewSet(BaseViewSet):
         serializer = TripLineReadSerializer(trip_lines, many=True)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['post'])
+    def plan_trip_lines(self, request, pk=None):
+        """
+        Plan fuel stops between two airports and create one TripLine per resulting leg.
+
+        Accepts the same body as /airports/plan_route/ plus departure_time_utc,
+        crew_line and passenger_leg. The aircraft type defaults to the trip's quote.
+        """
+        from datetime import timedelta
+        from django.db import transaction as db_transaction
+        from .serializers import TripRoutePlanSerializer
+        from .timezone_utils import convert_utc_to_local
+
+        trip = self.get_object()
+        serializer = TripRoutePlanSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+
+        default_aircraft_type = trip.quote.aircraft_type if trip.quote else '35'
+        try:
+            plan, profile = plan_route_from_request(data, default_aircraft_type=default_aircraft_type)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        airports = Airport.objects.in_bulk(plan.airport_ids)
+        fuel_stop_time = timedelta(minutes=profile.fuel_stop_minutes)
+        departure_utc = data['departure_time_utc']
+        created = []
+
+        with db_transaction.atomic():
+            for i, leg in enumerate(plan.legs):
+                origin = airports[leg.origin_id]
+                flight_time = timedelta(minutes=round(leg.flight_minutes))
+                is_last = i == len(plan.legs) - 1
+                line_serializer = TripLineWriteSerializer(data={
+                    'trip': trip.id,
+                    'origin_airport': leg.origin_id,
+                    'destination_airport': leg.destination_id,
+                    'crew_line': data['crew_line'].id if data.get('crew_line') else None,
+                    'departure_time_utc': departure_utc,
+                    'departure_time_local': convert_utc_to_local(departure_utc, origin.timezone),
+                    'flight_time': flight_time,
+                    'ground_time': timedelta(0) if is_last else fuel_stop_time,
+                    'passenger_leg': data['passenger_leg'],
+                })
+                line_serializer.is_valid(raise_exception=True)
+                trip_line = line_serializer.save(created_by=request.user)
+                track_creation(trip_line, request.user)
+                created.append(trip_line)
+                departure_utc = departure_utc + flight_time + fuel_stop_time
+
+        return Response({
+            'plan': serialize_route_plan(plan, profile),
+            'trip_lines': TripLineReadSerializer(created, many=True).data,
+        }, status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=['get'])
     def timeline(self, request, pk=None):
         trip = self.get_object()
@@ -1841,12 +1622,11 @@ class TripViewSet(BaseViewSet):
         Generate PDF documents for a trip using PDF templates.
         Accepts optional 'document_type' in request body to generate specific document.
         If no document_type provided, generates all applicable documents.
+        Documents already pre-generated for the trip's current state are returned as they are.
         """
-        import os
-        from datetime import datetime
-        from django.conf import settings
-        from documents.templates.docs import populate_quote_pdf, QuoteData, populate_itinerary_pdf, ItineraryData, CrewInfo, FlightLeg, AirportInfo, TimeInfo, populate_handling_request_pdf, HandlingRequestData, PassengerInfo
         from .serializers import DocumentSerializer, DocumentCreateSerializer
+        from .document_pregeneration import generate_packet
+        from .trip_documents import PACKET_DOCUMENT_TYPES
         
         trip = self.get_object()
         
@@ -1857,44 +1637,24 @@ class TripViewSet(BaseViewSet):
         document_type = serializer.validated_data.get('document_type')
         
         try:
-            generated_documents = []
-            
-            # Define base paths
-            template_base_path = os.path.join(settings.BASE_DIR, 'documents', 'templates', 'nosign_pdf')
-            output_base_path = os.path.join(settings.BASE_DIR, 'documents', 'generated')
-            
-            # Ensure output directory exists
-            os.makedirs(output_base_path, exist_ok=True)
-            
-            # Available document generators
-            document_generators = {
-                'gendec': self._generate_gendec_pdf,
-                'quote': self._generate_quote_pdf,
-                'customer_itinerary': lambda trip, template_path, output_path: self._generate_itinerary_pdf(trip, template_path, output_path, 'customer_itinerary'),
-                'internal_itinerary': lambda trip, template_path, output_path: self._generate_itinerary_pdf(trip, template_path, output_path, 'internal_itinerary'),
-                'handling_request': self._generate_handling_request_pdf,
-            }
-            
             if document_type:
                 # Generate specific document type
-                if document_type in document_generators:
-                    doc = document_generators[document_type](trip, template_base_path, output_base_path)
-                    if doc:
-                        generated_documents.append(doc)
-                else:
+                if document_type not in PACKET_DOCUMENT_TYPES:
                     return Response({
                         'error': f'Document type {document_type} not supported'
                     }, status=status.HTTP_400_BAD_REQUEST)
+                doc_types = [document_type]
             else:
                 # Generate all applicable documents
-                for doc_type in ['quote', 'customer_itinerary', 'handling_request', 'gendec', 'internal_itinerary']:
-                    try:
-                        doc = document_generators[doc_type](trip, template_base_path, output_base_path)
-                        if doc:
-                            generated_documents.append(doc)
-                    except Exception as e:
-                        print(f"Error generating {doc_type}: {e}")
-                        continue
+                doc_types = PACKET_DOCUMENT_TYPES
+            
+            # Render only the types that are stale; the rest were pre-generated in the background
+            documents, errors = generate_packet(
+                trip, doc_types, created_by=request.user if request.user.is_authenticated else None
+            )
+            for doc_type, error in errors.items():
+                print(f"Error generating {doc_type}: {error}")
+            generated_documents = [document for type_documents in documents.values() for document in type_documents]
             
             return Response({
                 'message': f'{len(generated_documents)} documents generated successfully',
@@ -1906,218 +1666,6 @@ class TripViewSet(BaseViewSet):
                 'error': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
-    def _generate_quote_pdf(self, trip, template_base_path, output_base_path):
-        """Generate quote PDF document"""
-        try:
-            import os
-            from datetime import datetime
-            import uuid
-            
-            # Create filename
-            timestamp = datetime.now().strftime('%Y%m%d')
-            unique_id = str(uuid.uuid4())[:8]
-            filename = f"{trip.trip_number}-quote-{timestamp}-{unique_id}.pdf"
-            
-            # Input and output paths
-            input_path = os.path.join(template_base_path, 'Quote.pdf')
-            output_path = os.path.join(output_base_path, filename)
-            
-            if not os.path.exists(input_path):
-                print(f"Quote template not found: {input_path}")
-                return None
-            
-            # Prepare quote data
-            from documents.templates.docs import QuoteData, populate_quote_pdf
-            
-            quote_data = QuoteData(
-                quote_id=str(trip.quote.id) if trip.quote else '',
-                inquiry_date=trip.quote.created_on.strftime('%Y-%m-%d') if trip.quote else '',
-                patient_name=f"{trip.patient.info.first_name} {trip.patient.info.last_name}" if trip.patient and trip.patient.info else '',
-                aircraft_type=trip.aircraft.make + ' ' + trip.aircraft.model if trip.aircraft else '',
-                pickup_airport=trip.trip_lines.first().origin_airport.name if trip.trip_lines.exists() else '',
-                dropoff_airport=trip.trip_lines.last().destination_airport.name if trip.trip_lines.exists() else '',
-                trip_date=trip.trip_lines.first().departure_time_local.strftime('%Y-%m-%d') if trip.trip_lines.exists() and trip.trip_lines.first().departure_time_local else '',
-                esitmated_flight_time=str(trip.quote.estimated_flight_time) if trip.quote and trip.quote.estimated_flight_time else '',
-                medical_team=trip.quote.medical_team if trip.quote else '',
-                amount=str(trip.quote.quoted_amount) if trip.quote and trip.quote.quoted_amount else '',
-                notes=trip.notes or ''
-            )
-            
-            # Generate PDF
-            success = populate_quote_pdf(input_path, output_path, quote_data)
-            
-            if success:
-                # Create document record
-                document = Document.objects.create(
-                    trip=trip,
-                    document_type='quote',
-                    filename=filename,
-                    file_path=output_path,
-                    created_by=self.request.user if hasattr(self.request, 'user') else None
-                )
-                return document
-            return None
-            
-        except Exception as e:
-            print(f"Error generating quote PDF: {e}")
-            return None
-    
-    def _generate_itinerary_pdf(self, trip, template_base_path, output_base_path, doc_type='customer_itinerary'):
-        """Generate itinerary PDF document"""
-        try:
-            import os
-            from datetime import datetime
-            import uuid
-            
-            # Create filename
-            timestamp = datetime.now().strftime('%Y%m%d')
-            unique_id = str(uuid.uuid4())[:8]
-            filename = f"{trip.trip_number}-{doc_type.replace('_', '_')}-{timestamp}-{unique_id}.pdf"
-            
-            # Input and output paths
-            input_path = os.path.join(template_base_path, 'itin.pdf')
-            output_path = os.path.join(output_base_path, filename)
-            
-            if not os.path.exists(input_path):
-                print(f"Itinerary template not found: {input_path}")
-                return None
-            
-            # Prepare itinerary data
-            from documents.templates.docs import ItineraryData, CrewInfo, FlightLeg, AirportInfo, TimeInfo, populate_itinerary_pdf
-            
-            # Create crew info
-            crew_lines = CrewLine.objects.filter(trip_lines__trip=trip).distinct()
-            crew_info = CrewInfo()
-            if crew_lines.exists():
-                crew_line = crew_lines.first()
-                if crew_line.primary_in_command:
-                    crew_info.pic = f"{crew_line.primary_in_command.first_name} {crew_line.primary_in_command.last_name}"
-                if crew_line.secondary_in_command:
-                    crew_info.sic = f"{crew_line.secondary_in_command.first_name} {crew_line.secondary_in_command.last_name}"
-            
-            # Create flight legs
-            flight_legs = []
-            for i, trip_line in enumerate(trip.trip_lines.all(), 1):
-                leg = FlightLeg(
-                    leg=str(i),
-                    departure_id=trip_line.origin_airport.ident if trip_line.origin_airport else '',
-                    arrival_id=trip_line.destination_airport.ident if trip_line.destination_airport else '',
-                    flight_time=str(trip_line.flight_time) if trip_line.flight_time else '',
-                    pax_leg='Yes' if trip_line.passenger_leg else 'No'
-                )
-                flight_legs.append(leg)
-            
-            # Prepare passenger list
-            passengers = []
-            for passenger in trip.passengers.all():
-                if passenger.info:
-                    passengers.append(f"{passenger.info.first_name} {passenger.info.last_name}")
-            
-            itinerary_data = ItineraryData(
-                trip_number=trip.trip_number or '',
-                patient_name=f"{trip.patient.info.first_name} {trip.patient.info.last_name}" if trip.patient and trip.patient.info else '',
-                passengers=passengers,
-                crew=crew_info,
-                flight_legs=flight_legs
-            )
-            
-            # Generate PDF
-            success = populate_itinerary_pdf(input_path, output_path, itinerary_data)
-            
-            if success:
-                # Create document record
-                document = Document.objects.create(
-                    trip=trip,
-                    document_type=doc_type,
-                    filename=filename,
-                    file_path=output_path,
-                    created_by=self.request.user if hasattr(self.request, 'user') else None
-                )
-                return document
-            return None
-            
-        except Exception as e:
-            print(f"Error generating itinerary PDF: {e}")
-            return None
-    
-    def _generate_handling_request_pdf(self, trip, template_base_path, output_base_path):
-        """Generate handling request PDF document"""
-        try:
-            import os
-            from datetime import datetime
-            import uuid
-            
-            # Create filename
-            timestamp = datetime.now().strftime('%Y%m%d')
-            unique_id = str(uuid.uuid4())[:8]
-            filename = f"{trip.trip_number}-handling_request-{timestamp}-{unique_id}.pdf"
-            
-            # Input and output paths
-            input_path = os.path.join(template_base_path, 'handling_request.pdf')
-            output_path = os.path.join(output_base_path, filename)
-            
-            if not os.path.exists(input_path):
-                print(f"Handling request template not found: {input_path}")
-                return None
-            
-            # Prepare handling request data
-            from documents.templates.docs import HandlingRequestData, PassengerInfo, populate_handling_request_pdf
-            
-            # Prepare passenger info
-            passengers = []
-            for passenger in trip.passengers.all():
-                if passenger.info:
-                    pax_info = PassengerInfo(
-                        name=f"{passenger.info.first_name} {passenger.info.last_name}",
-                        nationality=passenger.info.nationality or '',
-                        date_of_birth=passenger.info.date_of_birth.strftime('%Y-%m-%d') if passenger.info.date_of_birth else '',
-                        passport_number=passenger.info.passport_number or '',
-                        passport_expiration=passenger.info.passport_expiration_date.strftime('%Y-%m-%d') if passenger.info.passport_expiration_date else '',
-                        contact_number=passenger.info.phone or ''
-                    )
-                    passengers.append(pax_info)
-            
-            handling_data = HandlingRequestData(
-                company=trip.aircraft.company if trip.aircraft else 'JET ICU Medical Transport',
-                make=trip.aircraft.make if trip.aircraft else '',
-                model=trip.aircraft.model if trip.aircraft else '',
-                tail_number=trip.aircraft.tail_number if trip.aircraft else '',
-                serial_number=trip.aircraft.serial_number if trip.aircraft else '',
-                mgtow=str(trip.aircraft.mgtow) if trip.aircraft and trip.aircraft.mgtow else '',
-                passengers=passengers
-            )
-            
-            # Generate PDF
-            success = populate_handling_request_pdf(input_path, output_path, handling_data)
-            
-            if success:
-                # Create document record
-                document = Document.objects.create(
-                    trip=trip,
-                    document_type='handling_request',
-                    filename=filename,
-                    file_path=output_path,
-                    created_by=self.request.user if hasattr(self.request, 'user') else None
-                )
-                return document
-            return None
-            
-        except Exception as e:
-            print(f"Error generating handling request PDF: {e}")
-            return None
-    
-    def _generate_gendec_pdf(self, trip, template_base_path, output_base_path):
-        """Generate general declaration document - placeholder for now"""
-        try:
-            # For now, return None since there's no gendec PDF template
-            # The system seems to be generating DOCX files via a different system
-            print("gendec generation not implemented for PDF system - using DOCX templating system")
-            return None
-            
-        except Exception as e:
-            print(f"Error generating gendec PDF: {e}")
-            return None
-    
     @action(detail=True, methods=['get'])
     def documents(self, request, pk=None):
         """
@@ -2129,6 +1677,68 @@ class TripViewSet(BaseViewSet):
         documents = trip.documents.all().order_by('-created_on')
         serializer = DocumentSerializer(documents, many=True)
         return Response(serializer.data)
+    
+    @action(detail=True, methods=['get'])
+    def packet(self, request, pk=None):
+        """
+        The trip's packet documents merged into one PDF. Optional 'types'
+        (comma-separated packet document types) picks and orders them.
+        Stale documents are rendered first; the merged PDF is cached until one
+        of its documents changes.
+        """
+        from .document_pregeneration import generate_packet
+        from .file_delivery import serve_document
+        from .trip_documents import PACKET_DOCUMENT_TYPES
+        from .trip_packet import merged_packet
+        
+        trip = self.get_object()
+        doc_types = PACKET_DOCUMENT_TYPES
+        if request.query_params.get('types'):
+            doc_types = list(dict.fromkeys(t.strip() for t in request.query_params['types'].split(',') if t.strip()))
+            unsupported = [t for t in doc_types if t not in PACKET_DOCUMENT_TYPES]
+            if unsupported:
+                return Response({
+                    'error': f"Document types not supported: {', '.join(unsupported)}"
+                }, status=status.HTTP_400_BAD_REQUEST)
+        
+        created_by = request.user if request.user.is_authenticated else None
+        documents, errors = generate_packet(trip, doc_types, created_by=created_by)
+        if errors:
+            return Response({
+                'error': 'Some packet documents could not be generated',
+                'errors': errors
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        packet = merged_packet(trip, documents, created_by=created_by)
+        if packet is None:
+            return Response({
+                'error': 'Trip has no packet documents'
+            }, status=status.HTTP_404_NOT_FOUND)
+        response = serve_document(request, packet, 'application/pdf')
+        if response is None:
+            return Response({
+                'error': 'Packet file not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        return response
+    
+    @action(detail=True, methods=['get'])
+    def document_status(self, request, pk=None):
+        """
+        Freshness of each pre-generated packet document type. A type that isn't
+        stale has its current document ready, so generate_documents returns it
+        without rendering.
+        """
+        trip = self.get_object()
+        return Response({
+            doc_status.document_type: {
+                'stale': doc_status.stale,
+                'changed_at': doc_status.changed_at,
+                'generated_at': doc_status.generated_at,
+                'document_ids': [document.id for document in doc_status.documents.all()],
+                'last_error': doc_status.last_error,
+            }
+            for doc_status in trip.document_statuses.prefetch_related('documents')
+        })
 
 # Document ViewSet
 class DocumentViewSet(BaseViewSet):
@@ -2143,30 +1753,109 @@ class DocumentViewSet(BaseViewSet):
     def download(self, request, pk=None):
         """
         Download a document file.
+        Supports Range and conditional (ETag) requests; behind nginx the file
+        itself is sent by nginx via X-Accel-Redirect.
         """
-        from django.http import FileResponse
-        from pathlib import Path
+        from .file_delivery import serve_document
         
         document = self.get_object()
         
-        if document.file_path and Path(document.file_path).exists():
-            file_path = Path(document.file_path)
-            response = FileResponse(
-                open(file_path, 'rb'),
-                content_type='application/octet-stream'
+        response = serve_document(request, document, 'application/octet-stream')
+        if response is None:
+            return Response(
+                {'error': 'Document file not found'},
+                status=status.HTTP_404_NOT_FOUND
             )
-            response['Content-Disposition'] = f'attachment; filename="{document.filename}"'
-            return response
-        elif document.content:
-            # Fallback to binary content if stored in database
-            response = HttpResponse(document.content, content_type='application/octet-stream')
-            response['Content-Disposition'] = f'attachment; filename="{document.filename}"'
-            return response
+        return response
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Download many documents as one ZIP: document_type (comma-separated,
+        required), trip (comma-separated ids), date_from / date_to (YYYY-MM-DD,
+        creation date) and compression (stored or deflate).
+        Streams the ZIP as it's built; an export too big to stream returns 202
+        with a job whose result is a document to download.
+        """
+        from django.conf import settings
+        from django.http import StreamingHttpResponse
+        from django.utils.http import content_disposition_header
+        from .document_export import (
+            COMPRESSION, ExportError, export_filename, export_queryset, export_size, parse_filters, zip_chunks,
+        )
+        from .jobs import enqueue
+        
+        try:
+            filters = parse_filters(request.query_params)
+        except ExportError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        compression = request.query_params.get('compression', 'stored')
+        if compression not in COMPRESSION:
+            return Response(
+                {'error': f"compression must be one of: {', '.join(COMPRESSION)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        queryset = export_queryset(filters)
+        size = export_size(queryset)
+        if not size['files']:
+            return Response({'error': 'No documents match'}, status=status.HTTP_404_NOT_FOUND)
+        
+        if (size['files'] > getattr(settings, 'DOCUMENT_EXPORT_STREAM_MAX_FILES', 500) or
+                size['bytes'] > getattr(settings, 'DOCUMENT_EXPORT_STREAM_MAX_BYTES', 250 * 1024 * 1024)):
+            job = enqueue('documents.export', {
+                'filters': filters,
+                'compression': compression,
+                'user_id': request.user.id,
+            }, created_by=request.user)
+            return Response({
+                'message': f"Exporting {size['files']} documents in the background",
+                'files': size['files'],
+                'job': JobSerializer(job).data
+            }, status=status.HTTP_202_ACCEPTED)
+        
+        response = StreamingHttpResponse(
+            zip_chunks(queryset.iterator(chunk_size=100), compression), content_type='application/zip'
+        )
+        response['Content-Disposition'] = content_disposition_header(True, export_filename(filters))
+        response['Cache-Control'] = 'no-store'
+        response['X-Accel-Buffering'] = 'no'  # let nginx pass each chunk on as it comes
+        return response
+    
+    @action(detail=True, methods=['get'])
+    def preview(self, request, pk=None):
+        """
+        A downscaled image of the document: ?kind=thumbnail (default), preview
+        or display. 404 until the background workers have rendered it. The URL
+        stays the same when a preview is rendered again (a backfill, a format
+        change), so browsers revalidate their copy against its ETag.
+        """
+        from .file_delivery import serve_document, serve_stored
+        from .models import DocumentPreview
+        
+        document = self.get_object()
+        kind = request.query_params.get('kind', 'thumbnail')
+        if kind not in dict(DocumentPreview.KINDS):
+            return Response(
+                {'error': f"kind must be one of: {', '.join(dict(DocumentPreview.KINDS))}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        preview = DocumentPreview.objects.filter(document=document, kind=kind).first()
+        # A small photo has no display copy: the original is its own
+        if preview is None and kind == 'display' and document.previews.exists():
+            response = serve_document(request, document, document.mime_type or 'application/octet-stream', as_attachment=False)
+        elif preview is None:
+            response = None
         else:
+            preview.document = document
+            response = serve_stored(request, preview, preview.mime_type, as_attachment=False)
+        if response is None:
             return Response(
-                {'error': 'Document file not found'},
+                {'error': 'Preview not available'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        return response
 
     @action(detail=True, methods=['get'], permission_classes=[])
     def public_download(self, request, pk=None):
@@ -2174,8 +1863,7 @@ class DocumentViewSet(BaseViewSet):
         Public download endpoint for documents that doesn't require authentication.
         Used for email links to quote PDFs and other documents.
         """
-        from django.http import FileResponse, HttpResponse
-        from pathlib import Path
+        from .file_delivery import serve_document
 
         document = self.get_object()
 
@@ -2187,24 +1875,13 @@ class DocumentViewSet(BaseViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        if document.file_path and Path(document.file_path).exists():
-            file_path = Path(document.file_path)
-            response = FileResponse(
-                open(file_path, 'rb'),
-                content_type='application/pdf'
-            )
-            response['Content-Disposition'] = f'attachment; filename="{document.filename}"'
-            return response
-        elif document.content:
-            # Fallback to binary content if stored in database
-            response = HttpResponse(document.content, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="{document.filename}"'
-            return response
-        else:
+        response = serve_document(request, document, 'application/pdf')
+        if response is None:
             return Response(
                 {'error': 'Document file not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        return response
 
 # TripLine ViewSet
 class TripLineViewSet(BaseViewSet):
@@ -2922,7 +2599,7 @@ class ContractViewSet(BaseViewSet):
                     }, status=status.HTTP_400_BAD_REQUEST)
             
             contracts_created = []
-            docuseal_service = DocuSealService()
+            jobs = []
             
             for contract_type in contract_types:
                 # Generate contract title
@@ -2943,24 +2620,17 @@ class ContractViewSet(BaseViewSet):
                 
                 contracts_created.append(contract)
                 
-                # If send_immediately is True, attempt to send via DocuSeal
+                # If send_immediately is True, queue the DocuSeal send
                 if send_immediately:
-                    try:
-                        logger.info(f"Attempting to send contract {contract.id} for signature")
-                        result = self._send_contract_for_signature(contract, docuseal_service, manual_price, manual_price_description)
-                        logger.info(f"Successfully sent contract {contract.id}: {result}")
-                    except Exception as e:
-                        logger.error(f"Failed to send contract {contract.id}: {str(e)}", exc_info=True)
-                        contract.status = 'failed'
-                        contract.notes = f"Failed to send: {str(e)}"
-                        contract.save()
+                    jobs.append(self._enqueue_send(contract, request.user, manual_price, manual_price_description))
             
             # Serialize created contracts
             serializer = ContractReadSerializer(contracts_created, many=True)
             
             return Response({
                 'message': f'Created {len(contracts_created)} contracts',
-                'contracts': serializer.data
+                'contracts': serializer.data,
+                'jobs': JobSerializer(jobs, many=True).data
             }, status=status.HTTP_201_CREATED)
             
         except Exception as e:
@@ -2971,25 +2641,16 @@ class ContractViewSet(BaseViewSet):
     
     @action(detail=True, methods=['post'])
     def send_for_signature(self, request, pk=None):
-        """Send contract to DocuSeal for signature."""
+        """Queue the contract to be sent to DocuSeal for signature."""
         contract = self.get_object()
+        job = self._enqueue_send(contract, request.user)
         
-        try:
-            docuseal_service = DocuSealService()
-            result = self._send_contract_for_signature(contract, docuseal_service)
-            
-            serializer = ContractReadSerializer(contract)
-            return Response({
-                'message': 'Contract sent for signature',
-                'contract': serializer.data,
-                'docuseal_response': result
-            })
-            
-        except Exception as e:
-            logger.error(f"Failed to send contract for signature: {str(e)}")
-            return Response({
-                'error': f'Failed to send contract: {str(e)}'
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        serializer = ContractReadSerializer(contract)
+        return Response({
+            'message': 'Contract queued for signature',
+            'contract': serializer.data,
+            'job': JobSerializer(job).data
+        }, status=status.HTTP_202_ACCEPTED)
     
     @action(detail=True, methods=['post'])
     def docuseal_action(self, request, pk=None):
@@ -3005,8 +2666,12 @@ class ContractViewSet(BaseViewSet):
             docuseal_service = DocuSealService()
             
             if action_type == 'send_for_signature':
-                result = self._send_contract_for_signature(contract, docuseal_service)
-                message = 'Contract sent for signature'
+                job = self._enqueue_send(contract, request.user)
+                return Response({
+                    'message': 'Contract queued for signature',
+                    'contract': ContractReadSerializer(contract).data,
+                    'job': JobSerializer(job).data
+                }, status=status.HTTP_202_ACCEPTED)
                 
             elif action_type == 'resend':
                 result = self._resend_contract(contract, docuseal_service)
@@ -3038,168 +2703,14 @@ class ContractViewSet(BaseViewSet):
                 'error': f'Action failed: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     
-    def _send_contract_for_signature(self, contract, docuseal_service, manual_price=None, manual_price_description=None):
-        """Helper method to send contract for signature."""
-        from django.conf import settings
-        
-        # Get template configuration
-        template_config = settings.DOCUSEAL_CONTRACT_SETTINGS['templates'].get(contract.contract_type)
-        if not template_config:
-            raise ValueError(f"No template configuration found for contract type: {contract.contract_type}")
-        
-        # Use the pre-configured template ID
-        template_id = template_config['template_id']
-        requires_jet_icu_signature = template_config.get('requires_jet_icu_signature', False)
-        
-        # Prepare data for field mapping
-        trip_data = {
-            'trip_number': contract.trip.trip_number,
-            'type': contract.trip.type,
-            'estimated_departure_time': str(contract.trip.estimated_departure_time) if contract.trip.estimated_departure_time else '',
-            'notes': contract.trip.notes or '',
-        }
-        
-        # Get trip lines data - pass as objects for easier access
-        trip_lines_data = list(contract.trip.trip_lines.all().order_by('departure_time_utc'))
-        
-        # Get quote data if available, otherwise use manual pricing
-        quote_data = None
-        if contract.trip.quote:
-            quote_data = {
-                'quoted_amount': str(contract.trip.quote.quoted_amount)
-            }
-        elif manual_price is not None:
-            quote_data = {
-                'quoted_amount': str(manual_price)
-            }
-        
-        # Get contact data
-        contact_data = None
-        if contract.customer_contact:
-            contact_data = {
-                'first_name': contract.customer_contact.first_name or '',
-                'last_name': contract.customer_contact.last_name or '',
-                'business_name': contract.customer_contact.business_name or '',
-                'email': contract.customer_contact.email or '',
-                'phone': contract.customer_contact.phone or '',
-                'address_line1': contract.customer_contact.address_line1 or '',
-                'address_line2': contract.customer_contact.address_line2 or '',
-                'city': contract.customer_contact.city or '',
-                'state': contract.customer_contact.state or '',
-                'zip': contract.customer_contact.zip or '',
-                'country': contract.customer_contact.country or '',
-            }
-        
-        # Get patient data
-        patient_data = None
-        if contract.patient:
-            patient_data = {
-                'info': {
-                    'first_name': contract.patient.info.first_name or '',
-                    'last_name': contract.patient.info.last_name or '',
-                    'phone': contract.patient.info.phone or '',
-                    'address_line1': contract.patient.info.address_line1 or '',
-                    'city': contract.patient.info.city or '',
-                    'state': contract.patient.info.state or '',
-                    'zip': contract.patient.info.zip or '',
-                },
-                'date_of_birth': str(contract.patient.date_of_birth) if contract.patient.date_of_birth else '',
-                'nationality': contract.patient.nationality or '',
-                'passport_number': contract.patient.passport_number or '',
-                'special_instructions': contract.patient.special_instructions or '',
-            }
-        
-        # Get passengers data
-        passengers = contract.trip.passengers.all()
-        passengers_data = []
-        for passenger in passengers:
-            passengers_data.append({
-                'info': {
-                    'first_name': passenger.info.first_name or '',
-                    'last_name': passenger.info.last_name or '',
-                }
-            })
-        
-        # Generate field mappings based on contract type
-        fields = docuseal_service.create_contract_fields_mapping(
-            contract_type=contract.contract_type,
-            trip_data=trip_data,
-            trip_lines_data=trip_lines_data,
-            contact_data=contact_data,
-            patient_data=patient_data,
-            passengers_data=passengers_data,
-            quote_data=quote_data
-        )
-        
-        # Get roles from template configuration
-        customer_role = template_config.get('customer_role', 'patient')
-        jet_icu_role = template_config.get('jet_icu_role', 'jet_icu')
-        
-        # Prepare submitters list - assign fields to JET ICU role as requested
-        if requires_jet_icu_signature:
-            # For contracts requiring JET ICU signature, customer signs but JET ICU gets the field data
-            submitters = [
-                {
-                    'name': contract.signer_name,
-                    'email': contract.signer_email,
-                    'role': customer_role,
-                    'fields': {}  # Customer doesn't fill fields, just signs
-                },
-                {
-                    'name': 'JET ICU Representative', 
-                    'email': settings.DOCUSEAL_JET_ICU_SIGNER_EMAIL,
-                    'role': jet_icu_role,
-                    'fields': fields  # JET ICU gets all the field data
-                }
-            ]
-        else:
-            # For single-signature contracts, assign fields to the JET ICU role (First Party)
-            submitters = [
-                {
-                    'name': contract.signer_name,
-                    'email': contract.signer_email, 
-                    'role': customer_role,
-                    'fields': {}  # Customer signs as Second Party with no fields
-                },
-                {
-                    'name': 'JET ICU Representative',
-                    'email': settings.DOCUSEAL_JET_ICU_SIGNER_EMAIL,
-                    'role': jet_icu_role,
-                    'fields': fields  # JET ICU (First Party) gets all the field data
-                }
-            ]
-        
-        # Store template ID in contract
-        contract.docuseal_template_id = template_id
-        
-        # Create submission
-        submission_result = docuseal_service.create_submission(
-            template_id=template_id,
-            submitters=submitters,
-            send_email=True
-        )
-        
-        # DocuSeal returns an array of submitters, get the submission_id from the first one
-        if isinstance(submission_result, list) and len(submission_result) > 0:
-            first_submitter = submission_result[0]
-            submission_id = first_submitter.get('submission_id')
-            
-            # Update contract
-            contract.docuseal_submission_id = str(submission_id)
-            contract.status = 'pending'
-            contract.date_sent = timezone.now()
-            contract.docuseal_response_data = {
-                'submitters': submission_result,
-                'submission_id': submission_id
-            }
-            contract.save()
-            
-            logger.info(f"Contract {contract.id} updated with submission_id: {submission_id}")
-        else:
-            logger.error(f"Unexpected DocuSeal response format: {type(submission_result)}")
-            raise ValueError("Unexpected DocuSeal response format")
-        
-        return submission_result
+    def _enqueue_send(self, contract, user, manual_price=None, manual_price_description=None):
+        """Queue a DocuSeal send for the contract (see api.tasks.send_contract)."""
+        from .jobs import enqueue
+        return enqueue('contracts.send_for_signature', {
+            'contract_id': str(contract.id),
+            'manual_price': str(manual_price) if manual_price is not None else None,
+            'manual_price_description': manual_price_description,
+        }, created_by=user)
     
     def _generate_contract_summary(self, contract):
         """Generate a summary of contract details for logging/display."""
@@ -3263,23 +2774,6 @@ def docuseal_webhook(request):
                 if event_type == 'form.completed':
                     contract.status = 'signed'
                     contract.date_signed = timezone.now()
-                    
-                    # Download signed document
-                    try:
-                        signed_doc_content = docuseal_service.get_submission_documents(submission_id)
-                        
-                        # Create Document record for signed document
-                        signed_document = Document.objects.create(
-                            filename=f"{contract.title}_signed.pdf",
-                            content=signed_doc_content,
-                            document_type='contract',
-                            trip=contract.trip,
-                            created_by_id=1  # System user
-                        )
-                        contract.signed_document = signed_document
-                        
-                    except Exception as e:
-                        logger.error(f"Failed to download signed document: {str(e)}")
                 
                 elif event_type == 'form.viewed':
                     # Contract was viewed but not necessarily completed
@@ -3295,6 +2789,16 @@ def docuseal_webhook(request):
                     'last_webhook_time': timezone.now().isoformat()
                 })
                 contract.save()
+
+                # Download the signed document in the background so DocuSeal gets a quick answer;
+                # enqueued once the webhook's changes are saved, so the job never races this save
+                if event_type == 'form.completed' and not contract.signed_document_id:
+                    from django.db import transaction
+                    from .jobs import enqueue
+                    transaction.on_commit(lambda: enqueue('contracts.download_signed_document', {
+                        'contract_id': str(contract.id),
+                        'submission_id': submission_id,
+                    }))
                 
                 logger.info(f"Updated contract {contract.id} from webhook event {event_type}")
                 
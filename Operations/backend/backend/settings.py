@@ -48,6 +48,9 @@ EMAIL_USE_SSL = os.environ.get('EMAIL_USE_SSL', 'False').lower() == 'true'
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'JET ICU Operations <noreply@jeticu.com>')
+# utils/smtp/transport.py keeps one SMTP connection open per process, configured from these environment
+# variables plus EMAIL_TIMEOUT (20 seconds) and EMAIL_CONNECTION_MAX_IDLE (seconds idle before it's checked
+# with NOOP, 30)
 
 # Frontend URL for activation links
 FRONTEND_URL = os.environ.get('FRONTEND_URL', 'https://jeticuops.com')
@@ -206,6 +209,105 @@ DOCUSEAL_JET_ICU_SIGNER_EMAIL = os.environ.get('DOCUSEAL_JET_ICU_SIGNER_EMAIL',
 AUTHORIZE_NET_LOGIN_ID = os.environ.get('AUTHORIZE_NET_LOGIN_ID')
 AUTHORIZE_NET_TRANSACTION_KEY = os.environ.get('AUTHORIZE_NET_TRANSACTION_KEY')
 
+# Shared HTTP client settings (utils/services/http_client.py), one pool per integration
+HTTP_CLIENTS = {
+    'docuseal': {
+        'base_url': DOCUSEAL_BASE_URL,
+        'timeout': (3.05, 30),
+    },
+    'authorize_net': {
+        # Payment POSTs are never retried; only connection reuse and the breaker apply
+        'timeout': (3.05, 30),
+        'failure_threshold': 3,
+    },
+    'flightaware': {
+        'base_url': os.environ.get('FLIGHTAWARE_BASE_URL', 'https://flightaware.com'),
+        'timeout': (3.05, 10),
+        'deadline': 15,
+        'retries': 1,
+        'headers': {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                          '(KHTML, like Gecko) Chrome/113.0.0.0 Safari/537.36',
+        },
+    },
+    'twilio': {
+        'timeout': (3.05, 15),
+        'deadline': 20,
+    },
+}
+
+# FlightAware fuel price settings
+FLIGHTAWARE_BASE_URL = os.environ.get('FLIGHTAWARE_BASE_URL', 'https://flightaware.com')
+FUEL_PRICE_CACHE_TTL = int(os.environ.get('FUEL_PRICE_CACHE_TTL', 1800))  # seconds
+FUEL_PRICE_TIMEOUT = (3.05, 10)  # connect, read seconds
+FUEL_PRICE_MAX_WORKERS = 4
+FUEL_PRICE_WARM_DAYS = 3  # warm airports on trips departing within this many days
+# Seconds between sweeps of a refresher thread in each process that looks up prices; 0 (the default) disables it.
+# Each process would scrape the same airports, so leave refreshing to the scheduler's warm_fuel_prices task.
+FUEL_PRICE_REFRESH_INTERVAL = int(os.environ.get('FUEL_PRICE_REFRESH_INTERVAL', 0))
+FBO_DETAILS_CACHE_TTL = 7 * 24 * 3600  # seconds
+ENRICHMENT_TIMEOUT = 8  # seconds background document generation waits on FlightAware lookups (requests never do)
+# PDF render processes per process that renders (1 renders in-process). Unset: min(4, CPUs), except under
+# gunicorn's gevent workers, which render in-process (see api/document_rendering.py)
+DOCUMENT_RENDER_WORKERS = int(os.environ['DOCUMENT_RENDER_WORKERS']) if os.environ.get('DOCUMENT_RENDER_WORKERS') else None
+
+# Document file storage (see api/document_storage.py): 'local' keeps files under DOCUMENT_STORAGE_DIR,
+# 's3' in an S3-compatible bucket (set DOCUMENT_S3_ENDPOINT_URL for MinIO; requires boto3)
+DOCUMENT_STORAGE_BACKEND = os.environ.get('DOCUMENT_STORAGE_BACKEND', 'local')
+DOCUMENT_STORAGE_DIR = os.environ.get('DOCUMENT_STORAGE_DIR', os.path.join(BASE_DIR, 'documents', 'stored'))
+DOCUMENT_S3_BUCKET = os.environ.get('DOCUMENT_S3_BUCKET', '')
+DOCUMENT_S3_PREFIX = os.environ.get('DOCUMENT_S3_PREFIX', '')
+DOCUMENT_S3_ENDPOINT_URL = os.environ.get('DOCUMENT_S3_ENDPOINT_URL', '')
+DOCUMENT_S3_REGION = os.environ.get('DOCUMENT_S3_REGION', '')
+DOCUMENT_S3_ACCESS_KEY_ID = os.environ.get('DOCUMENT_S3_ACCESS_KEY_ID', '')
+DOCUMENT_S3_SECRET_ACCESS_KEY = os.environ.get('DOCUMENT_S3_SECRET_ACCESS_KEY', '')
+DOCUMENT_S3_URL_EXPIRY = 300  # seconds a presigned download URL stays valid
+
+# Thumbnails and previews of uploaded patient documents (see api/document_previews.py), rendered by the
+# 'documents' job queue. PDF previews need pdftoppm (poppler-utils).
+DOCUMENT_PREVIEW_FORMAT = os.environ.get('DOCUMENT_PREVIEW_FORMAT', 'WEBP')  # WEBP or JPEG
+DOCUMENT_PREVIEW_QUALITY = 80
+DOCUMENT_DISPLAY_MAX_BYTES = 1024 * 1024  # photos larger than this (or DISPLAY px) get a recompressed display copy
+
+# Bulk document exports (see api/document_export.py) stream a ZIP into the response up to these limits;
+# anything bigger is built by the 'documents' job queue and kept for RETENTION_DAYS
+DOCUMENT_EXPORT_STREAM_MAX_FILES = 500
+DOCUMENT_EXPORT_STREAM_MAX_BYTES = 250 * 1024 * 1024
+DOCUMENT_EXPORT_RETENTION_DAYS = 7
+
+# Document downloads: with DOCUMENT_ACCEL_REDIRECT on, Django checks access and nginx sends files found under
+# these directories from the matching internal location (see the /_protected/ locations in the frontend nginx.conf)
+DOCUMENT_ACCEL_REDIRECT = os.environ.get('DOCUMENT_ACCEL_REDIRECT', 'False').lower() == 'true'
+DOCUMENT_ACCEL_LOCATIONS = {
+    os.path.join(BASE_DIR, 'documents'): '/_protected/documents/',
+    MEDIA_ROOT: '/_protected/media/',
+}
+
+# Background jobs (run with `python manage.py run_workers`)
+JOB_POLL_INTERVAL = 2  # seconds an idle worker waits before polling again
+JOB_RETRY_BACKOFF = 30  # seconds before the first retry, doubling per attempt
+JOB_RETRY_MAX_BACKOFF = 3600  # seconds
+JOB_LOCK_TIMEOUT = 900  # seconds without a heartbeat before a running job is assumed abandoned and reclaimed
+JOB_HEARTBEAT_INTERVAL = 60  # seconds between a running job's lock refreshes; well under JOB_LOCK_TIMEOUT
+JOB_RETENTION_DAYS = 14  # finished jobs older than this are deleted by the scheduler
+
+# Trip packet documents are re-rendered in the background (the 'documents' job queue) after a trip
+# changes, once it has gone this many seconds without another change, and at most MAX_DELAY after the first
+TRIP_DOCUMENT_PREGENERATION = os.environ.get('TRIP_DOCUMENT_PREGENERATION', 'True').lower() == 'true'
+TRIP_DOCUMENT_PREGENERATE_DELAY = 60  # seconds
+TRIP_DOCUMENT_PREGENERATE_MAX_DELAY = 600  # seconds
+
+# Periodic maintenance (run with `python manage.py run_scheduler`; see api/periodic_tasks.py)
+# Override a task's cron schedule, or disable it with None, e.g. {'warm_fuel_prices': '*/5 * * * *'}.
+# warm_fuel_prices scrapes into the FuelPrice history, which every process's price lookups read (see
+# api/fuel_prices.py), so keep FUEL_PRICE_REFRESH_INTERVAL at 0 wherever the scheduler runs.
+SCHEDULED_TASKS = {}
+SCHEDULER_DELETE_CHUNK_SIZE = 1000  # rows per DELETE in cleanup tasks
+SCHEDULER_MAX_CATCHUP = 60  # minutes of missed slots the scheduler catches up on after an overrun
+ACTIVATION_TOKEN_RETENTION_DAYS = 7
+DOCUSEAL_STATUS_REFRESH_MIN_AGE = 30  # minutes after sending before a pending contract is polled
+DOCUSEAL_STATUS_REFRESH_BATCH = 100
+
 # DocuSeal Contract Settings
 DOCUSEAL_CONTRACT_SETTINGS = {
     'default_expiration_days': 30,
@@ -1,6 +1,3 @@
-import pypdf
-from pypdf import PdfWriter, PdfReader
-import PyPDF2
 from typing import Dict, Any, Optional, List
 from datetime import datetime
 from dataclasses import dataclass, field
@@ -188,70 +185,9 @@ def populate_pdf_with_fields(input_pdf_path: str, output_pdf_path: str, field_ma
     Returns:
         bool: True if successful, False otherwise
     """
-    try:
-        # Try PyMuPDF (fitz) method first - most reliable for form filling
-        import fitz
-        
-        doc = fitz.open(input_pdf_path)
-        
-        # Clean field mapping - ensure all values are strings
-        clean_mapping = {}
-        for field_name, value in field_mapping.items():
-            if value is not None:
-                clean_mapping[field_name] = str(value)
-            else:
-                clean_mapping[field_name] = ""
-        
-        # Fill form fields
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            widgets = page.widgets()
-            
-            for widget in widgets:
-                if widget.field_name in clean_mapping:
-                    widget.field_value = clean_mapping[widget.field_name]
-                    widget.update()
-        
-        # Save the filled PDF
-        doc.save(output_pdf_path)
-        doc.close()
-        return True
-        
-    except Exception as e:
-        print(f"PyMuPDF failed: {e}")
-        
-        # Fallback to pdfrw method
-        try:
-            from pdfrw import PdfReader, PdfWriter, PdfDict
-            
-            template_pdf = PdfReader(input_pdf_path)
-            
-            # Clean field mapping - ensure all values are strings
-            clean_mapping = {}
-            for field_name, value in field_mapping.items():
-                if value is not None:
-                    clean_mapping[field_name] = str(value)
-                else:
-                    clean_mapping[field_name] = ""
-            
-            # Find and populate form fields
-            for page in template_pdf.pages:
-                if page.Annots:
-                    for annotation in page.Annots:
-                        if annotation.T:  # Field name
-                            field_name = annotation.T[1:-1]  # Remove parentheses
-                            if field_name in clean_mapping:
-                                # Set the field value
-                                annotation.update(PdfDict(V=f'({clean_mapping[field_name]})'))
-                                annotation.update(PdfDict(DV=f'({clean_mapping[field_name]})'))
-            
-            # Write the filled PDF
-            PdfWriter(output_pdf_path, trailer=template_pdf).write()
-            return True
-            
-        except Exception as e2:
-            print(f"All PDF population methods failed: {e2}")
-            return False
+    from .pdf_forms import fill_form
+    
+    return fill_form(input_pdf_path, output_pdf_path, field_mapping)
 
 
 def populate_quote_pdf(input_pdf_path: str, output_pdf_path: str, data: QuoteData) -> bool:
@@ -0,0 +1,203 @@
+"""
+The branded quote PDF (QuoteViewSet.pdf), drawn with reportlab.
+
+Paragraph and table styles are built once at import rather than per render.
+populate_quote_report() has the populate_*_pdf signature, so quotes render
+through api/document_rendering.py like the form templates: its "template" is
+this module's own file, so any change to the layout here changes the render
+hash and stale PDFs are re-rendered rather than reused.
+
+Like the other populate functions it only takes plain data, so it runs in the
+render pool without Django.
+"""
+
+import os
+from dataclasses import dataclass, field
+from typing import List, Tuple
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+TEMPLATE_PATH = os.path.abspath(__file__)
+
+GREY = colors.HexColor('#6B7280')
+DARK = colors.HexColor('#1F2937')
+
+_normal = getSampleStyleSheet()['Normal']
+
+STYLES = {
+    'company': ParagraphStyle('CompanyHeader', parent=_normal, fontSize=18, fontName='Helvetica-Bold',
+                              textColor=colors.HexColor('#1E40AF'), alignment=0, spaceBefore=0, spaceAfter=6,
+                              leading=22),
+    'company_info': ParagraphStyle('CompanyInfo', parent=_normal, fontSize=9, textColor=GREY, alignment=0,
+                                   spaceBefore=0, spaceAfter=0, leading=11),
+    'title': ParagraphStyle('QuoteTitle', parent=_normal, fontSize=24, fontName='Helvetica-Bold', textColor=DARK,
+                            alignment=2, spaceBefore=0, spaceAfter=6, leading=28),
+    'number': ParagraphStyle('QuoteNumber', parent=_normal, fontSize=10, textColor=GREY, alignment=2,
+                             spaceBefore=0, spaceAfter=0, leading=12),
+    'section': ParagraphStyle('SectionHeader', parent=_normal, fontSize=11, fontName='Helvetica-Bold',
+                              textColor=DARK, spaceBefore=25, spaceAfter=12, leading=13, leftIndent=0,
+                              rightIndent=0),
+    'customer': ParagraphStyle('CustomerInfo', parent=_normal, fontSize=10, leading=14, spaceBefore=0,
+                               spaceAfter=0, leftIndent=0, rightIndent=0),
+    'cell': ParagraphStyle('ServiceCell', parent=_normal, fontSize=9, leading=12),
+    'terms': ParagraphStyle('Terms', parent=_normal, fontSize=9, leading=12, spaceBefore=0, spaceAfter=0,
+                            leftIndent=0, rightIndent=0),
+    'footer': ParagraphStyle('Footer', parent=_normal, fontSize=8, textColor=GREY, alignment=1, spaceBefore=0,
+                             spaceAfter=0, leading=10),
+}
+
+HEADER_TABLE_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+    ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+    ('TOPPADDING', (0, 0), (-1, -1), 4),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+    ('LEFTPADDING', (0, 0), (-1, -1), 0),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+])
+
+SERVICE_TABLE_STYLE = TableStyle([
+    # Header row
+    ('BACKGROUND', (0, 0), (-1, 0), DARK),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, 0), 'MIDDLE'),
+    # Data rows
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 9),
+    ('ALIGN', (0, 1), (0, -1), 'LEFT'),      # Service column
+    ('ALIGN', (1, 1), (1, -1), 'LEFT'),      # Details column
+    ('ALIGN', (2, 1), (2, -1), 'RIGHT'),     # Amount column
+    ('VALIGN', (0, 1), (-1, -1), 'TOP'),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F9FAFB')]),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor('#E5E7EB')),
+    ('LINEBELOW', (0, 0), (-1, 0), 2, DARK),
+    ('TOPPADDING', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+    ('LEFTPADDING', (0, 0), (-1, -1), 8),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 8),
+])
+
+TOTAL_TABLE_STYLE = TableStyle([
+    ('FONTNAME', (1, 0), (-1, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (1, 0), (-1, 1), 10),
+    ('FONTSIZE', (1, 2), (-1, 2), 12),  # Total row larger
+    ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+    ('TEXTCOLOR', (1, 2), (-1, 2), DARK),
+    ('LINEABOVE', (1, 2), (-1, 2), 1.5, DARK),
+    ('TOPPADDING', (1, 0), (-1, -1), 6),
+    ('BOTTOMPADDING', (1, 0), (-1, -1), 6),
+    ('LEFTPADDING', (1, 0), (-1, -1), 4),
+    ('RIGHTPADDING', (1, 0), (-1, -1), 4),
+])
+
+PATIENT_TABLE_STYLE = TableStyle([
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('TOPPADDING', (0, 0), (-1, -1), 3),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 3),
+    ('LEFTPADDING', (0, 0), (-1, -1), 0),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+])
+
+TERMS = (
+    "• This quote is valid for 30 days from the date of issue<br/>"
+    "• Payment is due upon acceptance of services<br/>"
+    "• Cancellation policy: 24-hour notice required<br/>"
+    "• Weather and operational delays may affect scheduling<br/>"
+    "• All flights subject to FAA regulations and crew duty time requirements<br/>"
+    "• Medical equipment and staff included as specified"
+)
+
+
+@dataclass
+class QuoteReportData:
+    """Everything printed on the quote PDF, as plain text."""
+    quote_number: str = ''
+    date: str = 'N/A'
+    bill_to: List[str] = field(default_factory=list)  # lines; no Bill To section when empty
+    route: str = 'Medical Air Transport'
+    aircraft: str = ''
+    medical_team: str = ''
+    flight_time: str = 'TBD'
+    amount: str = ''
+    includes_grounds: bool = False
+    patient: List[Tuple[str, str]] = field(default_factory=list)  # (label, value) rows
+
+
+def _text(value: str) -> str:
+    return escape(value or '')
+
+
+def build_story(data: QuoteReportData) -> list:
+    """The quote's flowables."""
+    story = []
+
+    header_table = Table([
+        [Paragraph("JET ICU MEDICAL TRANSPORT", STYLES['company']), Paragraph("QUOTE", STYLES['title'])],
+        [Paragraph("1511 N Westshore Blvd #650<br/>Tampa, FL 33607", STYLES['company_info']),
+         Paragraph(f"#{_text(data.quote_number)}", STYLES['number'])],
+        [Paragraph("Phone: (352) 796-2540<br/>Email: info@jeticu.com", STYLES['company_info']),
+         Paragraph(f"Date: {_text(data.date)}", STYLES['number'])],
+    ], colWidths=[4.2 * inch, 2.3 * inch])
+    header_table.setStyle(HEADER_TABLE_STYLE)
+    story += [header_table, Spacer(1, 25)]
+
+    if data.bill_to:
+        story.append(Paragraph("BILL TO", STYLES['section']))
+        story.append(Paragraph("<br/>".join(_text(line) for line in data.bill_to), STYLES['customer']))
+        story.append(Spacer(1, 25))
+
+    story.append(Paragraph("SERVICE DETAILS", STYLES['section']))
+    details = (f"Aircraft: {_text(data.aircraft)}<br/>Medical Team: {_text(data.medical_team)}<br/>"
+               f"Flight Time: {_text(data.flight_time)}")
+    service_data = [
+        ['Service', 'Details', 'Amount'],
+        [data.route, Paragraph(details, STYLES['cell']), data.amount],
+    ]
+    if data.includes_grounds:
+        service_data.append(["Ground Transportation", "Airport transfers included", "Included"])
+    service_table = Table(service_data, colWidths=[2.2 * inch, 2.8 * inch, 1.5 * inch])
+    service_table.setStyle(SERVICE_TABLE_STYLE)
+    story += [service_table, Spacer(1, 25)]
+
+    total_table = Table([
+        ['', 'Subtotal:', data.amount],
+        ['', 'Tax:', "$0.00"],
+        ['', 'TOTAL:', data.amount],
+    ], colWidths=[3.2 * inch, 1.6 * inch, 1.7 * inch])
+    total_table.setStyle(TOTAL_TABLE_STYLE)
+    story += [total_table, Spacer(1, 25)]
+
+    if data.patient:
+        story.append(Paragraph("PATIENT INFORMATION", STYLES['section']))
+        patient_table = Table([list(row) for row in data.patient], colWidths=[1.8 * inch, 4.7 * inch])
+        patient_table.setStyle(PATIENT_TABLE_STYLE)
+        story += [patient_table, Spacer(1, 25)]
+
+    story.append(Paragraph("TERMS & CONDITIONS", STYLES['section']))
+    story += [Paragraph(TERMS, STYLES['terms']), Spacer(1, 25)]
+
+    story.append(Paragraph("Thank you for choosing JET ICU Medical Transport", STYLES['footer']))
+    story.append(Paragraph("Your trusted partner in medical aviation", STYLES['footer']))
+    return story
+
+
+def populate_quote_report(template_path: str, output_path: str, data: QuoteReportData) -> bool:
+    """Draw the quote PDF to output_path (template_path is unused; see the module docstring)."""
+    try:
+        doc = SimpleDocTemplate(output_path, pagesize=letter, rightMargin=50, leftMargin=50,
+                                topMargin=50, bottomMargin=50)
+        doc.build(build_story(data))
+        return True
+    except Exception as e:
+        print(f"Quote PDF rendering failed: {e}")
+        return False
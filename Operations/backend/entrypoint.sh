@@ -61,7 +61,7 @@ if [ "$RUN_SETUP_COMMANDS" = "true" ]; then
     python manage.py setup_permissions || echo "Permissions setup skipped"
 fi
 
-echo "Starting Gunicorn server..."
+echo "Starting $*..."
 
 # Execute the main command
 exec "$@"
\ No newline at end of file
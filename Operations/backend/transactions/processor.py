@@ -3,6 +3,8 @@ import os
 import requests
 from django.conf import settings
 
+from utils.services.http_client import get_client
+
 
 def process_card_transaction(amount, card_number, expiration_date, card_code, ref_id=None, bill_to=None, ship_to=None, customer_ip='127.0.0.1'):
     """
@@ -68,7 +70,7 @@ def process_card_transaction(amount, card_number, expiration_date, card_code, re
             'Accept': 'application/json'
         }
         
-        response = requests.post(api_url, json=auth_net_data, headers=headers, timeout=30)
+        response = get_client('authorize_net').post(api_url, json=auth_net_data, headers=headers, timeout=30)
         
         # Parse Authorize.Net response - handle UTF-8 BOM
         response_text = response.text
@@ -172,7 +174,7 @@ def process_ach_transaction(amount, account_type, routing_number, account_number
             'Accept': 'application/json'
         }
         
-        response = requests.post(api_url, json=auth_net_data, headers=headers, timeout=30)
+        response = get_client('authorize_net').post(api_url, json=auth_net_data, headers=headers, timeout=30)
         
         # Parse Authorize.Net response - handle UTF-8 BOM
         response_text = response.text
@@ -0,0 +1,279 @@
+"""
+In-project periodic task scheduler.
+
+Tasks are registered with the @periodic decorator and a five-field cron
+expression (minute hour day-of-month month day-of-week), and run by
+`manage.py run_scheduler`. Every container may run the scheduler: each task
+run takes a Postgres advisory lock named after the task, so only the
+container that wins the lock runs it, and the ScheduledTask row records the
+slot it ran for so a container that gets the lock a moment later doesn't run
+the same slot again. The same row keeps per-task runtime metrics.
+
+Schedules can be overridden (or a task disabled with None) through
+settings.SCHEDULED_TASKS = {'task_name': '*/5 * * * *'}.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class CronSchedule:
+    """
+    Five-field cron expression.
+
+    Supports ``*``, ``*/n``, ``a``, ``a-b``, ``a-b/n`` and comma lists. Day of
+    week is 0-6 from Sunday (7 is also Sunday). As in cron, when both day of
+    month and day of week are restricted a time matches if either does.
+    """
+
+    RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: '{expression}'")
+        fields = [self._parse(part, low, high) for part, (low, high) in zip(parts, self.RANGES)]
+        self.minutes, self.hours, self.days, self.months, weekdays = fields
+        self.weekdays = {0 if day == 7 else day for day in weekdays}
+        self.any_day = parts[2] == '*'
+        self.any_weekday = parts[4] == '*'
+
+    @staticmethod
+    def _parse(field: str, low: int, high: int) -> set:
+        values = set()
+        for item in field.split(','):
+            value_range, _, step = item.partition('/')
+            if value_range == '*':
+                start, end = low, high
+            elif '-' in value_range:
+                start, end = (int(v) for v in value_range.split('-', 1))
+            else:
+                start = end = int(value_range)
+                if step:
+                    end = high
+            step = int(step) if step else 1
+            if start < low or end > high or start > end or step < 1:
+                raise ValueError(f"Invalid cron field '{field}'")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def matches(self, moment) -> bool:
+        if moment.minute not in self.minutes or moment.hour not in self.hours or moment.month not in self.months:
+            return False
+        day_match = moment.day in self.days
+        weekday_match = (moment.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_match and weekday_match
+        return day_match or weekday_match
+
+    def __str__(self):
+        return self.expression
+
+
+class PeriodicTask:
+    def __init__(self, name: str, func: Callable, schedule: str, description: str = ''):
+        self.name = name
+        self.func = func
+        self.default_schedule = schedule
+        self.description = description
+
+    @property
+    def schedule(self) -> Optional[CronSchedule]:
+        expression = getattr(settings, 'SCHEDULED_TASKS', {}).get(self.name, self.default_schedule)
+        return CronSchedule(expression) if expression else None
+
+
+PERIODIC_TASKS: Dict[str, PeriodicTask] = {}
+
+
+def periodic(name: str, schedule: str):
+    """Register a function to run on a cron schedule; its docstring describes it in listings."""
+    CronSchedule(schedule)  # fail at import time on a bad expression
+
+    def decorator(func):
+        description = (func.__doc__ or '').strip().splitlines()[0] if func.__doc__ else ''
+        PERIODIC_TASKS[name] = PeriodicTask(name, func, schedule, description)
+        return func
+    return decorator
+
+
+def load_tasks():
+    """Import the modules that register periodic tasks."""
+    import api.periodic_tasks  # noqa: F401
+
+
+def delete_in_chunks(queryset, chunk_size: Optional[int] = None) -> int:
+    """
+    Delete a queryset's rows a chunk of primary keys at a time.
+
+    Keeps each DELETE (and its locks and cascade work) short instead of
+    removing a large backlog in one long transaction.
+
+    Returns:
+        Number of rows of the queryset's model deleted
+    """
+    chunk_size = chunk_size or getattr(settings, 'SCHEDULER_DELETE_CHUNK_SIZE', 1000)
+    model = queryset.model
+    total = 0
+    while True:
+        pks = list(queryset.order_by().values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return total
+        _, per_model = model.objects.filter(pk__in=pks).delete()
+        total += per_model.get(model._meta.label, 0)
+
+
+def _lock_key(name: str) -> int:
+    # Stable signed 64-bit key for pg_try_advisory_lock
+    return int.from_bytes(hashlib.sha256(f"scheduler:{name}".encode()).digest()[:8], 'big', signed=True)
+
+
+@contextmanager
+def leader_lock(name: str):
+    """
+    Try to become the leader for ``name``; yields whether we are.
+
+    Uses a session-level Postgres advisory lock, which is released when we're
+    done or if this process's connection dies. Other databases (local
+    development on SQLite) have no cross-process lock, so the caller always
+    leads there.
+    """
+    if connection.vendor != 'postgresql':
+        yield True
+        return
+
+    key = _lock_key(name)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [key])
+        acquired = cursor.fetchone()[0]
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", [key])
+
+
+def run_task(task: PeriodicTask, slot=None) -> Optional[str]:
+    """
+    Run one task if this process wins its leader lock.
+
+    Args:
+        task: The task to run
+        slot: The scheduled minute being run; if the task's last run started
+            at or after it, another container already ran this slot. None
+            runs the task unconditionally.
+
+    Returns:
+        'succeeded' or 'failed', or None if the run was skipped
+    """
+    from api.models import ScheduledTask
+
+    with leader_lock(task.name) as leader:
+        if not leader:
+            logger.debug("Scheduled task %s is running elsewhere", task.name)
+            return None
+
+        state, _ = ScheduledTask.objects.get_or_create(name=task.name)
+        if slot is not None and state.last_started_at and state.last_started_at >= slot:
+            return None
+
+        state.last_started_at = timezone.now()
+        state.save(update_fields=['last_started_at'])
+
+        started = time.monotonic()
+        result, error = None, ''
+        try:
+            result = task.func()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            logger.exception("Scheduled task %s failed", task.name)
+        duration_ms = int((time.monotonic() - started) * 1000)
+
+        state.last_finished_at = timezone.now()
+        state.last_duration_ms = duration_ms
+        state.max_duration_ms = max(state.max_duration_ms, duration_ms)
+        state.total_duration_ms += duration_ms
+        state.run_count += 1
+        state.last_status = 'failed' if error else 'succeeded'
+        state.last_result = result
+        state.last_error = error
+        if error:
+            state.failure_count += 1
+        state.save()
+
+        logger.info("Scheduled task %s %s in %d ms: %s", task.name, state.last_status, duration_ms, error or result)
+        return state.last_status
+
+
+def due_tasks(moment) -> List[PeriodicTask]:
+    local = timezone.localtime(moment)
+    return [task for task in PERIODIC_TASKS.values() if task.schedule and task.schedule.matches(local)]
+
+
+def run_pending(now=None, since=None) -> Dict[str, Optional[str]]:
+    """
+    Run every task scheduled for the current minute.
+
+    Args:
+        now: The current time (default: now)
+        since: The last minute already run. Tasks that were due in the minutes
+            after it and before the current one (missed while an earlier run
+            overran) run too, once each, for the latest minute they were due.
+            At most SCHEDULER_MAX_CATCHUP minutes are looked back over.
+    """
+    slot = (now or timezone.now()).replace(second=0, microsecond=0)
+    slots = {}
+    if since is not None:
+        max_catchup = timedelta(minutes=getattr(settings, 'SCHEDULER_MAX_CATCHUP', 60))
+        missed = max(since, slot - max_catchup) + timedelta(minutes=1)
+        while missed < slot:
+            for task in due_tasks(missed):
+                slots[task.name] = (task, missed)
+            missed += timedelta(minutes=1)
+    for task in due_tasks(slot):
+        slots[task.name] = (task, slot)
+
+    outcomes = {}
+    for task, task_slot in slots.values():
+        if task_slot != slot:
+            logger.info("Running scheduled task %s for the missed %s slot", task.name, task_slot.isoformat())
+        close_old_connections()
+        try:
+            outcomes[task.name] = run_task(task, task_slot)
+        except Exception:
+            # e.g. the database went away; the next slot will try again
+            logger.exception("Could not run scheduled task %s", task.name)
+            outcomes[task.name] = 'failed'
+    close_old_connections()
+    return outcomes
+
+
+def run_forever(stop_event: threading.Event):
+    """
+    Run pending tasks at the start of every minute until stopped, catching up
+    on minutes that passed while a run overran.
+    """
+    last_slot = None
+    while not stop_event.is_set():
+        now = timezone.now()
+        slot = now.replace(second=0, microsecond=0)
+        if last_slot is None or slot > last_slot:
+            run_pending(now, since=last_slot)
+            last_slot = slot
+            now = timezone.now()
+        next_minute = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        stop_event.wait((next_minute - now).total_seconds())
+    connection.close()
@@ -8,6 +8,8 @@ from django.conf import settings
 from django.utils import timezone
 from datetime import datetime, timedelta
 
+from .http_client import get_client
+
 logger = logging.getLogger(__name__)
 
 
@@ -29,6 +31,8 @@ class DocuSealService:
         if not self.api_key:
             logger.error("DocuSeal API key not configured")
             raise DocuSealAPIError("DocuSeal API key not configured")
+
+        self.client = get_client('docuseal')
     
     def _get_headers(self) -> Dict[str, str]:
         """Get standard headers for DocuSeal API requests."""
@@ -62,9 +66,9 @@ class DocuSealService:
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
         
         try:
-            response = requests.request(
-                method=method,
-                url=url,
+            response = self.client.request(
+                method,
+                url,
                 headers=self._get_headers(),
                 json=data,
                 params=params,
@@ -158,8 +162,8 @@ class DocuSealService:
         url = f"{self.base_url}/templates"
         
         try:
-            response = requests.post(
-                url=url,
+            response = self.client.post(
+                url,
                 headers={'X-Auth-Token': self.api_key},
                 files=files,
                 data=form_data,
@@ -288,8 +292,8 @@ class DocuSealService:
         url = f"{self.base_url}/submissions/{submission_id}/documents"
         
         try:
-            response = requests.get(
-                url=url,
+            response = self.client.get(
+                url,
                 headers={'X-Auth-Token': self.api_key},
                 timeout=30
             )
@@ -0,0 +1,321 @@
+"""
+Shared HTTP client for third-party integrations.
+
+Each integration (DocuSeal, Authorize.Net, FlightAware, Twilio) gets one
+process-wide ServiceClient with its own pooled, keep-alive requests.Session,
+so calls reuse TCP/TLS connections instead of paying a handshake each time.
+The client also applies a per-service timeout budget, retries idempotent
+requests with jittered exponential backoff, trips a circuit breaker after
+repeated failures, and records latency metrics per service.
+"""
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+DEFAULT_CONFIG = {
+    'base_url': None,
+    'timeout': (3.05, 30),      # connect, read seconds per attempt
+    'deadline': 60,             # total seconds across all attempts
+    'retries': 2,               # extra attempts for idempotent requests
+    'backoff': 0.3,             # base seconds for exponential backoff
+    'max_backoff': 5,
+    'pool_maxsize': 10,
+    'failure_threshold': 5,     # consecutive failures before the circuit opens
+    'reset_timeout': 30,        # seconds before a half-open trial request
+    'headers': {},
+}
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without a network call while a service's circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    Closed: requests flow. After ``failure_threshold`` consecutive failures it
+    opens and rejects requests for ``reset_timeout`` seconds, then lets a
+    single trial request through (half-open); success closes it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return 'half_open'
+            return 'open'
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class ServiceMetrics:
+    """Request counts and latency for one service."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.failures = 0
+        self.retries = 0
+        self.rejected = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.status_counts = {}
+
+    def record(self, latency: float, status_code: Optional[int] = None, failed: bool = False):
+        with self._lock:
+            self.requests += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+            if failed:
+                self.failures += 1
+            key = str(status_code) if status_code is not None else 'error'
+            self.status_counts[key] = self.status_counts.get(key, 0) + 1
+
+    def increment(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'failures': self.failures,
+                'retries': self.retries,
+                'rejected': self.rejected,
+                'latency_avg_ms': round(self.latency_total / self.requests * 1000, 1) if self.requests else 0.0,
+                'latency_max_ms': round(self.latency_max * 1000, 1),
+                'status_counts': dict(self.status_counts),
+            }
+
+
+class ServiceClient:
+    """
+    Pooled, resilient HTTP client for one external service.
+
+    Only idempotent requests (GET/HEAD/OPTIONS/PUT/DELETE, or any request
+    made with ``idempotent=True``) are retried, so a payment POST is never
+    sent twice.
+    """
+
+    def __init__(self, name: str, **config):
+        self.name = name
+        self.config = {**DEFAULT_CONFIG, **config}
+        self.base_url = (self.config['base_url'] or '').rstrip('/') or None
+        self.breaker = CircuitBreaker(self.config['failure_threshold'], self.config['reset_timeout'])
+        self.metrics = ServiceMetrics()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.config['pool_maxsize'], max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update(self.config['headers'])
+
+    def url(self, path: str) -> str:
+        if path.startswith(('http://', 'https://')) or not self.base_url:
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform in [0, min(max_backoff, backoff * 2^attempt)]
+        return random.uniform(0, min(self.config['max_backoff'], self.config['backoff'] * (2 ** attempt)))
+
+    def request(self, method: str, path: str, idempotent: Optional[bool] = None,
+                timeout=None, **kwargs) -> requests.Response:
+        """
+        Send a request, retrying idempotent calls on connection errors and
+        429/502/503/504 responses.
+
+        Args:
+            method: HTTP method
+            path: Path relative to the service base_url, or an absolute URL
+            idempotent: Override whether the request may be retried
+            timeout: Per-attempt timeout; defaults to the service's timeout
+            **kwargs: Passed through to requests.Session.request
+
+        Returns:
+            The final requests.Response (callers still check status codes)
+
+        Raises:
+            CircuitOpenError: If the service's circuit is open
+            requests.RequestException: If every attempt failed at the network level
+        """
+        method = method.upper()
+        url = self.url(path)
+        retryable = method in IDEMPOTENT_METHODS if idempotent is None else idempotent
+        attempts = 1 + (self.config['retries'] if retryable else 0)
+        deadline = time.monotonic() + self.config['deadline']
+        timeout = timeout or self.config['timeout']
+
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                self.metrics.increment('rejected')
+                raise CircuitOpenError(f"{self.name} circuit is open; not calling {url}")
+
+            last_attempt = attempt == attempts - 1
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except requests.RequestException as e:
+                latency = time.monotonic() - started
+                self.metrics.record(latency, failed=True)
+                self.breaker.record_failure()
+                logger.warning("%s %s %s failed after %.0f ms: %s", self.name, method, url, latency * 1000, e)
+                if last_attempt or not self._sleep_before_retry(attempt, deadline):
+                    raise
+                continue
+            except BaseException:
+                # Anything else (a bug, a gevent Timeout, KeyboardInterrupt) still ends the
+                # attempt; without this a half-open trial would leave the circuit stuck
+                self.metrics.record(time.monotonic() - started, failed=True)
+                self.breaker.record_failure()
+                raise
+
+            latency = time.monotonic() - started
+            server_error = response.status_code >= 500
+            self.metrics.record(latency, response.status_code, failed=server_error)
+            if server_error:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            logger.debug("%s %s %s -> %s in %.0f ms", self.name, method, url, response.status_code, latency * 1000)
+
+            if response.status_code in RETRY_STATUSES and not last_attempt:
+                if self._sleep_before_retry(attempt, deadline, response):
+                    response.close()
+                    continue
+            return response
+
+    def _sleep_before_retry(self, attempt: int, deadline: float, response=None) -> bool:
+        """Wait before the next attempt; False if that would blow the deadline."""
+        delay = self._backoff(attempt)
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        if time.monotonic() + delay >= deadline:
+            return False
+        self.metrics.increment('retries')
+        time.sleep(delay)
+        return True
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request('POST', path, **kwargs)
+
+    def put(self, path: str, **kwargs) -> requests.Response:
+        return self.request('PUT', path, **kwargs)
+
+    def delete(self, path: str, **kwargs) -> requests.Response:
+        return self.request('DELETE', path, **kwargs)
+
+
+_clients: Dict[str, ServiceClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name: str) -> ServiceClient:
+    """
+    Process-wide client for a service, configured from settings.HTTP_CLIENTS[name].
+    """
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                config = getattr(settings, 'HTTP_CLIENTS', {}).get(name, {}) if settings.configured else {}
+                client = ServiceClient(name, **config)
+                _clients[name] = client
+    return client
+
+
+def get_metrics() -> Dict[str, Dict[str, Any]]:
+    """Metrics and circuit state for every client created in this process."""
+    with _clients_lock:
+        clients = list(_clients.values())
+    return {
+        client.name: {**client.metrics.snapshot(), 'circuit': client.breaker.state}
+        for client in clients
+    }
+
+
+_twilio_http_client = None
+
+
+def get_twilio_http_client():
+    """
+    Twilio HTTP client that sends through the shared 'twilio' ServiceClient.
+
+    Pass as ``Client(sid, token, http_client=get_twilio_http_client())``.
+    """
+    global _twilio_http_client
+    if _twilio_http_client is not None:
+        return _twilio_http_client
+
+    from twilio.http.http_client import TwilioHttpClient
+    from twilio.http.response import Response as TwilioResponse
+
+    service = get_client('twilio')
+
+    class PooledTwilioHttpClient(TwilioHttpClient):
+        def request(self, method, url, params=None, data=None, headers=None, auth=None,
+                    timeout=None, allow_redirects=False):
+            kwargs = {'params': params, 'headers': headers, 'auth': auth, 'allow_redirects': allow_redirects}
+            if headers and headers.get('Content-Type') in ('application/json', 'application/scim+json'):
+                kwargs['json'] = data
+            else:
+                kwargs['data'] = data
+            self.log_request({'method': method.upper(), 'url': url, **kwargs})
+            response = service.request(method, url, timeout=timeout, **kwargs)
+            self.log_response(response.status_code, response)
+            self._test_only_last_response = TwilioResponse(int(response.status_code), response.text, response.headers)
+            return self._test_only_last_response
+
+    _twilio_http_client = PooledTwilioHttpClient(pool_connections=False)
+    return _twilio_http_client
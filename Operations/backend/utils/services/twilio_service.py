@@ -7,6 +7,7 @@ from django.conf import settings
 from twilio.rest import Client
 from twilio.base.exceptions import TwilioException
 from api.models import SMSVerificationCode
+from .http_client import get_twilio_http_client
 from django.contrib.auth.models import User
 import logging
 
@@ -22,7 +23,7 @@ class TwilioService:
         if not all([self.account_sid, self.auth_token, self.phone_number]):
             raise ValueError("Missing Twilio configuration. Please check your environment variables.")
 
-        self.client = Client(self.account_sid, self.auth_token)
+        self.client = Client(self.account_sid, self.auth_token, http_client=get_twilio_http_client())
 
     def format_phone_number(self, phone_number):
         """
@@ -216,12 +217,7 @@ class TwilioService:
         """
         Clean up expired verification codes (called periodically)
         """
-        expired_codes = SMSVerificationCode.objects.filter(
-            expires_at__lt=timezone.now(),
-            verified=False
-        )
-        count = expired_codes.count()
-        expired_codes.delete()
+        count = SMSVerificationCode.cleanup_expired()
         logger.info(f"Cleaned up {count} expired verification codes")
         return count
 
@@ -1,15 +1,16 @@
 from os import getenv
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.application import MIMEApplication
 from typing import List, Optional
 from pathlib import Path
 
+from .transport import get_transport
+
 EMAIL_TEMPLATE_PATH = Path(__file__).resolve().parent / "email_template.html"
 
 
-def send_email(subject: str, targets: List[str], body: str, is_html: bool = False, attachments: Optional[List[str]] = None):
+def build_message(subject: str, targets: List[str], body: str, is_html: bool = False, attachments: Optional[List[str]] = None):
     # Create multipart message if we have attachments
     if attachments:
         msg = MIMEMultipart()
@@ -28,34 +29,18 @@ def send_email(subject: str, targets: List[str], body: str, is_html: bool = Fals
     msg["From"] = getenv("DEFAULT_FROM_EMAIL")
     msg["To"] = ", ".join(targets)
     msg["Subject"] = subject
+    return msg
 
-    server = None
-    connection_established = False
-    try:
-        host = getenv("EMAIL_HOST")
-        port = int(getenv("EMAIL_PORT", "587"))
-        user = getenv("EMAIL_HOST_USER")
-        password = getenv("EMAIL_HOST_PASSWORD")
-
-        server = smtplib.SMTP(host, port, timeout=20)
-        server.ehlo()
-        connection_established = True
 
-        server.starttls()
-        server.ehlo()
-
-        server.login(user, password)
-        server.sendmail(msg["From"], targets, msg.as_string())
+def send_email(subject: str, targets: List[str], body: str, is_html: bool = False, attachments: Optional[List[str]] = None):
+    msg = build_message(subject, targets, body, is_html=is_html, attachments=attachments)
+    try:
+        # Over the process's shared connection (see transport.py), not a new one per message
+        get_transport().send(msg["From"], targets, msg.as_string())
         return True
     except Exception as e:
         print("❌ Email error:", e)
         return False
-    finally:
-        if server and connection_established:
-            try:
-                server.quit()
-            except:
-                pass
 
 
 # TODO add support for preview and text below button
@@ -0,0 +1,156 @@
+"""
+A persistent SMTP connection shared by everything that sends email in a process.
+
+Opening a connection costs a TCP handshake, EHLO, STARTTLS, a second EHLO and
+AUTH before the first message can go. SMTPTransport opens it once and sends
+every message over it: after the connection has sat idle for max_idle
+seconds it is checked with NOOP first, and a message whose send finds the
+connection dropped (server timeout, 421, reset) is sent again once over a
+fresh one. Sends are serialised by a lock, so worker threads and gevent
+greenlets can share the transport.
+
+Configured from the same EMAIL_* environment variables as the Django
+settings. For local testing, point it at an SMTP sink:
+
+    python -m aiosmtpd -n -l localhost:1025
+    EMAIL_HOST=localhost EMAIL_PORT=1025 EMAIL_USE_TLS=False EMAIL_HOST_USER=
+"""
+
+import atexit
+import logging
+import smtplib
+import threading
+import time
+from os import getenv
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def connection_lost(error: Exception) -> bool:
+    """Whether a send failed because of the connection rather than the server's answer about the message."""
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code == 421  # service not available, closing transmission channel
+    # smtplib's exceptions are OSErrors too; the rest are socket errors and timeouts
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class SMTPTransport:
+    """One reusable SMTP connection (see the module docstring)."""
+
+    def __init__(self, host: str, port: int = 587, username: Optional[str] = None, password: Optional[str] = None,
+                 use_tls: bool = True, use_ssl: bool = False, timeout: float = 20, max_idle: float = 30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.connection: Optional[smtplib.SMTP] = None
+        self.last_used = 0.0
+        self.lock = threading.RLock()
+
+    def _connect(self) -> smtplib.SMTP:
+        if self.use_ssl:
+            connection = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            connection.ehlo()
+            if self.use_tls and not self.use_ssl:
+                connection.starttls()
+                connection.ehlo()
+            if self.username:
+                connection.login(self.username, self.password)
+        except Exception:
+            connection.close()
+            raise
+        logger.info("Connected to SMTP server %s:%s", self.host, self.port)
+        return connection
+
+    def open(self) -> smtplib.SMTP:
+        """The open connection: reused if it's still alive, otherwise a new one."""
+        with self.lock:
+            if self.connection is not None and time.monotonic() - self.last_used > self.max_idle:
+                try:
+                    alive = self.connection.noop()[0] == 250
+                except (smtplib.SMTPException, OSError):
+                    alive = False
+                if not alive:
+                    self._discard()
+            if self.connection is None:
+                self.connection = self._connect()
+            self.last_used = time.monotonic()
+            return self.connection
+
+    def send(self, from_addr: str, to_addrs: List[str], message: str) -> Dict[str, Tuple[int, bytes]]:
+        """
+        Send one message, reconnecting and sending again once if the connection was lost.
+
+        Returns:
+            Recipients the server refused while accepting the message for the
+            rest, as smtplib's sendmail reports them
+
+        Raises:
+            smtplib.SMTPException: If the server rejected the message (or every recipient)
+            OSError: If the server can't be reached
+        """
+        with self.lock:
+            for attempt in (1, 2):
+                try:
+                    refused = self.open().sendmail(from_addr, to_addrs, message)
+                    self.last_used = time.monotonic()
+                    return refused
+                except Exception as e:
+                    # A rejection leaves the connection usable (smtplib sends RSET); anything else doesn't
+                    if not connection_lost(e):
+                        raise
+                    self._discard()
+                    if attempt == 2:
+                        raise
+                    logger.warning("SMTP connection to %s:%s lost (%s), reconnecting", self.host, self.port, e)
+
+    def _discard(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except OSError:
+                pass
+            self.connection = None
+
+    def close(self):
+        """Say QUIT and close the connection, if one is open."""
+        with self.lock:
+            if self.connection is not None:
+                try:
+                    self.connection.quit()
+                except (smtplib.SMTPException, OSError):
+                    pass
+                self._discard()
+
+
+_transport: Optional[SMTPTransport] = None
+_transport_lock = threading.Lock()
+
+
+def get_transport() -> SMTPTransport:
+    """The process's shared SMTPTransport, configured from the EMAIL_* environment variables."""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = SMTPTransport(
+                host=getenv("EMAIL_HOST"),
+                port=int(getenv("EMAIL_PORT", "587")),
+                username=getenv("EMAIL_HOST_USER"),
+                password=getenv("EMAIL_HOST_PASSWORD"),
+                use_tls=getenv("EMAIL_USE_TLS", "True").lower() == "true",
+                use_ssl=getenv("EMAIL_USE_SSL", "False").lower() == "true",
+                timeout=float(getenv("EMAIL_TIMEOUT", "20")),
+                max_idle=float(getenv("EMAIL_CONNECTION_MAX_IDLE", "30")),
+            )
+            atexit.register(_transport.close)
+        return _transport